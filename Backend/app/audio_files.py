@@ -0,0 +1,180 @@
+"""
+Generated speech files: deterministic names and HTTP serving.
+
+`audio_name` derives the file name from everything that determines the
+audio (text, voice, speed), so a file never changes once written, the same
+sentence is only synthesized once, and responses can be cached as immutable.
+
+`serve` answers GET/HEAD for /audio/<name> with a strong ETag (304 on
+If-None-Match), `Cache-Control: immutable`, single-range `Range` requests
+(206/416, honouring If-Range) for seeking, and content negotiation: when the
+client's Accept names Ogg/Opus and an `.opus` alternate exists next to the
+MP3, the alternate is sent instead. Alternates are produced in the
+background with ffmpeg when AUDIO_OPUS=1 and ffmpeg is on the PATH.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import subprocess
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import anyio
+from fastapi import HTTPException, Response
+from fastapi.responses import FileResponse
+
+from app import metrics
+from app.http_cache import etag_matches
+
+logger = logging.getLogger(__name__)
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+AUDIO_NAME = re.compile(r"^[A-Za-z0-9_-][A-Za-z0-9._-]*\.(mp3|opus)$")
+MEDIA_TYPES = {".mp3": "audio/mpeg", ".opus": "audio/ogg; codecs=opus"}
+OPUS_ACCEPT = ("audio/ogg", "audio/opus")
+
+OPUS_ENABLED = os.getenv("AUDIO_OPUS") == "1"
+_ffmpeg = shutil.which("ffmpeg") if OPUS_ENABLED else None
+_transcoder = ThreadPoolExecutor(max_workers=1, thread_name_prefix="opus") if _ffmpeg else None
+
+
+def audio_name(kind, *parts):
+    """`<kind>-<hash of parts>.mp3`: the same inputs always map to the same file."""
+    digest = hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode("utf-8")).hexdigest()
+    return f"{kind}-{digest[:32]}.mp3"
+
+
+def save_atomically(save, path):
+    """Call `save(temp_path)` and move the result into place, so readers never see half a file."""
+    temp_path = f"{path}.{uuid.uuid4().hex[:8]}.part"
+    try:
+        save(temp_path)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+
+
+def touch(path):
+    """
+    Mark a reused file (and its alternates) as recently used, so the audio
+    janitor keeps it; False if the file does not exist.
+    """
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return False
+    try:
+        os.utime(os.path.splitext(path)[0] + ".opus")
+    except FileNotFoundError:
+        pass
+    return True
+
+
+def _transcode(path):
+    target = os.path.splitext(path)[0] + ".opus"
+    if os.path.exists(target):
+        return
+    try:
+        save_atomically(
+            lambda temp_path: subprocess.run(
+                [_ffmpeg, "-loglevel", "error", "-y", "-i", path, "-c:a", "libopus", "-b:a", "32k",
+                 "-f", "ogg", temp_path],
+                check=True, timeout=60
+            ),
+            target
+        )
+        metrics.increment("audio_alternates_total", format="opus")
+    except Exception as e:
+        logger.warning("Opus transcode of %s failed: %s", path, e)
+
+
+def add_alternates(path):
+    """Queue alternate encodings of a freshly written MP3 (no-op unless enabled)."""
+    if _transcoder is not None:
+        _transcoder.submit(_transcode, path)
+
+
+def _wants_opus(accept):
+    for item in (accept or "").lower().split(","):
+        media_type, *params = (part.strip() for part in item.split(";"))
+        if media_type not in OPUS_ACCEPT:
+            continue
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            return True
+    return False
+
+
+def _parse_range(header, size):
+    """(start, end) inclusive for a single `bytes=` range; None to ignore it; "unsatisfiable"."""
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            start, end = max(0, size - int(last)), size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        return "unsatisfiable"
+    return start, min(end, size - 1)
+
+
+def _read_range(path, start, end):
+    with open(path, "rb") as f:
+        f.seek(start)
+        return f.read(end - start + 1)
+
+
+async def serve(request, directory, name):
+    if not AUDIO_NAME.match(name):
+        raise HTTPException(status_code=404, detail="Audio not found")
+    path = os.path.join(directory, name)
+    if name.endswith(".mp3") and _wants_opus(request.headers.get("accept")):
+        alternate = os.path.splitext(path)[0] + ".opus"
+        if os.path.exists(alternate):
+            path = alternate
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Audio not found")
+
+    media_type = MEDIA_TYPES[os.path.splitext(path)[1]]
+    # Names are content-addressed; mtime is left out because touch() bumps it on reuse
+    etag = f'"{os.path.basename(path)}-{stat.st_size:x}"'
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE, "Accept-Ranges": "bytes", "Vary": "Accept"}
+
+    if etag_matches(request, etag):
+        metrics.increment("audio_responses_total", result="not_modified")
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (not if_range or if_range == etag):
+        byte_range = _parse_range(range_header, stat.st_size)
+        if byte_range == "unsatisfiable":
+            metrics.increment("audio_responses_total", result="unsatisfiable")
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{stat.st_size}"})
+        if byte_range is not None:
+            start, end = byte_range
+            body = await anyio.to_thread.run_sync(_read_range, path, start, end)
+            metrics.increment("audio_responses_total", result="partial")
+            return Response(content=body, status_code=206, media_type=media_type,
+                            headers={**headers, "Content-Range": f"bytes {start}-{end}/{stat.st_size}"})
+
+    metrics.increment("audio_responses_total", result="full")
+    return FileResponse(path, media_type=media_type, headers=headers, stat_result=stat)
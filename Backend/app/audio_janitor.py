@@ -0,0 +1,217 @@
+"""
+Background cleanup of generated speech in SOUND_RESPONSE_DIR.
+
+    AUDIO_TTL_HOURS=72          unreferenced files idle longer than this are removed
+    AUDIO_QUOTA_MB=2048         above this, unreferenced files go in LRU order
+    AUDIO_JANITOR_INTERVAL=600  seconds between passes
+    AUDIO_JANITOR_BATCH=200     deletions per batch (with a pause between batches)
+
+A file is referenced while a message in scenario_messages or chat_messages
+still carries its /audio/ URL, or a cached scenario opening names it;
+referenced files are never removed. The reference index is rebuilt at most
+every REFERENCE_REFRESH seconds from a partial index on audio_url, and a
+pass that cannot load it deletes nothing. Recency is the later of access
+and modification time. Each worker runs the janitor thread, but a lock file
+lets only one of them sweep the directory at a time (flock on POSIX,
+msvcrt.locking on Windows; with neither, every worker sweeps and a lost
+unlink race is harmless).
+"""
+import logging
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+REFERENCE_REFRESH = 900
+PART_FILE_GRACE = 3600
+PASS_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+
+def _audio_file(url):
+    if isinstance(url, str) and "/audio/" in url:
+        return url.rsplit("/audio/", 1)[1].split("?", 1)[0]
+    return None
+
+
+def _stem(name):
+    return os.path.splitext(name)[0]
+
+
+def _try_lock(file):
+    """Non-blocking exclusive lock on an open file; False if another process holds it."""
+    try:
+        if fcntl is not None:
+            fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        elif msvcrt is not None:
+            msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+class AudioJanitor:
+    def __init__(self, directory, db_provider, ttl_seconds=None, quota_bytes=None, interval=None, batch_size=None):
+        self.directory = directory
+        self.db_provider = db_provider
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv("AUDIO_TTL_HOURS", "72")) * 3600
+        self.quota_bytes = quota_bytes if quota_bytes is not None else int(os.getenv("AUDIO_QUOTA_MB", "2048")) << 20
+        self.interval = interval or float(os.getenv("AUDIO_JANITOR_INTERVAL", "600"))
+        self.batch_size = batch_size or int(os.getenv("AUDIO_JANITOR_BATCH", "200"))
+        self._stop = threading.Event()
+        self._thread = None
+        self._references = None
+        self._references_loaded = 0.0
+        self._indexed = False
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="audio-janitor", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        # Let startup warm-up finish before the first sweep
+        if self._stop.wait(min(60.0, self.interval)):
+            return
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error("Audio janitor pass failed: %s", e, exc_info=True)
+            self._stop.wait(self.interval)
+
+    def referenced_stems(self):
+        """Stems of every audio file still named by a stored message or cached opening."""
+        now = time.monotonic()
+        if self._references is not None and now - self._references_loaded < REFERENCE_REFRESH:
+            return self._references
+        db = self.db_provider()
+        stems = set()
+        for collection in ("scenario_messages", "chat_messages"):
+            if not self._indexed:
+                db[collection].create_index(
+                    "audio_url", partialFilterExpression={"audio_url": {"$type": "string"}}
+                )
+            cursor = db[collection].find({"audio_url": {"$type": "string"}}, {"audio_url": 1, "_id": 0})
+            for doc in cursor:
+                name = _audio_file(doc.get("audio_url"))
+                if name:
+                    stems.add(_stem(name))
+        self._indexed = True
+        for doc in db["scenario_cache"].find({"value.audio_file": {"$type": "string"}}, {"value.audio_file": 1}):
+            stems.add(_stem(doc["value"]["audio_file"]))
+        self._references = stems
+        self._references_loaded = now
+        metrics.set_gauge("audio_referenced_files", len(stems))
+        return stems
+
+    def _scan(self):
+        """[(last used, size, name)] for every file, plus the total size."""
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                try:
+                    stat = entry.stat(follow_symlinks=False)
+                except FileNotFoundError:
+                    continue
+                entries.append((max(stat.st_atime, stat.st_mtime), stat.st_size, entry.name))
+                total += stat.st_size
+        return entries, total
+
+    def _delete(self, names, reason):
+        """Remove (name, size) pairs; returns (files, bytes) removed."""
+        removed, removed_bytes = 0, 0
+        for index, (name, size) in enumerate(names, start=1):
+            if self._stop.is_set():
+                break
+            try:
+                os.unlink(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                logger.warning("Could not remove %s: %s", name, e)
+                continue
+            removed += 1
+            removed_bytes += size
+            metrics.increment("audio_janitor_deleted_total", reason=reason)
+            metrics.increment("audio_janitor_deleted_bytes_total", size, reason=reason)
+            if index % self.batch_size == 0:
+                # Give request threads the disk between batches
+                time.sleep(0.05)
+        return removed, removed_bytes
+
+    def run_once(self):
+        if not os.path.isdir(self.directory):
+            return
+        with open(os.path.join(self.directory, ".janitor.lock"), "w") as lock:
+            if not _try_lock(lock):
+                return
+            started = time.perf_counter()
+            try:
+                self._sweep()
+            finally:
+                metrics.observe("audio_janitor_pass_seconds", time.perf_counter() - started, buckets=PASS_BUCKETS)
+
+    def _sweep(self):
+        entries, total = self._scan()
+        metrics.set_gauge("audio_dir_bytes", total)
+        metrics.set_gauge("audio_dir_files", len(entries))
+
+        try:
+            referenced = self.referenced_stems()
+        except Exception as e:
+            logger.warning("Audio janitor skipped: reference index unavailable (%s)", e)
+            return
+
+        now = time.time()
+        expired, candidates = [], []
+        for last_used, size, name in sorted(entries):
+            if name.startswith("."):
+                continue
+            if name.endswith(".part"):
+                # Leftover of an interrupted write
+                if now - last_used > PART_FILE_GRACE:
+                    expired.append((name, size))
+            elif _stem(name) in referenced:
+                continue
+            elif now - last_used > self.ttl_seconds:
+                expired.append((name, size))
+            else:
+                candidates.append((name, size))
+
+        expired_files, expired_bytes = self._delete(expired, "ttl")
+        total -= expired_bytes
+        quota_files = 0
+        if total > self.quota_bytes:
+            over_quota, projected = [], total
+            for name, size in candidates:
+                if projected <= self.quota_bytes:
+                    break
+                over_quota.append((name, size))
+                projected -= size
+            quota_files, quota_bytes = self._delete(over_quota, "quota")
+            total -= quota_bytes
+            if total > self.quota_bytes:
+                logger.warning("Audio directory still over quota (%d bytes) with only referenced files left", total)
+
+        metrics.set_gauge("audio_dir_bytes", total)
+        metrics.set_gauge("audio_dir_files", len(entries) - expired_files - quota_files)
+        if expired_files or quota_files:
+            logger.info("Audio janitor removed %d expired and %d over-quota files", expired_files, quota_files)
@@ -0,0 +1,50 @@
+"""
+Content-addressed blob storage on local disk.
+
+A blob is named by the SHA-256 of its bytes plus an extension for its type
+("<sha256>.png") and lives under BLOB_STORE_DIR/<first two hex digits>/.
+Identical uploads share one file, names never change meaning, and anything
+served by name can be cached forever. Point BLOB_STORE_DIR at a volume shared
+by all workers (and hosts) that serve the API.
+"""
+import hashlib
+import os
+import re
+import tempfile
+
+BLOB_NAME = re.compile(r"^[0-9a-f]{64}\.[a-z0-9]{1,5}$")
+
+
+class LocalBlobStore:
+    def __init__(self, root=None):
+        self.root = root or os.getenv("BLOB_STORE_DIR", "blob_store")
+
+    def path(self, name):
+        """Filesystem path for a blob name, or None if the name is not a valid blob name."""
+        if not BLOB_NAME.match(name or ""):
+            return None
+        return os.path.join(self.root, name[:2], name)
+
+    def exists(self, name):
+        path = self.path(name)
+        return path is not None and os.path.exists(path)
+
+    def put(self, data, extension):
+        """Store `data` (idempotently) and return its blob name."""
+        name = f"{hashlib.sha256(data).hexdigest()}.{extension}"
+        path = self.path(name)
+        if os.path.exists(path):
+            return name
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # Write beside the target and rename, so readers never see a partial file
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+        return name
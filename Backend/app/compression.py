@@ -0,0 +1,112 @@
+"""
+Response compression for text payloads.
+
+CompressionMiddleware compresses complete (non-streaming) responses of a
+textual content type once they reach COMPRESSION_MIN_BYTES (default 1024).
+It uses brotli when the client accepts it and the `brotli` package is
+installed, and gzip otherwise. Streaming responses (audio, files) and
+anything already encoded pass through untouched. Bodies above
+OFFLOAD_BYTES are compressed on a worker thread so a multi-megabyte
+history does not stall the event loop.
+"""
+import gzip
+import os
+
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+
+from app import metrics
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+OFFLOAD_BYTES = 256 * 1024
+
+
+def _accepted_encodings(header):
+    accepted = {}
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    return accepted
+
+
+def negotiate(accept_encoding):
+    """"br", "gzip" or None for an Accept-Encoding header value."""
+    accepted = _accepted_encodings(accept_encoding or "")
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def compress(body, encoding, gzip_level=6, brotli_quality=4):
+    if encoding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size=None, gzip_level=6, brotli_quality=4):
+        self.app = app
+        self.minimum_size = minimum_size or int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        held_start = None
+
+        async def send_compressed(message):
+            nonlocal held_start
+            if message["type"] == "http.response.start":
+                held_start = message
+                return
+            if message["type"] != "http.response.body" or held_start is None:
+                await send(message)
+                return
+
+            start, held_start = held_start, None
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=list(start.get("headers", [])))
+            content_type = headers.get("content-type", "")
+            if (message.get("more_body") or len(body) < self.minimum_size or "content-encoding" in headers
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)):
+                await send(start)
+                await send(message)
+                return
+
+            if len(body) > OFFLOAD_BYTES:
+                compressed = await anyio.to_thread.run_sync(
+                    compress, body, encoding, self.gzip_level, self.brotli_quality
+                )
+            else:
+                compressed = compress(body, encoding, self.gzip_level, self.brotli_quality)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            metrics.increment("http_compressed_responses_total", encoding=encoding)
+            metrics.increment("http_compression_saved_bytes_total", len(body) - len(compressed), encoding=encoding)
+            await send({**start, "headers": headers.raw})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
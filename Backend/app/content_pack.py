@@ -0,0 +1,114 @@
+"""
+Canned text served on fallback paths: practice greetings, chat fallbacks,
+lesson and vocabulary fallbacks and the practice sentence bank.
+
+The pack lives in content/pack.json (override with CONTENT_PACK_PATH) and is
+parsed into an immutable per-language index once per process. When the app
+is started with a preloading server the index is built before forking and
+shared copy-on-write by every worker. The file's mtime is checked at most
+every `reload_interval` seconds, so operators can edit the text for any
+registered language without a restart; a pack that fails to load leaves the
+previous one in place. Adding a language still means adding it to
+app.languages (script, TTS and ASR codes): pack entries for codes the
+registry does not know are ignored with a warning.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from types import MappingProxyType
+
+from app.languages import DEFAULT_LANGUAGE, resolve_language
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "content", "pack.json")
+SUPPORTED_VERSION = 1
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return json.load(f)
+
+
+class ContentPack:
+    def __init__(self, path=None, reload_interval=5.0):
+        self.path = path or os.getenv("CONTENT_PACK_PATH", DEFAULT_PATH)
+        self.reload_interval = reload_interval
+        self.version = None
+        self._index = MappingProxyType({})
+        self._mtime = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        try:
+            self.load()
+        except Exception as e:
+            logger.error("Failed to load content pack %s: %s", self.path, e)
+
+    def load(self):
+        """Read and index the pack, replacing the current one only if it is valid."""
+        mtime = os.stat(self.path).st_mtime_ns
+        pack = _read(self.path)
+        version = pack.get("version")
+        if version != SUPPORTED_VERSION:
+            raise ValueError(f"unsupported content pack version {version!r}")
+        languages = pack.get("languages")
+        if not isinstance(languages, dict):
+            raise ValueError("content pack has no 'languages' section")
+
+        entries = {}
+        for code, entry in languages.items():
+            registered = resolve_language(code)
+            if registered is None:
+                logger.warning("Ignoring content pack entry for unregistered language %r", code)
+                continue
+            entries[registered.code] = entry
+        index = _freeze(entries)
+        with self._lock:
+            self._index = index
+            self.version = version
+            self._mtime = mtime
+        logger.info("Loaded content pack v%s with %d languages from %s", version, len(index), self.path)
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self._checked < self.reload_interval:
+            return
+        self._checked = now
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return
+        if mtime != self._mtime:
+            try:
+                self.load()
+            except Exception as e:
+                self._mtime = mtime
+                logger.error("Keeping previous content pack, reload of %s failed: %s", self.path, e)
+
+    def languages(self):
+        self._maybe_reload()
+        return tuple(self._index)
+
+    def get(self, language, key, default=None):
+        """`key` for `language`, falling back to the English entry, then `default`."""
+        self._maybe_reload()
+        index = self._index
+        registered = resolve_language(language)
+        for code in ((registered or DEFAULT_LANGUAGE).code, DEFAULT_LANGUAGE.code):
+            entry = index.get(code)
+            if entry is not None and entry.get(key) is not None:
+                return entry[key]
+        return default
+
+
+content_pack = ContentPack()
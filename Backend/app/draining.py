@@ -0,0 +1,67 @@
+"""
+uvicorn server and gunicorn worker that postpone shutdown on SIGTERM.
+
+uvicorn registers `Server.handle_exit` with `loop.add_signal_handler`, so a
+handler chained through `signal.signal` never sees SIGTERM first. The delay
+therefore lives in `handle_exit` itself: the first SIGTERM flips /readyz to
+503 at once and the real exit (stop accepting, finish in-flight requests)
+follows DRAIN_DELAY_SECONDS later, giving the load balancer time to stop
+routing new requests here. A second SIGTERM, or SIGINT, exits without waiting.
+
+Under gunicorn the delay counts against GRACEFUL_TIMEOUT, after which the
+master kills the worker, so keep it well below that.
+"""
+import asyncio
+import signal
+import sys
+
+import uvicorn
+
+from app import lifecycle
+
+try:
+    from gunicorn.arbiter import Arbiter
+    from uvicorn.workers import UvicornWorker
+except ImportError:  # No gunicorn (e.g. Windows): uvicorn's own process manager only
+    UvicornWorker = None
+
+
+class DrainingServer(uvicorn.Server):
+    def __init__(self, config, drain_delay=None):
+        super().__init__(config)
+        self.drain_delay = lifecycle.DRAIN_DELAY_SECONDS if drain_delay is None else drain_delay
+        self._drain_timer = None
+
+    def handle_exit(self, sig, frame):
+        lifecycle.mark_draining()
+        if sig == signal.SIGTERM and self.drain_delay > 0 and self._drain_timer is None and not self.should_exit:
+            loop = asyncio.get_event_loop()
+            # Thread-safe: on Windows this runs as a plain signal handler
+            self._drain_timer = loop.call_soon_threadsafe(
+                loop.call_later, self.drain_delay, super().handle_exit, sig, frame
+            )
+            return
+        super().handle_exit(sig, frame)
+
+
+if UvicornWorker is not None:
+    class DrainingUvicornWorker(UvicornWorker):
+        async def _serve(self):
+            # UvicornWorker._serve with the draining server
+            self.config.app = self.wsgi
+            server = DrainingServer(config=self.config)
+            self._install_sigquit_handler()
+            await server.serve(sockets=self.sockets)
+            if not server.started:
+                sys.exit(Arbiter.WORKER_BOOT_ERROR)
+
+
+def run(config):
+    """uvicorn.run for an already built Config, with the draining server."""
+    server = DrainingServer(config=config)
+    if config.workers > 1:
+        from uvicorn.supervisors import Multiprocess
+
+        Multiprocess(config, target=server.run, sockets=[config.bind_socket()]).run()
+    else:
+        server.run()
@@ -0,0 +1,46 @@
+"""
+Conditional GET helpers: entity tags and 304 Not Modified responses.
+"""
+import hashlib
+
+from fastapi import Response
+
+from app.responses import dumps
+
+PRIVATE_REVALIDATE = "private, no-cache"
+
+
+def etag_for(body):
+    return '"' + hashlib.sha1(body).hexdigest() + '"'
+
+
+def _opaque(etag):
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def etag_matches(request, etag):
+    """True when the request's If-None-Match already names `etag` (weak comparison)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return _opaque(etag) in (_opaque(candidate.strip()) for candidate in header.split(","))
+
+
+def not_modified(etag, cache_control=PRIVATE_REVALIDATE):
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+
+
+def conditional_json(request, content, cache_control=PRIVATE_REVALIDATE):
+    """
+    Serialize `content` once, tag it with a content hash, and answer 304
+    without a body when the client sent that tag in If-None-Match. The tag is
+    weak because CompressionMiddleware may re-encode the body on the way out.
+    """
+    body = dumps(content)
+    etag = "W/" + etag_for(body)
+    if etag_matches(request, etag):
+        return not_modified(etag, cache_control)
+    return Response(content=body, media_type="application/json",
+                    headers={"ETag": etag, "Cache-Control": cache_control})
@@ -0,0 +1,223 @@
+"""
+Local language identification for validating model output.
+
+Script is decided from a sorted codepoint-range table (one bisect per
+non-ASCII character). Latin-script languages are told apart with a small
+trigram profile per language plus a few distinctive letters. Everything is
+precomputed at import, so a check on a chat reply takes microseconds.
+"""
+from bisect import bisect_right
+
+from app.languages import DEVANAGARI, HAN, HANGUL, KANA, LATIN, SCRIPT_RANGES, resolve_language
+
+_RANGE_STARTS = tuple(start for start, _, _ in SCRIPT_RANGES)
+_NON_LATIN_LETTERS = ('×', '÷')
+
+# The most frequent word-boundary trigrams per language ('_' marks a word edge).
+_TRIGRAM_PROFILES = {
+    "en": (
+        "_th the he_ _an and nd_ _to to_ _of of_ ing ng_ _in _is is_ _yo you ou_ "
+        "_a_ ed_ er_ _it it_ hat _wh _ha _be re_ _wa _fo for or_ at_ _i_ _wi ith "
+        "_ca _do _wo ere _we _li ike ly_ _so"
+    ),
+    "es": (
+        "_de de_ _la la_ _qu que ue_ _el el_ _en en_ os_ _lo as_ _es es_ _co con "
+        "_un ado ión ón_ _po ara _pa par _se _me mos _te est _mu muy uy_ _gr gra "
+        "aci cia ía_ _y_ _có cóm _ho hol ola _di"
+    ),
+    "fr": (
+        "_le le_ _de de_ _la la_ es_ _et et_ ent nt_ _qu que ue_ _un _je je_ _vo "
+        "vou ous us_ _pa pas _ce _es est st_ _po our ur_ _ne _su _mo ion on_ "
+        "_ça _bo bon _me mer _tr tre _vi eux ais"
+    ),
+    "de": (
+        "_de der er_ die ie_ _di und nd_ _un ein _ei en_ ich ch_ _ic sch _sc "
+        "_da das _ni nic cht ht_ _is ist st_ _zu _wi _si sie _es _ge gen _mi "
+        "mit _au auf _ha hab _ke ung _we"
+    ),
+    "it": (
+        "_di di_ _il il_ _ch che he_ _la la_ _co con _è_ _un _pe per _in no_ "
+        "to_ re_ _no _so ono _ci cia iao ao_ _gr gra zie _mi _st sta _ve _tu "
+        "_ma _qu are ere ire io_ _be"
+    ),
+}
+# trigram -> languages whose profile contains it, so each trigram is one lookup.
+_TRIGRAM_LANGUAGES = {}
+for _language, _profile in _TRIGRAM_PROFILES.items():
+    for _trigram in _profile.split():
+        _TRIGRAM_LANGUAGES[_trigram] = _TRIGRAM_LANGUAGES.get(_trigram, ()) + (_language,)
+del _language, _profile, _trigram
+
+# Letters that only occur in one of the supported Latin-script languages.
+_DISTINCTIVE_LETTERS = {
+    "ñ": "es", "¿": "es", "¡": "es",
+    "ß": "de", "ä": "de", "ö": "de", "ü": "de",
+    "ç": "fr", "œ": "fr", "ê": "fr", "â": "fr", "î": "fr", "ô": "fr", "û": "fr", "ë": "fr", "ï": "fr",
+    "ì": "it", "ò": "it",
+}
+
+# Common characters that differ between Simplified and Traditional Chinese,
+# listed pairwise.
+_CHINESE_VARIANT_PAIRS = (
+    "这這 们們 说說 会會 个個 来來 时時 国國 对對 么麼 为為 过過 还還 没沒 请請 谢謝 "
+    "吗嗎 问問 欢歡 见見 话話 东東 车車 钱錢 书書 学學 习習 语語 气氣 电電 后後 "
+    "开開 关關 让讓 觉覺 产產 业業 发發 经經 实實 现現 应應 该該 题題 点點 买買 卖賣"
+)
+_SIMPLIFIED_ONLY = frozenset(pair[0] for pair in _CHINESE_VARIANT_PAIRS.split())
+_TRADITIONAL_ONLY = frozenset(pair[1] for pair in _CHINESE_VARIANT_PAIRS.split())
+
+MIN_LATIN_LETTERS = 12
+# matches_language fails open: a Latin-script reply is only rejected when it
+# is long enough to judge and the winning language clearly beats the
+# runner-up. Suggestion-length sentences share too many trigrams across
+# en/es/fr/de/it for anything shorter to be reliable.
+MIN_LATIN_LETTERS_TO_REJECT = 40
+MIN_SCORE_RATIO = 2.0
+MIN_SCORE_MARGIN = 4
+# Japanese sentences longer than this are never written in kanji alone.
+MAX_KANJI_ONLY_JAPANESE = 8
+MAX_SCAN_CHARS = 400
+
+
+def script_of(char):
+    """Script of a single character, or None for digits, punctuation and symbols."""
+    if char < '\x80':
+        return LATIN if char.isalpha() else None
+    if char in _NON_LATIN_LETTERS:
+        return None
+    cp = ord(char)
+    index = bisect_right(_RANGE_STARTS, cp) - 1
+    if index >= 0:
+        first, last, script = SCRIPT_RANGES[index]
+        if cp <= last:
+            return script
+    return None
+
+
+def script_counts(text):
+    """Count letters per script in the first MAX_SCAN_CHARS characters of `text`."""
+    counts = {}
+    for char in text[:MAX_SCAN_CHARS]:
+        script = script_of(char)
+        if script is not None:
+            counts[script] = counts.get(script, 0) + 1
+    return counts
+
+
+def _latin_scores(text):
+    """(letters, [(language, score)] best first) for the Latin-script profiles."""
+    lowered = text[:MAX_SCAN_CHARS].lower()
+    scores = dict.fromkeys(_TRIGRAM_PROFILES, 0)
+
+    for char, language in _DISTINCTIVE_LETTERS.items():
+        if char in lowered:
+            scores[language] += 3
+
+    letters = 0
+    for word in lowered.split():
+        word = word.strip(".,!?;:\"'()«»“”‘’-")
+        if not word:
+            continue
+        letters += len(word)
+        padded = f"_{word}_"
+        for i in range(len(padded) - 2):
+            for language in _TRIGRAM_LANGUAGES.get(padded[i:i + 3], ()):
+                scores[language] += 1
+
+    return letters, sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+def _latin_language(text):
+    """Best-scoring Latin-script language, or None if the text is too short to tell."""
+    letters, ranked = _latin_scores(text)
+    if letters < MIN_LATIN_LETTERS:
+        return None
+    best, score = ranked[0]
+    return best if score > 0 else None
+
+
+def _confident_latin_language(text):
+    """The Latin-script language only when the text is long and the margin clear, else None."""
+    letters, ranked = _latin_scores(text)
+    if letters < MIN_LATIN_LETTERS_TO_REJECT:
+        return None
+    (best, top), (_, runner_up) = ranked[0], ranked[1]
+    if top < runner_up * MIN_SCORE_RATIO or top - runner_up < MIN_SCORE_MARGIN:
+        return None
+    return best
+
+
+def _chinese_variant(text):
+    simplified = traditional = 0
+    for char in text[:MAX_SCAN_CHARS]:
+        if char in _SIMPLIFIED_ONLY:
+            simplified += 1
+        elif char in _TRADITIONAL_ONLY:
+            traditional += 1
+    if simplified > traditional:
+        return "zh-CN"
+    if traditional > simplified:
+        return "zh-TW"
+    return None
+
+
+def detect_language(text):
+    """
+    Best guess at the language of `text` as a registry code ("en", "zh-TW", ...),
+    or None when there is not enough signal.
+    """
+    if not text:
+        return None
+    counts = script_counts(text)
+    if not counts:
+        return None
+
+    if counts.get(KANA):
+        return "ja"
+    dominant = max(counts, key=counts.get)
+    if dominant == HANGUL:
+        return "ko"
+    if dominant == DEVANAGARI:
+        return "hi"
+    if dominant == HAN:
+        return _chinese_variant(text) or "zh-CN"
+    return _latin_language(text)
+
+
+def matches_language(text, language):
+    """
+    True unless `text` is confidently in a different language than `language`.
+
+    Short or script-less text passes, and Japanese may be written entirely in
+    kanji, so only clear evidence of another language counts as a mismatch.
+    """
+    registered = resolve_language(language)
+    if not text or registered is None:
+        return True
+    language, expected_script = registered.code, registered.script
+
+    counts = script_counts(text)
+    total = sum(counts.values())
+    if not total:
+        return True
+
+    if language == "ja":
+        if not counts.get(KANA) and counts.get(HAN, 0) > MAX_KANJI_ONLY_JAPANESE:
+            return False
+        native = counts.get(KANA, 0) + counts.get(HAN, 0)
+    else:
+        native = counts.get(expected_script, 0)
+    if native * 2 < total:
+        return False
+
+    if expected_script == HAN:
+        if counts.get(KANA) or counts.get(HANGUL):
+            return False
+        variant = _chinese_variant(text)
+        return variant is None or variant == language
+
+    if expected_script == LATIN:
+        detected = _confident_latin_language(text)
+        return detected is None or detected == language
+
+    return True
@@ -0,0 +1,219 @@
+"""
+Registry of the languages the app supports.
+
+Every handler resolves user-supplied language values ("zh-cn", "Chinese",
+"ja-JP", ...) through `get_language`, so prompts, TTS, speech recognition,
+cache keys and fallback suggestions all agree on one canonical code. The
+registry is built once at import and is read-only.
+"""
+from dataclasses import dataclass
+from types import MappingProxyType
+
+LATIN = "latin"
+HAN = "han"
+KANA = "kana"
+HANGUL = "hangul"
+DEVANAGARI = "devanagari"
+
+# (first, last, script), sorted by first codepoint. ASCII letters are Latin.
+SCRIPT_RANGES = (
+    (0x00C0, 0x024F, LATIN),
+    (0x0900, 0x097F, DEVANAGARI),
+    (0x1100, 0x11FF, HANGUL),
+    (0x1E00, 0x1EFF, LATIN),
+    (0x3040, 0x30FF, KANA),
+    (0x3130, 0x318F, HANGUL),
+    (0x31F0, 0x31FF, KANA),
+    (0x3400, 0x4DBF, HAN),
+    (0x4E00, 0x9FFF, HAN),
+    (0xA8E0, 0xA8FF, DEVANAGARI),
+    (0xA960, 0xA97F, HANGUL),
+    (0xAC00, 0xD7AF, HANGUL),
+    (0xF900, 0xFAFF, HAN),
+    (0xFF66, 0xFF9F, KANA),
+)
+
+
+@dataclass(frozen=True)
+class Language:
+    code: str
+    name: str
+    script: str
+    tts_code: str
+    asr_code: str
+    aliases: tuple = ()
+    tts_tld: str = "com"
+    tts_slow: bool = False
+    default_suggestions: tuple = ()
+    fallback_suggestions: tuple = ()
+
+
+_LANGUAGES = (
+    Language(
+        code="en", name="English", script=LATIN, tts_code="en", asr_code="en-US",
+        aliases=("english", "en-us", "en-gb"),
+        default_suggestions=(
+            "Tell me more about that.", "What do you think about this?", "Can you explain that further?",
+        ),
+        fallback_suggestions=(
+            "I understand what you're saying.", "That's interesting. Can you tell me more?",
+            "I agree with your perspective.", "What do you think about this?",
+        ),
+    ),
+    Language(
+        code="zh-CN", name="Chinese (Simplified)", script=HAN, tts_code="zh-CN", asr_code="zh-CN",
+        aliases=("zh", "chinese", "chinese (simplified)", "simplified chinese", "zh-hans"),
+        tts_slow=True,
+        default_suggestions=("告诉我更多关于那个的信息。", "你对这个有什么想法？", "你能进一步解释一下吗？"),
+        fallback_suggestions=("我理解你的意思。", "真有意思，能告诉我更多吗？", "我同意你的观点。", "你对此有什么看法？"),
+    ),
+    Language(
+        code="zh-TW", name="Chinese (Traditional)", script=HAN, tts_code="zh-TW", asr_code="zh-TW",
+        aliases=("chinese (traditional)", "traditional chinese", "chinese traditional", "zh-hant"),
+        tts_slow=True,
+        default_suggestions=("告訴我更多關於那個的信息。", "你對這個有什麼想法？", "你能進一步解釋一下嗎？"),
+        fallback_suggestions=("我理解你的意思。", "真有意思，能告訴我更多嗎？", "我同意你的觀點。", "你對此有什麼看法？"),
+    ),
+    Language(
+        code="ja", name="Japanese", script=KANA, tts_code="ja", asr_code="ja-JP",
+        aliases=("japanese", "ja-jp"),
+        tts_slow=True,
+        default_suggestions=(
+            "それについてもっと教えてください。", "これについてどう思いますか？", "もう少し詳しく説明してもらえますか？",
+        ),
+        fallback_suggestions=(
+            "あなたの言っていることは理解できます。", "それは面白いですね。もっと教えてください。",
+            "あなたの視点に同意します。", "これについてどう思いますか？",
+        ),
+    ),
+    Language(
+        code="ko", name="Korean", script=HANGUL, tts_code="ko", asr_code="ko-KR",
+        aliases=("korean", "ko-kr"),
+        tts_slow=True,
+        default_suggestions=(
+            "그것에 대해 더 자세히 알려주세요.", "이것에 대해 어떻게 생각하세요?", "더 자세히 설명해 주시겠어요?",
+        ),
+        fallback_suggestions=(
+            "당신이 말하는 것을 이해합니다.", "흥미롭네요. 더 자세히 알려주시겠어요?",
+            "당신의 관점에 동의합니다.", "이것에 대해 어떻게 생각하세요?",
+        ),
+    ),
+    Language(
+        code="es", name="Spanish", script=LATIN, tts_code="es", asr_code="es-ES",
+        aliases=("spanish", "es-es", "es-mx"),
+        tts_tld="es",
+        default_suggestions=(
+            "Cuéntame más sobre eso.", "¿Qué piensas sobre esto?", "¿Puedes explicar eso con más detalle?",
+        ),
+        fallback_suggestions=(
+            "Entiendo lo que estás diciendo.", "Eso es interesante. ¿Puedes contarme más?",
+            "Estoy de acuerdo con tu perspectiva.", "¿Qué piensas sobre esto?",
+        ),
+    ),
+    Language(
+        code="fr", name="French", script=LATIN, tts_code="fr", asr_code="fr-FR",
+        aliases=("french", "fr-fr"),
+        tts_tld="fr",
+        default_suggestions=(
+            "Parlez-moi davantage de cela.", "Que pensez-vous de ceci?", "Pouvez-vous expliquer cela plus en détail?",
+        ),
+        fallback_suggestions=(
+            "Je comprends ce que tu dis.", "C'est intéressant. Peux-tu m'en dire plus ?",
+            "Je suis d'accord avec ton point de vue.", "Qu'en penses-tu ?",
+        ),
+    ),
+    Language(
+        code="de", name="German", script=LATIN, tts_code="de", asr_code="de-DE",
+        aliases=("german", "de-de"),
+        tts_tld="de",
+        default_suggestions=(
+            "Erzählen Sie mir mehr darüber.", "Was denken Sie darüber?", "Können Sie das genauer erklären?",
+        ),
+        fallback_suggestions=(
+            "Ich verstehe, was du sagst.", "Das ist interessant. Kannst du mir mehr darüber erzählen?",
+            "Ich stimme deiner Perspektive zu.", "Was denkst du darüber?",
+        ),
+    ),
+    Language(
+        code="it", name="Italian", script=LATIN, tts_code="it", asr_code="it-IT",
+        aliases=("italian", "it-it"),
+        default_suggestions=(
+            "Dimmi di più a riguardo.", "Cosa ne pensi di questo?", "Puoi spiegarlo più dettagliatamente?",
+        ),
+        fallback_suggestions=(
+            "Capisco quello che stai dicendo.", "È interessante. Puoi dirmi di più?",
+            "Sono d'accordo con la tua prospettiva.", "Cosa ne pensi di questo?",
+        ),
+    ),
+    Language(
+        code="hi", name="Hindi", script=DEVANAGARI, tts_code="hi", asr_code="hi-IN",
+        aliases=("hindi", "hi-in"),
+        tts_slow=True,
+        default_suggestions=(
+            "मुझे इसके बारे में और बताओ।", "आप इसके बारे में क्या सोचते हैं?", "क्या आप इसे और विस्तार से समझा सकते हैं?",
+        ),
+        fallback_suggestions=(
+            "मुझे इस बारे में अधिक जानना अच्छा लगेगा।", "क्या आप इसे बेहतर ढंग से समझा सकते हैं?",
+            "दिलचस्प, कृपया जारी रखें।", "आप इसके बारे में क्या सोचते हैं?",
+        ),
+    ),
+)
+
+LANGUAGES = MappingProxyType({language.code: language for language in _LANGUAGES})
+DEFAULT_LANGUAGE = LANGUAGES["en"]
+
+# Lowercased code, name and every alias -> Language.
+_BY_ALIAS = MappingProxyType({
+    key: language
+    for language in _LANGUAGES
+    for key in (language.code.lower(), language.name.lower(), *language.aliases)
+})
+
+
+def resolve_language(value):
+    """The registered Language for a code, name or alias, or None if unknown."""
+    if not value:
+        return None
+    if isinstance(value, Language):
+        return value
+    return _BY_ALIAS.get(str(value).strip().lower())
+
+
+def get_language(value):
+    """Like resolve_language, but falls back to English for empty or unknown values."""
+    return resolve_language(value) or DEFAULT_LANGUAGE
+
+
+def normalize_language(value):
+    """
+    Canonical code for a language value ("zh-cn" -> "zh-CN", "Japanese" -> "ja").
+    Empty values become "en"; unknown values are returned stripped, unchanged.
+    """
+    if not value:
+        return DEFAULT_LANGUAGE.code
+    language = resolve_language(value)
+    return language.code if language else str(value).strip()
+
+
+def get_default_suggestions(value):
+    return {"suggestions": list(get_language(value).default_suggestions)}
+
+
+def get_fallback_suggestions(value):
+    return list(get_language(value).fallback_suggestions)
+
+
+def pick_localized(entries, value):
+    """
+    The entry of a {language label: entry} mapping (e.g. DEFAULT_SCENARIOS)
+    for `value`, matching labels by resolved language; English otherwise.
+    """
+    language = get_language(value)
+    fallback = None
+    for label, entry in entries.items():
+        resolved = resolve_language(label)
+        if resolved is language:
+            return entry
+        if resolved is DEFAULT_LANGUAGE:
+            fallback = entry
+    return fallback
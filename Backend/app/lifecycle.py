@@ -0,0 +1,55 @@
+"""
+Process lifecycle state behind the /healthz and /readyz endpoints.
+
+A worker reports ready once startup has finished and stops reporting ready as
+soon as it receives SIGTERM, so the load balancer takes it out of rotation
+while in-flight requests drain. With DRAIN_DELAY_SECONDS set, the server's own
+shutdown is postponed by that long after the readiness flip (see
+app.draining, which server.py runs the app under).
+"""
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DRAIN_DELAY_SECONDS = float(os.getenv("DRAIN_DELAY_SECONDS", "0"))
+
+started_at = time.time()
+_ready = threading.Event()
+_draining = threading.Event()
+_readiness_checks = {}
+
+
+def mark_ready():
+    _ready.set()
+    logger.info("Worker %s ready after %.2fs", os.getpid(), time.time() - started_at)
+
+
+def mark_draining():
+    if not _draining.is_set():
+        logger.info("Worker %s draining", os.getpid())
+    _draining.set()
+
+
+def is_draining():
+    return _draining.is_set()
+
+
+def add_readiness_check(name, check):
+    """Register `check()` -> bool, evaluated on every /readyz call."""
+    _readiness_checks[name] = check
+
+
+def readiness():
+    """(ready, {check name: passed}) for this worker."""
+    checks = {"started": _ready.is_set(), "not_draining": not _draining.is_set()}
+    for name, check in _readiness_checks.items():
+        try:
+            checks[name] = bool(check())
+        except Exception as e:
+            logger.warning("Readiness check %s failed: %s", name, e)
+            checks[name] = False
+    return all(checks.values()), checks
+
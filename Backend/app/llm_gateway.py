@@ -0,0 +1,127 @@
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+
+import anyio
+
+from app import metrics
+from app.llm_policy import UpstreamPolicy
+
+logger = logging.getLogger(__name__)
+
+
+def prompt_key(kwargs):
+    """Canonical hash of a chat completion request."""
+    canonical = json.dumps(kwargs, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _on_event_loop():
+    """True when called from a thread that is running an asyncio event loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+class _InFlightCall:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls with the same key into one execution.
+
+    The first caller runs the function; callers that arrive while it is still
+    in flight wait for it and receive the same result (or exception).
+
+    Waiting blocks the calling thread, so only worker threads coalesce. A
+    call made on an event loop thread runs on its own: parking it on a
+    threading.Event would stall every other request on that loop, or
+    deadlock if the leader needs the same loop to finish. Async code should
+    go through `create_async`, which runs the call on a worker thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, **labels):
+        if _on_event_loop():
+            metrics.increment("llm_requests_issued_total", **labels)
+            metrics.increment("llm_requests_on_event_loop_total", **labels)
+            return fn()
+
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _InFlightCall()
+                self._calls[key] = call
+
+        if not leader:
+            metrics.increment("llm_requests_coalesced_total", **labels)
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        metrics.increment("llm_requests_issued_total", **labels)
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+
+class _Completions:
+    def __init__(self, gateway):
+        self._gateway = gateway
+
+    def create(self, **kwargs):
+        return self._gateway.create_chat_completion(**kwargs)
+
+    async def create_async(self, **kwargs):
+        """Run `create` on a worker thread so identical requests can coalesce."""
+        return await anyio.to_thread.run_sync(lambda: self.create(**kwargs))
+
+
+class _Chat:
+    def __init__(self, gateway):
+        self.completions = _Completions(gateway)
+
+
+class CoalescingClient:
+    """
+    Drop-in wrapper around an OpenAI client that de-duplicates identical
+    in-flight `chat.completions.create` calls and runs the upstream call under
+    the retry / rate-limit / circuit-breaker policy.
+    """
+
+    def __init__(self, client, policy=None):
+        self._client = client
+        self._flight = SingleFlight()
+        self.policy = policy or UpstreamPolicy()
+        self.chat = _Chat(self)
+
+    def create_chat_completion(self, **kwargs):
+        key = prompt_key(kwargs)
+        return self._flight.do(
+            key,
+            lambda: self.policy.call(lambda: self._client.chat.completions.create(**kwargs), **kwargs),
+            model=kwargs.get("model", "unknown")
+        )
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
@@ -0,0 +1,250 @@
+import logging
+import os
+import random
+import threading
+import time
+
+import openai
+
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+DEFAULT_TOKENS_PER_MINUTE = {
+    "gpt-4": 40000,
+    "gpt-3.5-turbo": 160000,
+}
+
+
+class CircuitOpenError(Exception):
+    """Raised when the breaker for a model is open and calls are short-circuited."""
+
+
+class RateLimitTimeout(Exception):
+    """Raised when the local token budget would not free up in time."""
+
+
+def is_client_error(error):
+    """A 4xx the upstream answered deliberately (bad request, auth, ...): not an outage."""
+    status = getattr(error, "status_code", None)
+    return status is not None and 400 <= status < 500 and status not in RETRYABLE_STATUS_CODES
+
+
+def is_retryable(error):
+    if isinstance(error, (openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    return getattr(error, "status_code", None) in RETRYABLE_STATUS_CODES
+
+
+def retry_after_seconds(error):
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def estimate_tokens(kwargs):
+    """Rough prompt + completion token estimate used before the call is made."""
+    prompt_chars = sum(len(str(m.get("content", ""))) for m in kwargs.get("messages", []))
+    return prompt_chars // 4 + int(kwargs.get("max_tokens") or 256)
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at `tokens_per_minute / 60` per second."""
+
+    def __init__(self, tokens_per_minute):
+        self.capacity = float(tokens_per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, tokens, max_wait=10.0):
+        """Take `tokens` from the bucket, waiting up to `max_wait` seconds."""
+        tokens = min(float(tokens), self.capacity)
+        deadline = time.monotonic() + max_wait
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            if time.monotonic() + wait > deadline:
+                raise RateLimitTimeout(f"Token budget exhausted, need {wait:.1f}s")
+            time.sleep(min(wait, 1.0))
+
+    def reconcile(self, estimated, actual):
+        """Correct the bucket once the real `usage.total_tokens` is known."""
+        with self._lock:
+            self._refill()
+            self.tokens -= actual - estimated
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure breaker. After `failure_threshold` failures it opens for
+    `recovery_timeout` seconds, then lets a single probe through (half-open).
+    """
+
+    def __init__(self, name, failure_threshold=5, recovery_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.state == "open":
+                if time.monotonic() - self.opened_at < self.recovery_timeout:
+                    metrics.increment("llm_circuit_rejected_total", model=self.name)
+                    raise CircuitOpenError(f"Circuit for {self.name} is open")
+                self.state = "half_open"
+            if self.state == "half_open":
+                if self._probe_in_flight:
+                    metrics.increment("llm_circuit_rejected_total", model=self.name)
+                    raise CircuitOpenError(f"Circuit for {self.name} is half-open")
+                self._probe_in_flight = True
+
+    def release(self):
+        """Give up a half-open probe slot without counting a success or failure."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != "closed":
+                logger.info("Circuit for %s closed", self.name)
+            self.state = "closed"
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    logger.warning("Circuit for %s opened after %s failures", self.name, self.failures)
+                    metrics.increment("llm_circuit_opened_total", model=self.name)
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+def _tokens_per_minute_from_env():
+    limits = dict(DEFAULT_TOKENS_PER_MINUTE)
+    for item in os.getenv("OPENAI_TPM_LIMITS", "").split(","):
+        if "=" in item:
+            model, value = item.split("=", 1)
+            try:
+                limits[model.strip()] = int(value)
+            except ValueError:
+                logger.warning("Ignoring invalid OPENAI_TPM_LIMITS entry: %s", item)
+    return limits
+
+
+class UpstreamPolicy:
+    """
+    Retry, per-model rate limiting and circuit breaking for upstream LLM calls.
+
+    `call` sleeps between retries and while waiting for tokens, so it must run
+    on a worker thread: async handlers go through `create_async` or
+    `ModelRouter.complete_async`, never the synchronous client directly.
+    """
+
+    def __init__(self, max_attempts=None, base_delay=0.5, max_delay=8.0,
+                 tokens_per_minute=None, failure_threshold=5, recovery_timeout=30.0):
+        self.max_attempts = max_attempts or int(os.getenv("OPENAI_MAX_ATTEMPTS", "3"))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.tokens_per_minute = tokens_per_minute or _tokens_per_minute_from_env()
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._buckets = {}
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, model):
+        with self._lock:
+            if model not in self._buckets:
+                self._buckets[model] = TokenBucket(self.tokens_per_minute.get(model, 90000))
+            return self._buckets[model]
+
+    def breaker(self, model):
+        with self._lock:
+            if model not in self._breakers:
+                self._breakers[model] = CircuitBreaker(model, self.failure_threshold, self.recovery_timeout)
+            return self._breakers[model]
+
+    def backoff(self, attempt, error=None):
+        """Full-jitter exponential backoff, honouring Retry-After when present."""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        hinted = retry_after_seconds(error) if error is not None else None
+        if hinted is not None:
+            delay = max(delay, min(hinted, self.max_delay))
+        return delay
+
+    def call(self, fn, **kwargs):
+        model = kwargs.get("model", "unknown")
+        breaker = self.breaker(model)
+        bucket = self.bucket(model)
+        estimated = estimate_tokens(kwargs)
+
+        breaker.before_call()
+
+        attempt = 0
+        while True:
+            try:
+                bucket.acquire(estimated)
+            except RateLimitTimeout:
+                breaker.release()
+                metrics.increment("llm_rate_limited_local_total", model=model)
+                raise
+            started = time.perf_counter()
+            try:
+                with metrics.in_flight("llm_requests_in_flight", model=model):
+                    response = fn()
+            except Exception as e:
+                metrics.observe("llm_call_duration_seconds", time.perf_counter() - started, model=model, outcome="error")
+                bucket.reconcile(estimated, 0)
+                attempt += 1
+                if is_client_error(e):
+                    # The upstream is healthy, the request was rejected: don't trip the breaker
+                    breaker.release()
+                    metrics.increment("llm_client_errors_total", model=model)
+                    raise
+                if not is_retryable(e) or attempt >= self.max_attempts:
+                    breaker.record_failure()
+                    metrics.increment("llm_upstream_failures_total", model=model)
+                    raise
+                delay = self.backoff(attempt, e)
+                metrics.increment("llm_retries_total", model=model)
+                logger.warning("Retrying %s call in %.2fs after %s (attempt %s)", model, delay, type(e).__name__, attempt)
+                time.sleep(delay)
+                continue
+
+            metrics.observe("llm_call_duration_seconds", time.perf_counter() - started, model=model, outcome="ok")
+            usage = getattr(response, "usage", None)
+            actual = getattr(usage, "total_tokens", None)
+            if actual is not None:
+                bucket.reconcile(estimated, actual)
+                metrics.increment("llm_tokens_total", actual, model=model)
+                metrics.increment("llm_prompt_tokens_total", getattr(usage, "prompt_tokens", 0) or 0, model=model)
+                metrics.increment("llm_completion_tokens_total", getattr(usage, "completion_tokens", 0) or 0, model=model)
+            breaker.record_success()
+            return response
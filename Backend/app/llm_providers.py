@@ -0,0 +1,321 @@
+"""
+Chat completion providers behind the OpenAI-shaped `client.chat.completions`
+interface the rest of the app uses.
+
+    LLM_PROVIDER=openai       (default) the OpenAI API
+    LLM_PROVIDER=llama_cpp    a local GGUF model through llama-cpp-python
+
+Local model settings:
+
+    LLAMA_MODEL_PATH          GGUF file (required)
+    LLAMA_CTX=4096            context window
+    LLAMA_THREADS             CPU threads per replica (default: cores / replicas)
+    LLAMA_REPLICAS=1          model copies per worker, each serving one sequence
+    LLAMA_CACHE_MB=512        RAM for per-conversation KV snapshots, shared by replicas
+    LLAMA_QUEUE_SIZE=64       waiting requests before callers get a 503
+    LLAMA_TIMEOUT=120         seconds a caller waits for its completion
+
+The pinned llama-cpp-python evaluates one sequence per model instance, so
+requests from different users cannot share a forward pass. Instead a
+scheduler feeds every replica from one queue and hands each free replica the
+waiting request that shares the longest prompt prefix with what that replica
+evaluated last. Follow-up turns of a conversation therefore land where the
+conversation's KV state already is, and only the new tokens are evaluated.
+A request that has waited longer than MAX_AFFINITY_WAIT is served next
+regardless, so affinity cannot starve anyone.
+
+When a turn does land elsewhere, or the replica has since served other
+conversations, ConversationKVCache supplies the KV state saved at the end of
+the conversation's previous turn. It keeps one snapshot per conversation (the
+latest turn supersedes the earlier ones) in an LRU bounded by LLAMA_CACHE_MB.
+This only pays off because the chat prompt is append-only: system prompt,
+then the history in order, then the new message, so every turn's tokens
+start with the previous turn's tokens.
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from types import SimpleNamespace
+
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+MAX_AFFINITY_WAIT = 0.5
+# Keyword arguments of chat.completions.create that llama.cpp understands
+_SAMPLING_ARGS = ("temperature", "top_p", "max_tokens", "stop", "presence_penalty", "frequency_penalty")
+
+
+class EngineBusy(Exception):
+    """The local request queue is full; retryable like an upstream 503."""
+    status_code = 503
+
+
+def _namespace(value):
+    if isinstance(value, dict):
+        return SimpleNamespace(**{key: _namespace(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return [_namespace(item) for item in value]
+    return value
+
+
+def _prefix_length(a, b):
+    length = min(len(a), len(b))
+    for i in range(length):
+        if a[i] != b[i]:
+            return i
+    return length
+
+
+def _conversation_key(prompt_key):
+    """A conversation is identified by its transcript up to the first user message."""
+    for end, (role, _) in enumerate(prompt_key, start=1):
+        if role == "user":
+            break
+    else:
+        end = len(prompt_key)
+    return hashlib.sha1(repr(prompt_key[:end]).encode("utf-8")).hexdigest()
+
+
+def _state_bytes(state):
+    scores = getattr(state, "scores", None)
+    return int(getattr(state, "llama_state_size", 0) or 0) + int(getattr(scores, "nbytes", 0) or 0)
+
+
+class ConversationKVCache:
+    """
+    LRU of llama.cpp KV states, one per conversation, under a byte budget.
+
+    Installed with `Llama.set_cache`, so llama.cpp calls it with token
+    sequences: it asks for the state to resume from before evaluating a
+    prompt, and stores the state after the completion. The replica thread
+    names the conversation it is serving in `self.active.conversation`, which
+    is how a token sequence is tied to a conversation. States are plain
+    bytes plus arrays, so one replica can resume a snapshot another saved.
+    """
+
+    def __init__(self, capacity_bytes):
+        self.capacity_bytes = capacity_bytes
+        self.active = threading.local()
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._size = 0
+
+    @property
+    def cache_size(self):
+        return self._size
+
+    def _conversation(self):
+        return getattr(self.active, "conversation", None)
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def __getitem__(self, key):
+        conversation = self._conversation()
+        with self._lock:
+            entry = self._entries.get(conversation)
+            if entry is not None:
+                self._entries.move_to_end(conversation)
+        reused = _prefix_length(entry[0], tuple(key)) if entry is not None else 0
+        if not reused:
+            metrics.increment("llm_local_kv_cache_total", result="miss")
+            raise KeyError(conversation)
+        metrics.increment("llm_local_kv_cache_total", result="hit")
+        metrics.observe("llm_local_kv_reused_tokens", reused, buckets=(0, 64, 256, 512, 1024, 2048, 4096, 8192))
+        return entry[1]
+
+    def __setitem__(self, key, state):
+        conversation = self._conversation()
+        if conversation is None:
+            return
+        size = _state_bytes(state)
+        if size > self.capacity_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(conversation, None)
+            if previous is not None:
+                self._size -= previous[2]
+            self._entries[conversation] = (tuple(key), state, size)
+            self._size += size
+            while self._size > self.capacity_bytes:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self._size -= evicted
+                metrics.increment("llm_local_kv_evictions_total")
+            metrics.set_gauge("llm_local_kv_cache_bytes", self._size)
+            metrics.set_gauge("llm_local_kv_cache_conversations", len(self._entries))
+
+
+class _Job:
+    __slots__ = ("kwargs", "prompt_key", "conversation", "future", "enqueued")
+
+    def __init__(self, kwargs):
+        self.kwargs = kwargs
+        # Role-tagged transcript, compared by prefix to pick a replica
+        self.prompt_key = tuple((m.get("role"), str(m.get("content", ""))) for m in kwargs.get("messages", []))
+        self.conversation = _conversation_key(self.prompt_key)
+        self.future = Future()
+        self.enqueued = time.monotonic()
+
+
+class LlamaCppEngine:
+    """One or more llama.cpp model replicas fed from a shared request queue."""
+
+    def __init__(self, model_path, replicas=1, n_ctx=4096, n_threads=None, cache_bytes=512 << 20,
+                 queue_size=64, model_name=None):
+        try:
+            import llama_cpp
+        except ImportError as e:
+            raise RuntimeError("LLM_PROVIDER=llama_cpp needs the llama-cpp-python package") from e
+
+        self.model_name = model_name or os.path.splitext(os.path.basename(model_path))[0]
+        self.queue_size = queue_size
+        self._pending = []
+        self._cond = threading.Condition()
+        self._closed = False
+        threads_each = n_threads or max(1, (os.cpu_count() or 1) // replicas)
+        self.kv_cache = ConversationKVCache(cache_bytes) if cache_bytes else None
+
+        self._replicas = []
+        for index in range(replicas):
+            started = time.perf_counter()
+            model = llama_cpp.Llama(model_path=model_path, n_ctx=n_ctx, n_threads=threads_each, verbose=False)
+            if self.kv_cache is not None:
+                model.set_cache(self.kv_cache)
+            replica = {"model": model, "last_prompt": (), "index": index}
+            replica["thread"] = threading.Thread(target=self._serve, args=(replica,),
+                                                 name=f"llama-replica-{index}", daemon=True)
+            self._replicas.append(replica)
+            logger.info("Loaded %s replica %d in %.1fs", self.model_name, index, time.perf_counter() - started)
+        for replica in self._replicas:
+            replica["thread"].start()
+
+    def submit(self, kwargs):
+        job = _Job(kwargs)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("llama.cpp engine is closed")
+            if len(self._pending) >= self.queue_size:
+                metrics.increment("llm_local_rejected_total")
+                raise EngineBusy(f"{len(self._pending)} local completions already waiting")
+            self._pending.append(job)
+            metrics.set_gauge("llm_local_queue_depth", len(self._pending))
+            self._cond.notify()
+        return job.future
+
+    def _next_job(self, replica):
+        """Oldest job if it has waited too long, otherwise the best prefix match."""
+        with self._cond:
+            while not self._pending and not self._closed:
+                self._cond.wait()
+            if self._closed:
+                return None
+            oldest = self._pending[0]
+            job = oldest
+            if time.monotonic() - oldest.enqueued < MAX_AFFINITY_WAIT and replica["last_prompt"]:
+                job = max(self._pending, key=lambda candidate: _prefix_length(candidate.prompt_key, replica["last_prompt"]))
+            self._pending.remove(job)
+            metrics.set_gauge("llm_local_queue_depth", len(self._pending))
+            return job
+
+    def _serve(self, replica):
+        model = replica["model"]
+        while True:
+            job = self._next_job(replica)
+            if job is None:
+                return
+            if not job.future.set_running_or_notify_cancel():
+                continue
+            metrics.observe("llm_local_queue_wait_seconds", time.monotonic() - job.enqueued)
+            last = replica["last_prompt"]
+            reused = _prefix_length(job.prompt_key, last)
+            affinity = "continuation" if last and reused == len(last) else "partial" if reused else "miss"
+            metrics.increment("llm_local_affinity_total", result=affinity)
+            if self.kv_cache is not None:
+                self.kv_cache.active.conversation = job.conversation
+            started = time.perf_counter()
+            try:
+                arguments = {key: job.kwargs[key] for key in _SAMPLING_ARGS if job.kwargs.get(key) is not None}
+                result = model.create_chat_completion(messages=job.kwargs["messages"], **arguments)
+                result["model"] = self.model_name
+                reply = result["choices"][0]["message"].get("content") or ""
+                # The model's context now ends with its own reply, which is
+                # exactly what the conversation's next turn starts with
+                replica["last_prompt"] = job.prompt_key + (("assistant", reply),)
+                job.future.set_result(_namespace(result))
+            except Exception as e:
+                replica["last_prompt"] = ()
+                job.future.set_exception(e)
+            finally:
+                metrics.observe("llm_local_generation_seconds", time.perf_counter() - started,
+                                replica=str(replica["index"]))
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            pending, self._pending = self._pending, []
+            self._cond.notify_all()
+        for job in pending:
+            job.future.cancel()
+
+
+class _LocalCompletions:
+    def __init__(self, client):
+        self._client = client
+
+    def create(self, **kwargs):
+        if kwargs.get("stream"):
+            raise ValueError("Streaming is not supported by the llama.cpp provider")
+        future = self._client.engine.submit(kwargs)
+        try:
+            return future.result(timeout=self._client.timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise TimeoutError(f"Local completion did not finish within {self._client.timeout:.0f}s")
+
+
+class LlamaCppClient:
+    """OpenAI-client lookalike (`chat.completions.create`) over a LlamaCppEngine."""
+
+    def __init__(self, engine, timeout=120.0):
+        self.engine = engine
+        self.timeout = timeout
+        self.chat = SimpleNamespace(completions=_LocalCompletions(self))
+
+    def close(self):
+        self.engine.close()
+
+
+def llama_cpp_from_env():
+    model_path = os.getenv("LLAMA_MODEL_PATH")
+    if not model_path:
+        raise RuntimeError("LLM_PROVIDER=llama_cpp requires LLAMA_MODEL_PATH")
+    engine = LlamaCppEngine(
+        model_path,
+        replicas=int(os.getenv("LLAMA_REPLICAS", "1")),
+        n_ctx=int(os.getenv("LLAMA_CTX", "4096")),
+        n_threads=int(os.getenv("LLAMA_THREADS", "0")) or None,
+        cache_bytes=int(os.getenv("LLAMA_CACHE_MB", "512")) << 20,
+        queue_size=int(os.getenv("LLAMA_QUEUE_SIZE", "64")),
+    )
+    return LlamaCppClient(engine, timeout=float(os.getenv("LLAMA_TIMEOUT", "120")))
+
+
+def create_client():
+    """The raw provider client selected by LLM_PROVIDER."""
+    provider = os.getenv("LLM_PROVIDER", "openai").lower()
+    if provider == "llama_cpp":
+        return llama_cpp_from_env()
+    if provider != "openai":
+        raise RuntimeError(f"Unknown LLM_PROVIDER: {provider}")
+    from openai import OpenAI
+    # Retries are handled by the gateway policy, so the SDK's own retry loop is disabled
+    return OpenAI(api_key=os.environ.get("OPENAI_API_KEY"), max_retries=0)
@@ -0,0 +1,183 @@
+"""
+Logging pipeline: request threads only enqueue records, a listener thread
+formats and writes them.
+
+    LOG_LEVEL=INFO                       root level
+    LOG_LEVELS=app.main=DEBUG,pymongo=WARNING
+                                         per-logger levels (also settable at runtime)
+    LOG_FORMAT=json|text                 json (default) is one object per line
+    LOG_MAX_MESSAGE_CHARS=500            longer messages are truncated, so user
+                                         text and model replies never land in full
+    LOG_QUEUE_SIZE=10000                 records beyond this are dropped, not waited on
+    LOG_SAMPLE_EVERY=100                 default rate for `extra=sampled()`
+
+Call sites use %-style arguments so a record below the effective level is
+discarded before any string is built. High-volume lines that are still worth
+seeing pass `extra=sampled()` and only every Nth record from that call site
+is kept.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+
+from app import metrics
+from app.tracing import TraceIdFilter
+
+MAX_MESSAGE_CHARS = int(os.getenv("LOG_MAX_MESSAGE_CHARS", "500"))
+QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+DEFAULT_SAMPLE_EVERY = int(os.getenv("LOG_SAMPLE_EVERY", "100"))
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - [%(trace_id)s] %(message)s"
+
+_listener = None
+_configure_lock = threading.Lock()
+
+
+def truncate(text, limit=MAX_MESSAGE_CHARS):
+    if limit and len(text) > limit:
+        return f"{text[:limit]}... [{len(text) - limit} more chars]"
+    return text
+
+
+def sampled(every=None):
+    """`extra=` for a log call that should only be kept once per `every` calls."""
+    return {"sample_every": every or DEFAULT_SAMPLE_EVERY}
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep one record in `record.sample_every` per call site; others pass
+    untouched. Kept records carry `sampled=N` so readers can scale counts.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        every = getattr(record, "sample_every", None)
+        if not every or every <= 1:
+            return True
+        site = (record.pathname, record.lineno)
+        with self._lock:
+            seen = self._seen.get(site, 0)
+            self._seen[site] = seen + 1
+        if seen % every == 0:
+            record.sampled = every
+            return True
+        return False
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Renders the message (truncated) and traceback in the calling thread, since
+    args and exc_info may not survive the hand-off, and leaves the rest of the
+    formatting to the listener. Drops the record when the queue is full.
+
+    It is the root logger's only handler, so the record is updated in place
+    rather than copied.
+    """
+
+    def prepare(self, record):
+        record.msg = truncate(record.getMessage())
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.increment("log_records_dropped_total")
+
+
+class JsonFormatter(logging.Formatter):
+    _FIELDS = ("trace_id", "sampled")
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for field in self._FIELDS:
+            value = getattr(record, field, None)
+            if value not in (None, "-"):
+                entry[field] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def _parse_levels(spec):
+    levels = {}
+    for item in (spec or "").split(","):
+        if "=" in item:
+            name, level = (part.strip() for part in item.split("=", 1))
+            levels[name] = level.upper()
+    return levels
+
+
+def set_level(name, level):
+    """Change one logger's level in this worker; `name` "" or "root" is the root logger."""
+    level = str(level).upper()
+    if not isinstance(logging.getLevelName(level), int):
+        raise ValueError(f"Unknown log level: {level}")
+    logging.getLogger(None if name in ("", "root") else name).setLevel(level)
+
+
+def get_levels():
+    """Explicitly configured levels, keyed by logger name."""
+    levels = {"root": logging.getLevelName(logging.getLogger().level)}
+    for name, logger in sorted(logging.root.manager.loggerDict.items()):
+        if isinstance(logger, logging.Logger) and logger.level != logging.NOTSET:
+            levels[name] = logging.getLevelName(logger.level)
+    return levels
+
+
+def configure_logging():
+    """Route the root logger through the queue. Safe to call more than once."""
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            return
+
+        output = logging.StreamHandler(sys.stdout)
+        if os.getenv("LOG_FORMAT", "json").lower() == "text":
+            output.setFormatter(logging.Formatter(TEXT_FORMAT))
+        else:
+            output.setFormatter(JsonFormatter())
+
+        handler = NonBlockingQueueHandler(queue.Queue(QUEUE_SIZE))
+        handler.addFilter(SamplingFilter())
+        handler.addFilter(TraceIdFilter())
+
+        root = logging.getLogger()
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(handler)
+        root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+        for name, level in _parse_levels(os.getenv("LOG_LEVELS")).items():
+            set_level(name, level)
+
+        _listener = logging.handlers.QueueListener(handler.queue, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
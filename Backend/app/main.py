@@ -1,7 +1,6 @@
 from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
+from fastapi.responses import FileResponse, RedirectResponse
 from pydantic import BaseModel
 from typing import Optional, List
 import os
@@ -10,71 +9,92 @@ import json
 from datetime import datetime
 import dotenv
 import re
-from openai import OpenAI
 from typing import Optional
 import random
 import time
-from prompts import SOUND_RESPONSE_DIR, LANGUAGE_MAP, DEFAULT_SCENARIOS
-from database.mongodb_manager import MongoDBManager
-from fastapi.responses import JSONResponse
+from prompts import SOUND_RESPONSE_DIR, DEFAULT_SCENARIOS
+from database.mongodb_manager import MongoDBManager, history_epoch
 from typing import Dict, List, Optional
 from fastapi import APIRouter, HTTPException, Body
 from pymongo import MongoClient
+from pymongo.errors import DuplicateKeyError
 from bson import ObjectId
 import json
-import traceback
 import base64
+import hashlib
 from pathlib import Path
-import sys
+import threading
+import anyio
 
 dotenv.load_dotenv()
 SENTENCE_CACHE = {}
-db_manager = MongoDBManager()
-
-import openai
-from dotenv import load_dotenv
-
-load_dotenv()
-openai.api_key = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-from fastapi.middleware.cors import CORSMiddleware
 
 import logging
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from database.init_db import init_mongodb
-from database.mongodb_manager import MongoDBManager
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+from gtts import gTTS
+from app.scenario_cache import ScenarioCache
+from app.suggestion_batcher import SuggestionBatcher
+from app.llm_gateway import CoalescingClient
+from app.llm_providers import create_client
+from app.model_router import ModelRouter
+from app.content_pack import content_pack
+from app.langdetect import matches_language
+from app.languages import (LANGUAGES, LATIN, get_default_suggestions, get_fallback_suggestions,
+                           get_language, normalize_language)
+from app.textproc import (
+    clean_generated_text,
+    clean_text,
+    space_sentences_for_tts,
+    split_suggestions,
+    strip_list_marker,
+    title_key,
+    trim_to_last_sentence,
 )
+from app import audio_files, lifecycle, metrics, mongo_tracer, profile_images, tracing
+from app.audio_janitor import AudioJanitor
+from app.blob_store import LocalBlobStore
+from app.compression import CompressionMiddleware
+from app.http_cache import conditional_json, etag_matches, not_modified
+from app.responses import MongoJSONResponse
+from app.logging_setup import configure_logging, get_levels, sampled, set_level
+from app.resources import Lazy
+from app import resources
+configure_logging()
 logger = logging.getLogger(__name__)
+# Must be registered before the first MongoClient is created
+mongo_tracer.install()
+
+STAGE_SECONDS = "stage_duration_seconds"
+# Lets POST /api/debug_log_levels change levels at runtime
+LOG_LEVEL_CONTROL = os.getenv("LOG_LEVEL_CONTROL") == "1"
 
-try:
-    # Try to initialize with the new method
-    db = init_mongodb()
-    db_manager = MongoDBManager()  # Use your existing constructor
-    logger.info("MongoDB manager initialized successfully")
-except Exception as e:
-    logger.error(f"Failed to initialize MongoDB: {e}", exc_info=True)
-    # Fall back to direct initialization
+def connect_database():
     try:
-        db_manager = MongoDBManager()
-        logger.info("MongoDB manager initialized with fallback method")
-    except Exception as e2:
-        logger.critical(f"Critical database initialization failure: {e2}", exc_info=True)
-        db_manager = None
+        return MongoDBManager()
+    except Exception as e:
+        logger.critical("Critical database initialization failure: %s", e, exc_info=True)
+        return None
+
+# Built on first use (or by the startup warm-up), never at import time
+db_manager = Lazy("mongodb", connect_database, close=lambda manager: manager.client.close())
+
+def build_scenario_cache():
+    # Memory-only when MongoDB is unavailable
+    manager = db_manager.get()
+    return ScenarioCache(manager.db if manager is not None else None)
+
+scenario_cache = Lazy("scenario_cache", build_scenario_cache)
 
 DEFAULT_SUGGESTIONS = [
     "Tell me more about that.",
     "What do you think about this?",
     "Can you explain that further?"
 ]
-def load_user_profile(username):
+def load_user_profile(username, history_after=None, epoch=None):
     try:
-        return db_manager.load_user_profile(username)
+        with metrics.timer(STAGE_SECONDS, stage="profile_load"):
+            return db_manager.load_user_profile(username, history_after=history_after, epoch=epoch)
     except Exception as e:
-        print(f"Error loading user profile from MongoDB: {e}")
+        logger.error("Error loading user profile from MongoDB: %s", e)
         return {
             "username": username,
             "ai_role": "AI assistant",
@@ -89,86 +109,90 @@ def load_user_profile(username):
 
 def save_user_profile(user_profile):
     try:
-        db_manager.save_user_profile(user_profile)
+        with metrics.timer(STAGE_SECONDS, stage="mongo_write"):
+            db_manager.save_user_profile(user_profile)
     except Exception as e:
-        print(f"Error saving user profile to MongoDB: {e}")
+        logger.error("Error saving user profile to MongoDB: %s", e)
         raise
 
-def clean_text(text):
-    """Clean text for TTS processing."""
-    text = re.sub(r'[^\w\s.,?!;:()\-\'"\u4e00-\u9fff\u3040-\u30ff]', '', text)
-    return text
-
-def infer_ai_role(scenario, client):
+def infer_ai_role(scenario, client, language=None):
     if scenario == "Language Practice":
         return "Language Practice Partner"
         
     try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {
-                    "role": "system", 
-                    "content": "You are a helpful assistant that suggests appropriate role-play characters."
-                },
-                {
-                    "role": "user", 
-                    "content": f"Based on this scenario: '{scenario}', what would be an appropriate character or role for an AI to play? Respond with ONLY the role name, no explanation."
-                }
-            ],
-            temperature=0.7,
-            max_tokens=30,
+        return scenario_cache.get_ai_role(
+            scenario,
+            normalize_language(language),
+            lambda: request_ai_role(scenario, client)
         )
-        return response.choices[0].message.content.strip()
     except Exception as e:
-        print(f"Error inferring AI role: {e}")
+        logger.error("Error inferring AI role: %s", e)
         return "Conversation Partner"
 
-def clean_generated_text(text, language, content_type):
-    """Clean generated text to remove explanations and extra information"""
+def request_ai_role(scenario, client):
+    response = client.chat.completions.create(
+        model="gpt-3.5-turbo",
+        messages=[
+            {
+                "role": "system", 
+                "content": "You are a helpful assistant that suggests appropriate role-play characters."
+            },
+            {
+                "role": "user", 
+                "content": f"Based on this scenario: '{scenario}', what would be an appropriate character or role for an AI to play? Respond with ONLY the role name, no explanation."
+            }
+        ],
+        temperature=0.7,
+        max_tokens=30,
+    )
+    return response.choices[0].message.content.strip()
+
+def reply_token_budget(language):
+    """
+    max_tokens for a 2-3 sentence chat reply. Non-Latin scripts cost several
+    tokens per character, so they get more headroom to avoid mid-sentence cuts.
+    """
+    if get_language(language).script != LATIN:
+        return 320
+    return 200
+
+def reply_passes_quality_check(response, language):
+    """
+    Reject empty or wrong-language chat replies so the router can escalate.
+    Truncated replies are trimmed locally instead of paying for another call.
+    """
+    text = (response.choices[0].message.content or "").strip()
     if not text:
-        return text
-        
-    text = text.strip().strip('"\'`""''')
-    
-    import re
-    text = re.sub(r'\([^)]*\)', '', text).strip()
-    
-    text = re.sub(r'\s*[-–—]\s*.*$', '', text).strip()
-    
-    if content_type == 'word':
-        text = re.sub(r'\s*,\s*.*$', '', text).strip()
-    
-    if language in ['ko', 'ja', 'zh-CN', 'zh-TW']:
-        if content_type == 'word':
-            text = re.sub(r'[a-zA-Z0-9\s\-_.,!?()[\]{}]+', '', text).strip()
-            
-            if language == 'ko':
-                korean_chars = re.findall(r'[가-힣]+', text)
-                if korean_chars:
-                    text = korean_chars[0]
-            
-            elif language == 'ja':
-                japanese_chars = re.findall(r'[ひらがなカタカナ一-龯ぁ-ゖァ-ヾ]+', text)
-                if japanese_chars:
-                    text = japanese_chars[0]
-            
-            elif language in ['zh-CN', 'zh-TW']:
-                chinese_chars = re.findall(r'[一-龯]+', text)
-                if chinese_chars:
-                    text = chinese_chars[0]
-    
-    else:
-        if content_type == 'word':
-            words = text.split()
-            if words:
-                text = words[0]
-                text = re.sub(r'[^\w]', '', text)
-    
-    return text
+        return False
+    if not matches_language(text, language):
+        metrics.increment("llm_language_mismatch_total", endpoint="chat", language=normalize_language(language))
+        return False
+    return True
+
+async def complete_in_language(language, endpoint, **kwargs):
+    """
+    Run a chat completion and check the reply with the local language detector.
+    Only a detected mismatch costs a second call, with an explicit reminder.
+    """
+    response = await client.chat.completions.create_async(**kwargs)
+    text = response.choices[0].message.content or ""
+    if matches_language(text, language):
+        return response
+
+    language_name = get_language(language).name
+    metrics.increment("llm_language_mismatch_total", endpoint=endpoint, language=normalize_language(language))
+    logger.warning("%s: reply not in %s, retrying once", endpoint, language_name)
+    messages = kwargs["messages"] + [
+        {"role": "assistant", "content": text},
+        {"role": "system", "content": f"That reply was not in {language_name}. Answer again using ONLY {language_name}."},
+    ]
+    return await client.chat.completions.create_async(**{**kwargs, "messages": messages})
 
 app = FastAPI(title="Language Learning API", 
-              description="API for language learning conversations with AI")
+              description="API for language learning conversations with AI",
+              default_response_class=MongoJSONResponse)
+
+app.add_middleware(CompressionMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -176,11 +200,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Request-ID", "X-Mongo-Ops", "X-Mongo-Docs", "X-Mongo-Bytes", "X-Mongo-Time-Ms"],
 )
+app.add_middleware(mongo_tracer.MongoTraceMiddleware)
+app.add_middleware(tracing.TraceMiddleware)
 
-app.mount("/audio", StaticFiles(directory=SOUND_RESPONSE_DIR), name="audio")
 
-client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+# OpenAI or a local llama.cpp model (LLM_PROVIDER), behind the same gateway policy
+client = Lazy("llm", lambda: CoalescingClient(create_client()), close=lambda gateway: gateway.close())
+model_router = ModelRouter(client)
+suggestion_batcher = SuggestionBatcher(client)
 
 class ChatRequest(BaseModel):
     username: str
@@ -236,12 +265,6 @@ class PracticeSentence(BaseModel):
     difficulty: str
     audio_url: Optional[str] = None
 
-class MongoJSONEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, ObjectId):
-            return str(obj)
-        return super().default(obj)
-
 @app.get("/")
 async def root():
     return {"message": "Language Learning API is running"}
@@ -254,7 +277,7 @@ async def init_user_profile(request: Request):
         init_custom_scenarios = data.get("init_custom_scenarios", False)
         
         if not username:
-            return JSONResponse(
+            return MongoJSONResponse(
                 status_code=400,
                 content={"error": "Username is required"}
             )
@@ -271,27 +294,25 @@ async def init_user_profile(request: Request):
                     {"username": username},
                     {"$set": update_data}
                 )
-                return JSONResponse(content={"success": True, "message": "User profile updated"})
+                return MongoJSONResponse(content={"success": True, "message": "User profile updated"})
             else:
-                return JSONResponse(content={"success": True, "message": "User profile already exists"})
+                return MongoJSONResponse(content={"success": True, "message": "User profile already exists"})
         else:
             new_user = {
                 "username": username,
-                "created_at": datetime.datetime.utcnow().isoformat()
+                "created_at": datetime.utcnow().isoformat()
             }
             
             if init_custom_scenarios:
                 new_user["custom_scenarios"] = []
             
             db_manager.db["users"].insert_one(new_user)
-            return JSONResponse(
+            return MongoJSONResponse(
                 content={"success": True, "message": "User profile created"}
             )
     except Exception as e:
-        print(f"Error initializing user profile: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return JSONResponse(
+        logger.error("Error initializing user profile: %s", e, exc_info=True)
+        return MongoJSONResponse(
             status_code=500,
             content={"error": f"Failed to initialize user profile: {str(e)}"}
         )
@@ -309,12 +330,13 @@ async def chat(request: ChatRequest):
         conversation_id = str(uuid.uuid4())
     
     # Log incoming request parameters
-    logger.info(f"Processing chat for user={username}, is_discarded={is_discarded}, save_to_history={save_to_history}")
+    logger.info("Processing chat for user=%s, is_discarded=%s, save_to_history=%s", username, is_discarded, save_to_history,
+                extra=sampled())
     
     # If is_discarded is true, force save_to_history to false
     if is_discarded:
         save_to_history = False
-        logger.info("Request marked as discarded - forcing save_to_history=False")
+        logger.debug("Request marked as discarded - forcing save_to_history=False")
     
     # Extract fields from request
     is_roleplay = request.scenario != "Language Practice" if request.scenario else False
@@ -322,15 +344,16 @@ async def chat(request: ChatRequest):
     # If this is roleplay, don't save to main history
     if is_roleplay:
         save_to_history = False
-        logger.info("Roleplay scenario detected - forcing save_to_history=False")
+        logger.debug("Roleplay scenario detected - forcing save_to_history=False")
     
     try:
         # Load the user profile
-        user_profile = db_manager.load_user_profile(username)
+        with metrics.timer(STAGE_SECONDS, stage="profile_load"):
+            user_profile = db_manager.load_user_profile(username)
         
         # Check if user profile has discard flag set
         if (user_profile.get("preferences", {}).get("discard_conversation", False)):
-            logger.info(f"User profile has discard_conversation flag set - forcing save_to_history=False")
+            logger.debug("User profile has discard_conversation flag set - forcing save_to_history=False")
             save_to_history = False
             is_discarded = True
         
@@ -338,16 +361,16 @@ async def chat(request: ChatRequest):
         target_language = None
         if hasattr(request, 'response_locale') and request.response_locale:
             target_language = normalize_language(request.response_locale)
-            logger.info(f"Using response_locale parameter: {target_language}")
+            logger.debug("Using response_locale parameter: %s", target_language)
         elif hasattr(request, 'language') and request.language:
             target_language = normalize_language(request.language)
-            logger.info(f"Using language parameter: {target_language}")
+            logger.debug("Using language parameter: %s", target_language)
         
         if hasattr(request, 'reset_language_context') and request.reset_language_context:
-            logger.info(f"Resetting language context for {username}")
+            logger.debug("Resetting language context for %s", username)
             
         if target_language and (hasattr(request, 'force_language') and request.force_language):
-            logger.info(f"Forcing language to {target_language} for user {username}")
+            logger.debug("Forcing language to %s for user %s", target_language, username)
             user_profile["language"] = target_language
             user_profile["locale"] = target_language
         
@@ -355,7 +378,7 @@ async def chat(request: ChatRequest):
         if request.scenario:
             if user_profile.get("scenario") != request.scenario:
                 user_profile["scenario"] = request.scenario
-                ai_role = infer_ai_role(request.scenario, client)
+                ai_role = await anyio.to_thread.run_sync(infer_ai_role, request.scenario, client, target_language or user_profile.get("language"))
                 user_profile["ai_role"] = ai_role
         
         if not user_profile.get("scenario"):
@@ -363,40 +386,37 @@ async def chat(request: ChatRequest):
             user_profile["ai_role"] = "Language Practice Partner"
         
         if not user_profile.get("ai_role"):
-            user_profile["ai_role"] = infer_ai_role(user_profile["scenario"], client)
+            user_profile["ai_role"] = await anyio.to_thread.run_sync(infer_ai_role, user_profile["scenario"], client, target_language or user_profile.get("language"))
         
-        language = user_profile.get("language", "en")
+        language = normalize_language(user_profile.get("language", "en"))
         if target_language:
             language = target_language
         
         user_profile["language"] = language
         user_profile["locale"] = language
         
-        language_name = {
-            "en": "English",
-            "zh-cn": "Simplified Chinese",
-            "zh-tw": "Traditional Chinese",
-            "ja": "Japanese",
-            "ko": "Korean",
-            "es": "Spanish",
-            "fr": "French",
-            "de": "German",
-            "it": "Italian",
-            "hi": "Hindi",
-        }.get(language.lower(), "English")
+        language_name = get_language(language).name
         
         scenario_desc = user_profile["scenario"]
         ai_role = user_profile["ai_role"]
         
         # Build prompt for AI
+        prompt_started = time.perf_counter()
         system_prompt = (
             f"You are playing the role of {ai_role} in the following scenario: {scenario_desc}. "
             f"You MUST respond ONLY in {language_name}. "
-            f"Do not use any language other than {language_name}, regardless of what language the user writes in. "
-            f"Your response should be completely in {language_name}."
+            f"Keep your responses conversational and natural - aim for 2-3 complete sentences. "
+            f"Do not use numbered lists (1., 2., 3.) or bullet points. "
+            f"Always end your sentences properly with punctuation. "
+            f"Make your responses flow naturally as conversation. "
+            f"Do not switch languages, regardless of what language the user writes in."
         )
         
+        # Keep the layout append-only: system prompt, history in order, new
+        # message. Each turn's prompt then starts with the previous turn's, which
+        # is what lets a local model resume its saved KV state (app.llm_providers)
         messages = [{"role": "system", "content": system_prompt}]
+        roleplay_conversation = None
         
         # Add conversation history if not roleplay
         if not is_roleplay:
@@ -415,117 +435,60 @@ async def chat(request: ChatRequest):
         else:
             try:
                 conversation_collection = db_manager.db["scenario_conversations"]
-                conversation = conversation_collection.find_one({
+                roleplay_conversation = conversation_collection.find_one({
                     "username": username,
                     "scenario_title": scenario_desc,
                     "is_deleted": {"$ne": True},
                     "deleted": {"$ne": True}
                 })
                 
-                if conversation:
-                    conversation_id = str(conversation["_id"])
+                if roleplay_conversation:
+                    conversation_id = str(roleplay_conversation["_id"])
                     message_collection = db_manager.db["scenario_messages"]
-                    scenario_messages = list(message_collection.find({"conversation_id": conversation_id}))
+                    scenario_messages = list(
+                        message_collection.find({"conversation_id": conversation_id}).sort("timestamp", 1)
+                    )
                     
                     for msg in scenario_messages:
                         role = "user" if msg.get("sender") == "user" else "assistant"
                         messages.append({"role": role, "content": msg.get("text", "")})
             except Exception as e:
-                logger.error(f"Error fetching roleplay conversation context: {e}")
+                logger.error("Error fetching roleplay conversation context: %s", e)
         
         messages.append({"role": "user", "content": message})
-        
-        messages.append({
-            "role": "system", 
-            "content": f"Remember to respond ONLY in {language_name}, no matter what."
-        })
+        metrics.observe(STAGE_SECONDS, time.perf_counter() - prompt_started, stage="prompt_build")
         
         # Generate AI response
-        logger.info(f"Sending prompt to OpenAI with {len(messages)} messages")
-        response = client.chat.completions.create(
-            model="gpt-4", 
+        logger.debug("Sending prompt to the model with %s messages", len(messages))
+        response = await model_router.complete_async(
+            "roleplay" if is_roleplay else "small_talk",
+            quality_check=lambda r: reply_passes_quality_check(r, language),
             messages=messages,
-            max_tokens=200,
+            max_tokens=reply_token_budget(language),
             temperature=0.7,
             presence_penalty=0.1,
             frequency_penalty=0.1,
-            stop=None
+            stop=["\n\n"]
         )
         
         ai_response = response.choices[0].message.content
         
-        if ai_response and not ai_response.strip().endswith(('.', '!', '?', '。', '！', '？')):
-            logger.warning(f"Response might be incomplete: '{ai_response}'")
-            
-            try:
-                completion_prompt = f"""Complete this response naturally and make it longer: "{ai_response}"
-                Make it 2-3 complete sentences total. The response should be conversational and natural.
-                Do not use numbered lists (like 1., 2., 3.) or bullet points.
-                Make it flow as natural conversation.
-                Only provide the completed response, nothing else."""
-                
-                completion_response = client.chat.completions.create(
-                    model="gpt-3.5-turbo",
-                    messages=[
-                        {"role": "system", "content": f"Complete sentences naturally in {language_name}. Make responses complete, conversational, and 2-3 sentences long. Avoid numbered lists."},
-                        {"role": "user", "content": completion_prompt}
-                    ],
-                    max_tokens=120,
-                    temperature=0.3,
-                    stop=None
-                )
-                
-                completed_response = completion_response.choices[0].message.content.strip()
-                
-                if completed_response and len(completed_response) > len(ai_response):
-                    if ai_response.lower() in completed_response.lower():
-                        ai_response = completed_response
-                        logger.info(f"Successfully completed response: '{ai_response}'")
-                    else:
-                        ai_response = ai_response.strip() + "."
-                else:
-                    ai_response = ai_response.strip() + "."
-                    
-            except Exception as completion_error:
-                logger.warning(f"Failed to complete response: {completion_error}")
-                ai_response = ai_response.strip() + "."
-        
-        if re.search(r'\d+\.\s*$', ai_response):
-            logger.warning("Response ends with incomplete numbered list")
-            ai_response = re.sub(r'\d+\.\s*$', '', ai_response).strip()
-            if not ai_response.endswith(('.', '!', '?', '。', '！', '？')):
-                ai_response += "."
-        
-        system_prompt = (
-            f"You are playing the role of {ai_role} in the following scenario: {scenario_desc}. "
-            f"You MUST respond ONLY in {language_name}. "
-            f"Keep your responses conversational and natural - aim for 2-3 complete sentences. "
-            f"Do not use numbered lists (1., 2., 3.) or bullet points. "
-            f"Always end your sentences properly with punctuation. "
-            f"Make your responses flow naturally as conversation. "
-            f"Do not use any language other than {language_name}, regardless of what language the user writes in. "
-            f"Your response should be completely in {language_name}."
-        )
+        if ai_response:
+            trim_started = time.perf_counter()
+            trimmed_response = trim_to_last_sentence(ai_response, language)
+            if trimmed_response != ai_response.strip():
+                logger.warning("Response was incomplete (finish_reason=%s), trimmed locally", response.choices[0].finish_reason)
+                metrics.increment("chat_truncation_trimmed_total", finish_reason=response.choices[0].finish_reason or "unknown")
+                metrics.observe("chat_truncation_trim_seconds", time.perf_counter() - trim_started)
+            ai_response = trimmed_response
         
         if not ai_response:
-            fallbacks = {
-                "en": "I'm thinking about what to say. Could you please repeat your question?",
-                "zh-cn": "我正在思考该怎么回答。请您再问一次好吗？",
-                "zh-tw": "我正在思考該怎麼回答。請您再問一次好嗎？",
-                "ja": "何を言うべきか考えています。もう一度質問していただけますか？",
-                "ko": "무슨 말을 해야 할지 생각 중입니다. 질문을 다시 해주시겠어요?",
-                "es": "Estoy pensando en qué decir. ¿Podrías repetir tu pregunta?",
-                "fr": "Je réfléchis à quoi dire. Pourriez-vous répéter votre question ?",
-                "de": "Ich überlege, was ich sagen soll. Könnten Sie Ihre Frage wiederholen?",
-                "it": "Sto pensando a cosa dire. Potresti ripetere la tua domanda?",
-                "hi": "मैं सोच रहा हूं कि क्या कहूं। क्या आप अपना प्रश्न दोहरा सकते हैं?",
-            }
-            ai_response = fallbacks.get(language.lower(), fallbacks["en"])
+            ai_response = content_pack.get(language, "chat_fallback")
         
-        logger.info(f"Save decision - is_discarded: {is_discarded}, save_to_history: {save_to_history}, is_roleplay: {is_roleplay}")
+        logger.debug("Save decision - is_discarded: %s, save_to_history: %s, is_roleplay: %s", is_discarded, save_to_history, is_roleplay)
         
         if save_to_history and not is_discarded and not is_roleplay:
-            logger.info(f"SAVING message to chat history for user {username}")
+            logger.debug("SAVING message to chat history for user %s", username)
             user_profile["chat_history"].append({
                 "user": message,
                 "ai": ai_response,
@@ -534,30 +497,23 @@ async def chat(request: ChatRequest):
             })
             save_user_profile(user_profile)
         else:
-            logger.info(f"NOT SAVING message to chat history (is_discarded={is_discarded}, save_to_history={save_to_history})")
+            logger.debug("NOT SAVING message to chat history (is_discarded=%s, save_to_history=%s)", is_discarded, save_to_history)
         
         if is_roleplay:
-            logger.info(f"Processing roleplay conversation for scenario: {scenario_desc}")
+            logger.debug("Processing roleplay conversation for scenario: %s", scenario_desc)
+            write_started = time.perf_counter()
             try:
-                conversation_collection = db_manager.db["scenario_conversations"]
-                conversation = conversation_collection.find_one({
-                    "username": username,
-                    "scenario_title": scenario_desc,
-                    "is_deleted": {"$ne": True},
-                    "deleted": {"$ne": True}
-                })
-                
-                if not conversation:
+                # Reuse the conversation looked up while building the prompt
+                if not roleplay_conversation:
                     conversation_id = await db_manager.insert_scenario_conversation(
                         username=username,
                         scenario_title=scenario_desc,
-                        description=scenario_desc,
                         is_custom=False,
                         language=language,
                         created_at=datetime.now().isoformat()
                     )
                 else:
-                    conversation_id = str(conversation["_id"])
+                    conversation_id = str(roleplay_conversation["_id"])
                 
                 await db_manager.insert_scenario_message(
                     conversation_id=conversation_id,
@@ -574,20 +530,19 @@ async def chat(request: ChatRequest):
                     audio_url=None,
                     timestamp=datetime.now().isoformat()
                 )
+                metrics.observe(STAGE_SECONDS, time.perf_counter() - write_started, stage="mongo_write")
                 
-                logger.info(f"Saved roleplay conversation for scenario: {scenario_desc}")
+                logger.debug("Saved roleplay conversation for scenario: %s", scenario_desc)
                 return {
                     "response": ai_response,
                     "audio_url": None,
                     "conversation_id": conversation_id
                 }
             except Exception as e:
-                logger.error(f"Error saving roleplay message: {e}")
-                import traceback
-                traceback.print_exc()
+                logger.error("Error saving roleplay message: %s", e, exc_info=True)
         
         # Return the response
-        logger.info(f"Returning chat response for user {username}, conversation_id {conversation_id}")
+        logger.debug("Returning chat response for user %s, conversation_id %s", username, conversation_id)
         return {
             "response": ai_response,
             "audio_url": None,
@@ -595,15 +550,49 @@ async def chat(request: ChatRequest):
         }
         
     except Exception as e:
-        logger.error(f"Error in chat endpoint: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error in chat endpoint: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to process chat: {str(e)}")
 
+def history_cursor(chat_history, since=None):
+    """
+    The newest _id among `chat_history` and `since`. A delta re-reads an
+    overlap window before `since`, so it can hold only older messages and the
+    cursor must not move back to them.
+    """
+    ids = [ObjectId(entry["id"]) for entry in chat_history if ObjectId.is_valid(entry.get("id") or "")]
+    if since and ObjectId.is_valid(since):
+        ids.append(ObjectId(since))
+    return str(max(ids)) if ids else since
+
+
+def parse_history_cursor(since):
+    """(last message _id or None, history epoch or None) from a history cursor."""
+    message_id, _, epoch = (since or "").partition(".")
+    return (message_id if ObjectId.is_valid(message_id) else None), (epoch or None)
+
+
+def parse_profile_cursor(since):
+    """(last message _id, history epoch, custom scenarios fingerprint), each or None, from a profile cursor."""
+    history, _, scenarios_fingerprint = (since or "").rpartition(".")
+    return (*parse_history_cursor(history), scenarios_fingerprint or None)
+
+
 @app.get("/api/user_profile")
-async def get_user_profile(username: str):
+async def get_user_profile(request: Request, username: str, since: Optional[str] = None):
+    """
+    The user's profile, with an ETag (If-None-Match gets a 304).
+
+    `since` takes the `cursor` of an earlier response: chat_history then holds
+    only the messages added after it (plus a short overlap window, see
+    HISTORY_CURSOR_OVERLAP), and custom_scenarios is left out unless the list
+    has changed. The client merges these into what it already has, dropping
+    messages whose id it has seen. When messages were deleted since the
+    cursor was issued (its history epoch is stale) the full profile is sent
+    with delta false, and the client replaces its copy.
+    """
     try:
-        user_profile = load_user_profile(username)
+        history_after, epoch, scenarios_fingerprint = parse_profile_cursor(since)
+        user_profile = load_user_profile(username, history_after=history_after, epoch=epoch)
         
         if not user_profile:
             user_profile = {
@@ -619,24 +608,13 @@ async def get_user_profile(username: str):
             }
 
         if "locale" not in user_profile:
-            language = user_profile.get("language", "English")
-            language_lower = language.lower()
-            locale_mapping = {
-                "english": "en",
-                "chinese": "zh-CN",
-                "japanese": "ja",
-                "korean": "ko",
-                "spanish": "es",
-                "french": "fr",
-                "hindi": "hi",
-                "german": "de",
-                "italian": "it"
-            }
-            
-            user_profile["locale"] = locale_mapping.get(language_lower, "en")
+            user_profile["locale"] = get_language(user_profile.get("language", "English")).code
         
         scenario_collection = db_manager.db["user_scenarios"]
-        cursor = scenario_collection.find({"username": username, "custom": True})
+        cursor = scenario_collection.find(
+            {"username": username, "custom": True},
+            {"_id": 0, "id": 1, "title": 1, "description": 1, "language": 1, "created_at": 1}
+        )
         
         custom_scenarios = []
         for doc in cursor:
@@ -652,13 +630,22 @@ async def get_user_profile(username: str):
         
         user_profile["custom_scenarios"] = custom_scenarios
         
-        print(f"Found {len(custom_scenarios)} custom scenarios for user {username}")
+        logger.debug("Found %s custom scenarios for user %s", len(custom_scenarios), username)
+        
+        current_fingerprint = hashlib.sha1(
+            json.dumps(custom_scenarios, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()[:16]
+        current_epoch = history_epoch(user_profile)
+        delta = history_after is not None and epoch == current_epoch
+        user_profile["delta"] = delta
+        if delta and scenarios_fingerprint == current_fingerprint:
+            del user_profile["custom_scenarios"]
+        last_message = history_cursor(user_profile.get("chat_history", []), history_after if delta else None)
+        user_profile["cursor"] = f"{last_message or ''}.{current_epoch}.{current_fingerprint}"
         
-        return user_profile
+        return conditional_json(request, user_profile)
     except Exception as e:
-        print(f"Error retrieving user profile: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error retrieving user profile: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to retrieve user profile: {str(e)}")
 
 @app.post("/api/set_user_profile")
@@ -673,7 +660,8 @@ async def set_user_profile(request: dict):
         if not username:
             raise HTTPException(status_code=400, detail="Username is required")
         
-        user_profile = db_manager.load_user_profile(username)
+        with metrics.timer(STAGE_SECONDS, stage="profile_load"):
+            user_profile = db_manager.load_user_profile(username)
         
         if language:
             user_profile["language"] = language
@@ -684,12 +672,13 @@ async def set_user_profile(request: dict):
         if ai_role:
             user_profile["ai_role"] = ai_role
         
-        db_manager.save_user_profile(user_profile)
+        with metrics.timer(STAGE_SECONDS, stage="mongo_write"):
+            db_manager.save_user_profile(user_profile)
         
         return {"success": True, "message": "User profile updated"}
     
     except Exception as e:
-        print(f"Error in set_user_profile: {e}")
+        logger.error("Error in set_user_profile: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to update user profile: {str(e)}")
 
 class ConversationMessage(BaseModel):
@@ -704,12 +693,10 @@ class ConversationRequest(BaseModel):
 @app.get('/api/health_check')
 async def health_check():
     try:
-        from database.mongodb_manager import MongoDBManager
-        db_manager = MongoDBManager()
         db_manager.db.command('ping')
-        return JSONResponse(content={"status": "healthy", "database": "connected"}, status_code=200)
+        return MongoJSONResponse(content={"status": "healthy", "database": "connected"}, status_code=200)
     except Exception as e:
-        return JSONResponse(content={"status": "unhealthy", "error": str(e)}, status_code=500)
+        return MongoJSONResponse(content={"status": "unhealthy", "error": str(e)}, status_code=500)
 
 @app.post("/api/save_conversation")
 async def save_conversation(request: Request):
@@ -721,18 +708,15 @@ async def save_conversation(request: Request):
         is_discarded = body.get('is_discarded', False)
         batch_id = body.get('batch_id')
         
-        print(f"SAVE_CONVERSATION: Received request with username={username}, {len(conversation) if conversation else 0} messages, batch_id={batch_id}")
+        logger.debug("SAVE_CONVERSATION: Received request with username=%s, %s messages, batch_id=%s", username, len(conversation) if conversation else 0, batch_id)
         
         # Validate required fields
         if not username:
-            return JSONResponse(status_code=400, content={"error": "Username is required"})
+            return MongoJSONResponse(status_code=400, content={"error": "Username is required"})
             
         if not conversation or not isinstance(conversation, list) or len(conversation) == 0:
-            print(f"Warning: Empty conversation array for user {username}")
-            return JSONResponse(status_code=200, content={"status": "success", "message": "No messages to save"})
-        
-        # Add debug logging to trace the data
-        print(f"SAVE_CONVERSATION: First message in conversation: {conversation[0]}")
+            logger.warning("Empty conversation array for user %s", username)
+            return MongoJSONResponse(status_code=200, content={"status": "success", "message": "No messages to save"})
         
         # Make sure batch_id is set on each message
         if batch_id:
@@ -740,31 +724,30 @@ async def save_conversation(request: Request):
                 if isinstance(msg, dict) and not msg.get('batch_id'):
                     msg['batch_id'] = batch_id
         
-        result = db_manager.save_conversation(
-            username=username,
-            conversation=conversation,
-            is_discarded=is_discarded,
-            batch_id=batch_id
-        )
+        with metrics.timer(STAGE_SECONDS, stage="mongo_write"):
+            result = db_manager.save_conversation(
+                username=username,
+                conversation=conversation,
+                is_discarded=is_discarded,
+                batch_id=batch_id
+            )
         
         if result:
-            print(f"SAVE_CONVERSATION: Successfully saved {len(conversation)} messages for {username}")
-            return JSONResponse(
+            logger.debug("SAVE_CONVERSATION: Successfully saved %s messages for %s", len(conversation), username)
+            return MongoJSONResponse(
                 status_code=200, 
                 content={"status": "success", "message": f"Successfully saved {len(conversation)} messages"}
             )
         else:
-            print(f"SAVE_CONVERSATION: Failed to save conversation for {username}")
-            return JSONResponse(
+            logger.warning("SAVE_CONVERSATION: Failed to save conversation for %s", username)
+            return MongoJSONResponse(
                 status_code=500,
                 content={"status": "error", "message": "Failed to save conversation"}
             )
             
     except Exception as e:
-        import traceback
-        print(f"SAVE_CONVERSATION ERROR: {str(e)}")
-        traceback.print_exc()
-        return JSONResponse(
+        logger.error("SAVE_CONVERSATION ERROR: %s", e, exc_info=True)
+        return MongoJSONResponse(
             status_code=500,
             content={"status": "error", "message": str(e)}
         )
@@ -793,7 +776,7 @@ async def get_scenarios():
 
 @app.post("/api/create_scenario")
 async def create_custom_scenario(request: dict):
-    print("Received create_scenario request:", request) 
+    logger.debug("Received create_scenario request: %s", request)
     
     username = request.get('username')
     title = request.get('title')
@@ -811,9 +794,9 @@ async def create_custom_scenario(request: dict):
         scenario_id = f"custom_{int(datetime.now().timestamp())}"
         
         try:
-            ai_role = infer_ai_role(title, client)
+            ai_role = await anyio.to_thread.run_sync(infer_ai_role, title, client, user_profile.get("language"))
         except Exception as e:
-            print(f"Error inferring AI role: {e}")
+            logger.error("Error inferring AI role: %s", e)
             ai_role = "Conversation Partner"
         
         user_profile["custom_scenarios"].append({
@@ -826,7 +809,7 @@ async def create_custom_scenario(request: dict):
         
         save_user_profile(user_profile)
         
-        print(f"Custom scenario created for {username}: {title}")
+        logger.debug("Custom scenario created for %s: %s", username, title)
         
         return {
             "id": scenario_id,
@@ -835,9 +818,146 @@ async def create_custom_scenario(request: dict):
             "role": ai_role
         }
     except Exception as e:
-        print(f"Error creating custom scenario: {e}")
+        logger.error("Error creating custom scenario: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to create scenario: {str(e)}")
 
+def language_practice_greeting(language):
+    return content_pack.get(language, "practice_greeting")
+
+def generate_scenario_opening(scenario, ai_role, language):
+    system_prompt = f"You are {ai_role} in the following scenario: {scenario}. Start with a greeting or introduction that makes sense for this specific setting. Use {language} language."
+    
+    response = client.chat.completions.create(
+        model="gpt-3.5-turbo",
+        messages=[{"role": "system", "content": system_prompt}],
+        max_tokens=150,
+        temperature=0.7,
+    )
+    return response.choices[0].message.content
+
+def render_speech(text, language, audio_path):
+    voiced_response = clean_text(text)
+    registered = get_language(language)
+    with metrics.timer(STAGE_SECONDS, stage="tts"):
+        tts = gTTS(text=voiced_response, lang=registered.tts_code, tld=registered.tts_tld, slow=False)
+        audio_files.save_atomically(tts.save, audio_path)
+    audio_files.add_alternates(audio_path)
+
+def speech_file(kind, voiced_text, lang, tld="com", slow=False):
+    """
+    Synthesize `voiced_text` into SOUND_RESPONSE_DIR and return the file name.
+    The name is derived from the TTS inputs, so a sentence that was already
+    rendered is served from the existing (immutable) file, which is touched
+    so the audio janitor sees it as recently used.
+    """
+    audio_file = audio_files.audio_name(kind, voiced_text, lang, tld, slow)
+    audio_path = os.path.join(SOUND_RESPONSE_DIR, audio_file)
+    if audio_files.touch(audio_path):
+        metrics.increment("tts_reused_total", kind=kind)
+        return audio_file
+    with metrics.timer(STAGE_SECONDS, stage="tts"):
+        tts = gTTS(text=voiced_text, lang=lang, tld=tld, slow=slow)
+        audio_files.save_atomically(tts.save, audio_path)
+    audio_files.add_alternates(audio_path)
+    return audio_file
+
+def get_cached_opening(scenario, ai_role, language):
+    """Opening line and pre-rendered audio for a scenario, shared across users."""
+    if scenario == "Language Practice":
+        generate = lambda: language_practice_greeting(language)
+    else:
+        generate = lambda: generate_scenario_opening(scenario, ai_role, language)
+    
+    return scenario_cache.get_opening(
+        scenario,
+        language,
+        generate,
+        ai_role=ai_role,
+        audio_dir=SOUND_RESPONSE_DIR,
+        render_audio=lambda text, path: render_speech(text, language, path)
+    )
+
+# One worker warms the shared cache; the others read what it wrote
+WARMUP_LEASE_SECONDS = 1800
+
+def warm_scenario_cache():
+    """Seed roles and opening lines for every default scenario and language."""
+    if not scenario_cache.acquire_lease("scenario_warmup", WARMUP_LEASE_SECONDS):
+        logger.info("Scenario cache warm-up already running or done in another worker; skipping")
+        return
+    started = time.time()
+    seeded = 0
+    for scenario_id, language_dict in DEFAULT_SCENARIOS.items():
+        title = scenario_id.replace('_', ' ').title()
+        for language_label, entry in language_dict.items():
+            language = normalize_language(language_label)
+            for scenario_text in (entry.get("desc"), title):
+                if not scenario_text:
+                    continue
+                try:
+                    ai_role = scenario_cache.get("role", scenario_text, language)
+                    if ai_role is None:
+                        ai_role = entry.get("role", "Conversation Partner")
+                        scenario_cache.put("role", scenario_text, language, ai_role)
+                    # A no-op (cache hit, audio on disk) for keys that already exist
+                    get_cached_opening(scenario_text, ai_role, language)
+                    seeded += 1
+                except Exception as e:
+                    logger.warning("Failed to warm scenario cache for %s/%s: %s", scenario_id, language_label, e)
+    
+    for language in LANGUAGES:
+        try:
+            get_cached_opening("Language Practice", "Language Practice Partner", language)
+            seeded += 1
+        except Exception as e:
+            logger.warning("Failed to warm Language Practice greeting for %s: %s", language, e)
+    
+    logger.info("Scenario cache warmed with %s entries in %.1fs", seeded, time.time() - started)
+
+def warm_resources():
+    resources.initialize_all()
+    warm_scenario_cache()
+
+# Expires and quota-limits generated speech off the request path
+audio_janitor = AudioJanitor(SOUND_RESPONSE_DIR, lambda: db_manager.db)
+
+@app.on_event("startup")
+async def start_scenario_cache_warmup():
+    os.makedirs(SOUND_RESPONSE_DIR, exist_ok=True)
+    threading.Thread(target=warm_resources, name="resource-warmup", daemon=True).start()
+    audio_janitor.start()
+
+def mongo_reachable():
+    db_manager.client.admin.command("ping")
+    return True
+
+@app.on_event("startup")
+async def mark_worker_ready():
+    lifecycle.add_readiness_check("resources", resources.all_initialized)
+    lifecycle.add_readiness_check("content_pack", lambda: content_pack.version is not None)
+    lifecycle.add_readiness_check("mongodb", mongo_reachable)
+    lifecycle.mark_ready()
+
+@app.on_event("shutdown")
+async def mark_worker_draining():
+    lifecycle.mark_draining()
+    audio_janitor.stop()
+    resources.close_all()
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the worker's event loop is responding."""
+    return {"status": "ok", "pid": os.getpid(), "uptime_seconds": round(time.time() - lifecycle.started_at, 1)}
+
+@app.get("/readyz")
+def readyz():
+    """Readiness: startup finished, not draining, and dependencies reachable."""
+    ready, checks = lifecycle.readiness()
+    return MongoJSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "unavailable", "checks": checks}
+    )
+
 @app.post("/api/get_scenario_response", response_model=ChatResponse)
 async def get_scenario_response(request: ChatRequest):
     username = request.username
@@ -848,38 +968,20 @@ async def get_scenario_response(request: ChatRequest):
 
     scenario = user_profile.get("scenario")
     ai_role = user_profile.get("ai_role")
-    language = user_profile.get("language", "en")
+    language = normalize_language(user_profile.get("language", "en"))
     
     if not scenario:
         raise HTTPException(status_code=400, detail="Scenario not set for this user")
     
+    opening = None
     if scenario == "Language Practice":
         ai_role = "Language Practice Partner"
-        
-        if language == "en":
-            ai_response = "Hi there! I'm your language practice partner. What would you like to talk about today?"
-        elif language in ('zh', 'zh-CN', 'zh-TW'):
-            ai_response = "你好！我是你的语言练习伙伴。今天你想聊些什么？"
-        elif language == 'ja':
-            ai_response = "こんにちは！私はあなたの言語練習パートナーです。今日は何について話したいですか？"
-        elif language == 'ko':
-            ai_response = "안녕하세요! 저는 당신의 언어 연습 파트너입니다. 오늘 무엇에 대해 이야기하고 싶으신가요?"
-        elif language == 'es':
-            ai_response = "¡Hola! Soy tu compañero de práctica de idiomas. ¿Sobre qué te gustaría hablar hoy?"
-        elif language == 'fr':
-            ai_response = "Bonjour ! Je suis votre partenaire de pratique linguistique. De quoi aimeriez-vous parler aujourd'hui ?"
-        elif language == 'de':
-            ai_response = "Hallo! Ich bin dein Sprachübungspartner. Worüber möchtest du heute sprechen?"
-        elif language == 'it':
-            ai_response = "Ciao! Sono il tuo partner di pratica linguistica. Di cosa ti piacerebbe parlare oggi?"
-        elif language == 'hi':
-            ai_response = "नमस्ते! मैं आपकी भाषा अभ्यास साथी हूं। आज आप किस विषय पर बात करना चाहेंगे?"
-        else:
-            ai_response = "Hello! I'm your language practice partner. What would you like to talk about today?"
+        opening = await anyio.to_thread.run_sync(get_cached_opening, scenario, ai_role, language)
+        ai_response = opening["text"] if opening else language_practice_greeting(language)
     else:
         ai_role = user_profile.get("ai_role")
         if not ai_role:
-            ai_role = infer_ai_role(scenario, client)
+            ai_role = await anyio.to_thread.run_sync(infer_ai_role, scenario, client, language)
             user_profile["ai_role"] = ai_role
         
         try:
@@ -891,15 +993,8 @@ async def get_scenario_response(request: ChatRequest):
                     break
             
             if not has_ai_initiated:
-                system_prompt = f"You are {ai_role} in the following scenario: {scenario}. Start with a greeting or introduction that makes sense for this specific setting. Use {language} language."
-                
-                response = client.chat.completions.create(
-                    model="gpt-3.5-turbo",
-                    messages=[{"role": "system", "content": system_prompt}],
-                    max_tokens=150,
-                    temperature=0.7,
-                )
-                ai_response = response.choices[0].message.content
+                opening = await anyio.to_thread.run_sync(get_cached_opening, scenario, ai_role, language)
+                ai_response = opening["text"]
                 
                 user_profile["chat_history"] = [{
                     "user": "AI INITIATED", 
@@ -908,24 +1003,25 @@ async def get_scenario_response(request: ChatRequest):
                 }]
                 save_user_profile(user_profile)
         except Exception as e:
-            print(f"Error generating scenario response: {e}")
+            logger.error("Error generating scenario response: %s", e)
             ai_response = f"Hello! I'm playing the role of {ai_role} in this {scenario} scenario. How can I help you today?"
 
-    audio_file = f"response-{uuid.uuid4()}.mp3"
-    audio_path = os.path.join(SOUND_RESPONSE_DIR, audio_file)
-    
+    if opening and opening.get("audio_file") and opening["text"] == ai_response:
+        return {
+            "response": ai_response,
+            "audio_url": f"/audio/{opening['audio_file']}"
+        }
+
+    registered = get_language(language)
     try:
-        from gtts import gTTS
-        voiced_response = clean_text(ai_response)
-        tts = gTTS(text=voiced_response, lang=LANGUAGE_MAP.get(language, "en"), slow=False)
-        tts.save(audio_path)
+        audio_file = speech_file("response", clean_text(ai_response), registered.tts_code, registered.tts_tld)
     except Exception as e:
-        print(f"Error generating audio: {e}")
-        audio_path = None
+        logger.error("Error generating audio: %s", e)
+        audio_file = None
 
     return {
         "response": ai_response,
-        "audio_url": f"/audio/{audio_file}" if audio_path else None
+        "audio_url": f"/audio/{audio_file}" if audio_file else None
     }
 
 @app.post("/api/set_scenario", response_model=ScenarioResponse)
@@ -941,7 +1037,7 @@ async def set_scenario(request: ScenarioRequest):
     user_profile["scenario"] = scenario
     user_profile["language"] = language
     
-    ai_role = infer_ai_role(scenario, client)
+    ai_role = await anyio.to_thread.run_sync(infer_ai_role, scenario, client, language)
     user_profile["ai_role"] = ai_role
     
     if scenario_changed:
@@ -958,18 +1054,13 @@ async def get_suggestions(request: SuggestionRequest):
     requested_language = request.language
     language_name = request.language_name
     
-    print(f"Received suggestion request for {username} in language: {requested_language}, language_name: {language_name}")
+    logger.debug("Received suggestion request for %s in language: %s, language_name: %s", username, requested_language, language_name)
     
-    if requested_language and requested_language.lower() in ['it', 'hi']:
-        special_language_map = {'it': 'Italian', 'hi': 'Hindi'}
-        normalized_language = special_language_map.get(requested_language.lower())
-        print(f"Special handling for {requested_language} -> {normalized_language}")
-    else:
-        normalized_language = normalize_language(requested_language)
+    normalized_language = normalize_language(requested_language)
     
     user_profile = load_user_profile(username)
     if not user_profile:
-        print(f"User profile not found for {username}, using default suggestions")
+        logger.debug("User profile not found for %s, using default suggestions", username)
         return {"suggestions": DEFAULT_SUGGESTIONS}
     
     if requested_language:
@@ -978,11 +1069,11 @@ async def get_suggestions(request: SuggestionRequest):
             user_profile['language'] = normalized_language
             user_profile['locale'] = requested_language
             save_user_profile(user_profile)
-            print(f"Updated user {username} language from {old_language} to {normalized_language}")
+            logger.debug("Updated user %s language from %s to %s", username, old_language, normalized_language)
     else:
-        normalized_language = user_profile.get("language", "en")
+        normalized_language = normalize_language(user_profile.get("language", "en"))
     
-    print(f"Generating suggestions for {username} in language: {normalized_language}")
+    logger.debug("Generating suggestions for %s in language: %s", username, normalized_language)
     
     chat_history = user_profile.get("chat_history", [])
     
@@ -992,9 +1083,9 @@ async def get_suggestions(request: SuggestionRequest):
         
         if scenario and scenario != "Language Practice":
             try:
-                return generate_scenario_suggestions(scenario, ai_role, normalized_language)
+                return await generate_scenario_suggestions(scenario, ai_role, normalized_language)
             except Exception as e:
-                print(f"Error generating scenario-specific suggestions: {e}")
+                logger.error("Error generating scenario-specific suggestions: %s", e)
         
         return get_default_suggestions(normalized_language)
     
@@ -1011,12 +1102,6 @@ async def get_suggestions(request: SuggestionRequest):
         scenario = user_profile.get("scenario", "Language Practice")
         ai_role = user_profile.get("ai_role", "Conversation Partner")
         
-        if normalized_language.lower() in ['italian', 'hindi', 'it', 'hi']:
-            language_display = "Italian" if normalized_language.lower() in ['italian', 'it'] else "Hindi"
-            special_instruction = f"IMPORTANT: Generate suggestions ONLY in {language_display}. DO NOT use English at all!"
-        else:
-            special_instruction = ""
-        
         scenario_content = "" if scenario == "Language Practice" else f"This conversation is taking place in the following scenario: {scenario}. The AI is playing the role of {ai_role}."
         prompt = f"""
         {scenario_content}
@@ -1030,61 +1115,56 @@ async def get_suggestions(request: SuggestionRequest):
         Each suggestion must be a complete statements or question. Keep suggestions brief, under 20 words each.
         The responses must be relevant to the conversation context and appropriate for the scenario.
         
-        Respond in {normalized_language} language.
-        
-        {special_instruction}
+        Respond in {get_language(normalized_language).name}.
         
         IMPORTANT: Provide only plain text suggestions. No bullet points, no numbering, no dashes.
         Just provide 3 simple sentences, one per line.
         """
         
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "system", "content": prompt}],
-            temperature=0.7,
-            max_tokens=200,
-            presence_penalty=0.2,
-        )
-        
-        suggestions_text = response.choices[0].message.content.strip()        
-        suggestions_raw = [s.strip() for s in suggestions_text.split('\n') if s.strip()]
-        suggestions = []
-        
-        for suggestion in suggestions_raw:
-            cleaned = re.sub(r'^[\d\.\-\*\•\⁃\⦁\◦\▪\□\▫\–\—\⁌\→\>\s]+', '', suggestion).strip()
-            if cleaned:
-                suggestions.append(cleaned)
+        async def single():
+            response = await complete_in_language(
+                normalized_language, "get_suggestions",
+                model="gpt-3.5-turbo",
+                messages=[{"role": "system", "content": prompt}],
+                temperature=0.7,
+                max_tokens=200,
+                presence_penalty=0.2,
+            )
+            return split_suggestions(response.choices[0].message.content.strip())
         
-        suggestions = suggestions[:3]
+        candidates = await suggestion_batcher.submit(prompt, get_language(normalized_language).name, single)
         
-        if normalized_language.lower() in ['italian', 'hindi', 'it', 'hi']:
-            valid_suggestions = []
-            for suggestion in suggestions:
-                if is_correct_language(suggestion, normalized_language):
-                    valid_suggestions.append(suggestion)
-                else:
-                    print(f"Invalid language detected in suggestion: {suggestion}")
-                    fallback = get_fallback_in_language(normalized_language)
-                    valid_suggestions.append(fallback)
-            suggestions = valid_suggestions
-        
-        while len(suggestions) < 3:
-            fallbacks = get_fallback_suggestions(normalized_language)
-            for fallback in fallbacks:
-                if fallback not in suggestions:
-                    suggestions.append(fallback)
-                    if len(suggestions) >= 3:
-                        break
-        
-        print(f"Final suggestions: {suggestions}")
-        return {"suggestions": suggestions[:3]}
+        suggestions = fill_suggestions(candidates, normalized_language)
+        logger.debug("Final suggestions: %s", suggestions)
+        return {"suggestions": suggestions}
         
     except Exception as e:
-        print(f"Error generating suggestions: {e}")
+        logger.error("Error generating suggestions: %s", e)
         return get_default_suggestions(normalized_language)
 
 
-def generate_scenario_suggestions(scenario, ai_role, language):
+def fill_suggestions(candidates, language, count=3):
+    """
+    The first `count` candidates that pass the language check, topped up from
+    the remaining candidates and then the canned fallbacks, so a dropped line
+    never shrinks the list.
+    """
+    suggestions = []
+    for suggestion in candidates:
+        if len(suggestions) >= count:
+            break
+        if matches_language(suggestion, language):
+            suggestions.append(suggestion)
+        else:
+            logger.debug("Invalid language detected in suggestion: %s", suggestion)
+    for fallback in get_fallback_suggestions(language):
+        if len(suggestions) >= count:
+            break
+        if fallback not in suggestions:
+            suggestions.append(fallback)
+    return suggestions
+
+async def generate_scenario_suggestions(scenario, ai_role, language):
     prompt = f"""
     You're helping a language learner practice in this scenario: {scenario}.
     The AI is playing the role of: {ai_role}.
@@ -1093,152 +1173,26 @@ def generate_scenario_suggestions(scenario, ai_role, language):
     Most suggestions must be STATEMENTS (maximum 1 question out of 3), and Fit the roleplay scenario naturally.
     Each suggestion should be a complete statement or question, appropriate for starting or continue a conversation.
     Keep suggestions brief (under 20 words) and natural for this specific scenario topic.
-    Respond in {language}.
+    Respond in {get_language(language).name}.
     You must generate suggestions that in complete sentences, not just keywords or phrases.
     
     IMPORTANT: Provide only plain text suggestions. No bullet points, no numbering, no dashes.
     Just provide 3 simple sentences, one per line.
     """
     
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.7,
-        max_tokens=150,
-    )
-    
-    suggestions_text = response.choices[0].message.content.strip()
-    
-    suggestions_raw = [s.strip() for s in suggestions_text.split('\n') if s.strip()]
-    suggestions = []
-    
-    for suggestion in suggestions_raw:
-        cleaned = re.sub(r'^[\d\.\-\*\•\⁃\⦁\◦\▪\□\▫\–\—\⁌\→\>\s]+', '', suggestion).strip()
-        if cleaned:
-            suggestions.append(cleaned)
-    
-    suggestions = suggestions[:3]
-    
-    return {"suggestions": suggestions}
-
-
-def get_default_suggestions(language_code):
-    """Simple default suggestions for when there's no conversation history"""
-    defaults = {
-        'en': ["Hello, how are you?", "Nice to meet you!", "What would you like to talk about?"],
-        'zh-cn': ["你好，你好吗？", "很高兴认识你！", "你想聊些什么？"],
-        'ja': ["こんにちは、お元気ですか？", "はじめまして！", "何について話したいですか？"],
-        'ko': ["안녕하세요, 어떻게 지내세요?", "만나서 반갑습니다!", "무엇에 대해 이야기하고 싶으세요?"],
-        'es': ["¡Hola! ¿Cómo estás?", "¡Encantado de conocerte!", "¿De qué te gustaría hablar?"],
-        'fr': ["Bonjour ! Comment ça va ?", "Ravi de faire votre connaissance !", "De quoi voudrais-tu parler ?"],
-        'de': ["Hallo! Wie geht es dir?", "Schön, dich kennenzulernen!", "Worüber möchtest du sprechen?"],
-        'it': ["Ciao! Come stai?", "Piacere di conoscerti!", "Di cosa ti piacerebbe parlare?"],
-        'hi': ["नमस्ते! आप कैसे हैं?", "आपसे मिलकर खुशी हुई!", "आप किस बारे में बात करना चाहेंगे?"],
-    }
-    
-    normalized_code = normalize_language(language_code).lower()
-    return {"suggestions": defaults.get(normalized_code, defaults['en'])}
-
-def is_correct_language(text, language):
-    if language.lower() in ['italian', 'it']:
-        italian_words = ['ciao', 'buongiorno', 'grazie', 'prego', 'come', 'sono', 'mi', 'tu', 'che', 'e', 'il', 'la']
-        return any(word in text.lower() for word in italian_words) and 'the' not in text.lower() and 'is' not in text.lower()
-    elif language.lower() in ['hindi', 'hi']:
-        hindi_chars = ['\u0900', '\u0901', '\u0902', '\u0903', '\u0904', '\u0905', '\u0906', '\u0907', '\u0908', '\u0909', '\u090A', '\u090B', '\u090C', '\u090D', '\u090E', '\u090F', '\u0910', '\u0911', '\u0912', '\u0913', '\u0914', '\u0915', '\u0916', '\u0917', '\u0918', '\u0919', '\u091A', '\u091B', '\u091C', '\u091D', '\u091E', '\u091F', '\u0920', '\u0921', '\u0922', '\u0923', '\u0924', '\u0925', '\u0926', '\u0927', '\u0928', '\u0929', '\u092A', '\u092B', '\u092C', '\u092D', '\u092E', '\u092F', '\u0930', '\u0931', '\u0932', '\u0933', '\u0934', '\u0935', '\u0936', '\u0937', '\u0938', '\u0939', '\u093A', '\u093B', '\u093C', '\u093D', '\u093E', '\u093F', '\u0940', '\u0941', '\u0942', '\u0943', '\u0944', '\u0945', '\u0946', '\u0947', '\u0948', '\u0949', '\u094A', '\u094B', '\u094C', '\u094D', '\u094E', '\u094F', '\u0950', '\u0951', '\u0952', '\u0953', '\u0954', '\u0955', '\u0956', '\u0957', '\u0958', '\u0959', '\u095A', '\u095B', '\u095C', '\u095D', '\u095E', '\u095F', '\u0960', '\u0961', '\u0962', '\u0963', '\u0964', '\u0965', '\u0966', '\u0967', '\u0968', '\u0969', '\u096A', '\u096B', '\u096C', '\u096D', '\u096E', '\u096F', '\u0970', '\u0971', '\u0972', '\u0973', '\u0974', '\u0975', '\u0976', '\u0977', '\u0978', '\u0979', '\u097A', '\u097B', '\u097C', '\u097D', '\u097E', '\u097F']
-        return any(char in text for char in hindi_chars)
-    return True
-
-def get_fallback_in_language(language):
-    if language.lower() in ['italian', 'it']:
-        fallbacks = [
-            "Mi piacerebbe sapere di più su questo.",
-            "Potrebbe spiegare meglio, per favore?",
-            "Interessante, continui pure."
-        ]
-    elif language.lower() in ['hindi', 'hi']:
-        fallbacks = [
-            "मुझे इस बारे में अधिक जानना अच्छा लगेगा।",
-            "क्या आप इसे बेहतर ढंग से समझा सकते हैं?",
-            "दिलचस्प, कृपया जारी रखें।"
-        ]
-    else:
-        fallbacks = DEFAULT_SUGGESTIONS
-    
-    import random
-    return random.choice(fallbacks)
-
-
-def get_fallback_suggestions(language_code):
-    fallbacks = {
-        'en': ["I understand what you're saying.", "That's interesting. Can you tell me more?", 
-               "I agree with your perspective.", "What do you think about this?"],
-        'zh-cn': ["我理解你的意思。", "真有意思，能告诉我更多吗？", "我同意你的观点。", "你对此有什么看法？"],
-        'zh-tw': ["我理解你的意思。", "真有意思，能告訴我更多嗎？", "我同意你的觀點。", "你對此有什麼看法？"],
-        'ja': ["あなたの言っていることは理解できます。", "それは面白いですね。もっと教えてください。",
-               "あなたの視点に同意します。", "これについてどう思いますか？"],
-        'ko': ["당신이 말하는 것을 이해합니다.", "흥미롭네요. 더 자세히 알려주시겠어요?",
-               "당신의 관점에 동의합니다.", "이것에 대해 어떻게 생각하세요?"],
-        'es': ["Entiendo lo que estás diciendo.", "Eso es interesante. ¿Puedes contarme más?",
-               "Estoy de acuerdo con tu perspectiva.", "¿Qué piensas sobre esto?"],
-        'fr': ["Je comprends ce que tu dis.", "C'est intéressant. Peux-tu m'en dire plus ?",
-               "Je suis d'accord avec ton point de vue.", "Qu'en penses-tu ?"],
-        'de': ["Ich verstehe, was du sagst.", "Das ist interessant. Kannst du mir mehr darüber erzählen?",
-               "Ich stimme deiner Perspektive zu.", "Was denkst du darüber?"],
-        'it': ["Capisco quello che stai dicendo.", "È interessante. Puoi dirmi di più?",
-               "Sono d'accordo con la tua prospettiva.", "Cosa ne pensi di questo?"],
-    }
-    
-    normalized_code = normalize_language(language_code).lower()
-    return fallbacks.get(normalized_code, fallbacks['en'])
-
-def get_default_suggestions(language):
-    default_suggestions = {
-        'english': ["Tell me more about that.", "What do you think about this?", "Can you explain that further?"],
-        'en': ["Tell me more about that.", "What do you think about this?", "Can you explain that further?"],
-        'chinese': ["告诉我更多关于那个的信息。", "你对这个有什么想法？", "你能进一步解释一下吗？"],
-        'zh-cn': ["告诉我更多关于那个的信息。", "你对这个有什么想法？", "你能进一步解释一下吗？"],
-        'chinese traditional': ["告訴我更多關於那個的信息。", "你對這個有什麼想法？", "你能進一步解釋一下嗎？"],
-        'zh-tw': ["告訴我更多關於那個的信息。", "你對這個有什麼想法？", "你能進一步解釋一下嗎？"],
-        'japanese': ["それについてもっと教えてください。", "これについてどう思いますか？", "もう少し詳しく説明してもらえますか？"],
-        'ja': ["それについてもっと教えてください。", "これについてどう思いますか？", "もう少し詳しく説明してもらえますか？"],
-        'korean': ["그것에 대해 더 자세히 알려주세요.", "이것에 대해 어떻게 생각하세요?", "더 자세히 설명해 주시겠어요?"],
-        'ko': ["그것에 대해 더 자세히 알려주세요.", "이것에 대해 어떻게 생각하세요?", "더 자세히 설명해 주시겠어요?"],
-        'spanish': ["Cuéntame más sobre eso.", "¿Qué piensas sobre esto?", "¿Puedes explicar eso con más detalle?"],
-        'es': ["Cuéntame más sobre eso.", "¿Qué piensas sobre esto?", "¿Puedes explicar eso con más detalle?"],
-        'french': ["Parlez-moi davantage de cela.", "Que pensez-vous de ceci?", "Pouvez-vous expliquer cela plus en détail?"],
-        'fr': ["Parlez-moi davantage de cela.", "Que pensez-vous de ceci?", "Pouvez-vous expliquer cela plus en détail?"],
-        'italian': ["Dimmi di più a riguardo.", "Cosa ne pensi di questo?", "Puoi spiegarlo più dettagliatamente?"],
-        'it': ["Dimmi di più a riguardo.", "Cosa ne pensi di questo?", "Puoi spiegarlo più dettagliatamente?"],
-        'german': ["Erzählen Sie mir mehr darüber.", "Was denken Sie darüber?", "Können Sie das genauer erklären?"],
-        'de': ["Erzählen Sie mir mehr darüber.", "Was denken Sie darüber?", "Können Sie das genauer erklären?"],
-        'hindi': ["मुझे इसके बारे में और बताओ।", "आप इसके बारे में क्या सोचते हैं?", "क्या आप इसे और विस्तार से समझा सकते हैं?"],
-        'hi': ["मुझे इसके बारे में और बताओ।", "आप इसके बारे में क्या सोचते हैं?", "क्या आप इसे और विस्तार से समझा सकते हैं?"]
-    }
+    async def single():
+        response = await complete_in_language(
+            language, "scenario_suggestions",
+            model="gpt-3.5-turbo",
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.7,
+            max_tokens=150,
+        )
+        return split_suggestions(response.choices[0].message.content.strip())
     
-    language_key = language.lower()
-    return {"suggestions": default_suggestions.get(language_key, default_suggestions['english'])}
-
+    candidates = await suggestion_batcher.submit(prompt, get_language(language).name, single)
+    return {"suggestions": fill_suggestions(candidates, language)}
 
-def normalize_language(language_code):
-    if not language_code:
-        return 'en'
-        
-    language_code = str(language_code).lower().strip()
-    
-    language_mapping = {
-        'english': 'en', 'en': 'en', 'en-us': 'en', 'en-gb': 'en',
-        'chinese': 'zh-cn', 'chinese (simplified)': 'zh-cn', 'zh': 'zh-cn', 'zh-cn': 'zh-cn',
-        'chinese (traditional)': 'zh-tw', 'zh-tw': 'zh-tw', 'traditional chinese': 'zh-tw',
-        'japanese': 'ja', 'ja': 'ja', 'ja-jp': 'ja',
-        'korean': 'ko', 'ko': 'ko', 'ko-kr': 'ko',
-        'spanish': 'es', 'es': 'es', 'es-es': 'es', 'es-mx': 'es',
-        'french': 'fr', 'fr': 'fr', 'fr-fr': 'fr',
-        'german': 'de', 'de': 'de', 'de-de': 'de',
-        'italian': 'it', 'it': 'it', 'it-it': 'it',
-        'hindi': 'hi', 'hi': 'hi', 'hi-in': 'hi',
-    }
-    
-    return language_mapping.get(language_code, language_code)
 
 @app.post("/api/translate")
 async def translate_text(request: Request):
@@ -1248,10 +1202,11 @@ async def translate_text(request: Request):
     target = data.get("target", "en")
     
     if not text:
-        return JSONResponse({"error": "No text provided"}, status_code=400)
+        return MongoJSONResponse({"error": "No text provided"}, status_code=400)
     
     try:
-        response = client.chat.completions.create(
+        response = await complete_in_language(
+            target, "translate",
             model="gpt-3.5-turbo",
             messages=[
                 {"role": "system", "content": f"You are a translator. Translate the text from {source} to {target}. Only return the translated text, nothing else."},
@@ -1262,27 +1217,23 @@ async def translate_text(request: Request):
         )
         translated_text = response.choices[0].message.content.strip()
         
-        return JSONResponse({
+        return MongoJSONResponse({
             "translated_text": translated_text,
             "source": source,
             "target": target
         })
     except Exception as e:
-        print(f"Translation error: {str(e)}")
-        return JSONResponse({"error": str(e)}, status_code=500)
+        logger.error("Translation error: %s", e)
+        return MongoJSONResponse({"error": str(e)}, status_code=500)
 
 
 @app.post("/api/get_lessons")
 async def get_lessons(request: dict):
     username = request.get("username")
-    language = request.get("language", "English")
+    language = normalize_language(request.get("language", "English"))
     user_profile = load_user_profile(username) 
     chat_history = user_profile.get("chat_history", [])
-    language_name = "English"
-    for name, code in LANGUAGE_MAP.items():
-        if code == language:
-            language_name = name
-            break
+    language_name = get_language(language).name
     
     if len(chat_history) < 3:
         return {
@@ -1317,8 +1268,9 @@ async def get_lessons(request: dict):
         Be concise but specific in your analysis.
         """
         
-        analysis_response = client.chat.completions.create(
-            model="gpt-4",
+        analysis_response = await model_router.complete_async(
+            "analysis",
+            quality_check=lambda r: len((r.choices[0].message.content or "").strip()) >= 100,
             messages=[{"role": "system", "content": analysis_prompt}],
             max_tokens=400,
             temperature=0.5,
@@ -1342,8 +1294,9 @@ async def get_lessons(request: dict):
         Provide exactly 3 plain, descriptive sentences. No titles, no colons, no quotation marks.
         """
         
-        suggestion_response = client.chat.completions.create(
-            model="gpt-4",
+        suggestion_response = await model_router.complete_async(
+            "lesson_plan",
+            quality_check=lambda r: len([l for l in (r.choices[0].message.content or "").split('\n') if len(l.strip()) > 10]) >= 3,
             messages=[{"role": "system", "content": suggestion_prompt}],
             max_tokens=400,
             temperature=0.7,
@@ -1353,7 +1306,7 @@ async def get_lessons(request: dict):
         
         lesson_descriptions = []
         for line in suggestions_text.strip().split('\n'):
-            cleaned = re.sub(r'^[\d\.\-\*\•\⁃\⦁\◦\▪\□\▫\–\—\⁌\→\>\s]+', '', line).strip()
+            cleaned = strip_list_marker(line)
             cleaned = cleaned.replace('"', '').replace("'", "")
             if ':' in cleaned:
                 cleaned = cleaned.split(':', 1)[1].strip()
@@ -1361,26 +1314,10 @@ async def get_lessons(request: dict):
                 lesson_descriptions.append(cleaned)
         
         while len(lesson_descriptions) < 3:
-            if language == "en":
-                lesson_descriptions.append("Practice natural dialogue flows and common expressions used in casual settings")
-            elif language in ('zh', 'zh-CN', 'zh-TW'):
-                lesson_descriptions.append("练习在日常交流中自然的对话流程和常用表达方式")
-            elif language == "ja":
-                lesson_descriptions.append("日常会話の自然な流れとカジュアルな表現を練習する")
-            elif language == "ko":
-                lesson_descriptions.append("일상 대화의 자연스러운 흐름과 일반적인 표현을 연습하기")
-            elif language == "es":
-                lesson_descriptions.append("Practica los flujos de diálogo naturales y las expresiones comunes utilizadas en situaciones informales")
-            elif language == "fr":
-                lesson_descriptions.append("Pratiquez les flux de dialogue naturels et les expressions courantes utilisées dans des contextes informels")
-            elif language == "de":
-                lesson_descriptions.append("Üben Sie natürliche Dialogflüsse und gängige Ausdrücke, die in informellen Situationen verwendet werden")
-            elif language == "it":
-                lesson_descriptions.append("Pratica i flussi di dialogo naturali e le espressioni comuni utilizzate in contesti informali")
-            elif language == "hi":
-                lesson_descriptions.append("आम बातचीत में प्राकृतिक संवाद प्रवाह और सामान्य अभिव्यक्तियों का अभ्यास करें")
-            else:
-                lesson_descriptions.append("Practice natural dialogue flows and common expressions used in casual settings")
+            lesson_descriptions.append(content_pack.get(
+                language, "lesson_fallback",
+                "Practice natural dialogue flows and common expressions used in casual settings"
+            ))
         
         critique_lines = []
         for line in analysis.split('\n'):
@@ -1397,7 +1334,7 @@ async def get_lessons(request: dict):
         }
         
     except Exception as e:
-        print(f"Error generating lesson suggestions: {e}")
+        logger.error("Error generating lesson suggestions: %s", e)
         return {
             "critique": "We encountered an issue analyzing your conversation.",
             "lessons": [
@@ -1407,36 +1344,15 @@ async def get_lessons(request: dict):
             ]
         }
     
-def clean_text(text):
-    text = re.sub(r'([.!?])\1+', r'\1', text)
-    text = text.replace(".", ". ")
-    text = text.replace("!", "! ")
-    text = text.replace("?", "? ")
-    text = re.sub(r'[^\w\s.!?,;:\-\'"\(\)，。？！；：""''（）【】]', '', text)
-    text = re.sub(r'\s+', ' ', text).strip()
-    
-    return text   
-
 @app.post("/api/generate_practice_sentence", response_model=PracticeSentence)
 async def generate_practice_sentence(request: PracticeSentenceRequest):
     """Generate a language practice sentence based on language and difficulty"""
     try:
         username = request.username
         difficulty = request.difficulty
-        language_code = request.language
-                
-        language_name = {
-            "en": "English",
-            "es": "Spanish",
-            "fr": "French",
-            "de": "German",
-            "it": "Italian",
-            "zh-CN": "Chinese (Simplified)",
-            "ja": "Japanese",
-            "ko": "Korean",
-            "hi": "Hindi",
-            "zh-TW": "Chinese (Traditional)",
-        }.get(language_code, "English")
+        language = get_language(request.language)
+        language_code = language.code
+        language_name = language.name
         
         if difficulty == "easy":
             prompt = f"""Generate one common word in {language_name} that would be appropriate for a beginner 
@@ -1456,7 +1372,8 @@ async def generate_practice_sentence(request: PracticeSentenceRequest):
                       DO NOT translate to English. The sentence MUST be in {language_name} script only."""
         
         try:
-            response = client.chat.completions.create(
+            response = await complete_in_language(
+                language_code, "practice_sentence",
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": f"You are a language tutor helping students practice {language_name} pronunciation. Always respond in {language_name} only."},
@@ -1471,49 +1388,19 @@ async def generate_practice_sentence(request: PracticeSentenceRequest):
             practice_content = response.choices[0].message.content.strip()
             practice_content = practice_content.strip('"\'')
             
-            print(f"Generated content: {practice_content}")
-            
-            audio_file = f"practice-{uuid.uuid4()}.mp3"
-            audio_path = os.path.join(SOUND_RESPONSE_DIR, audio_file)
+            logger.debug("Generated content: %s", practice_content)
             
             try:
-                from gtts import gTTS
-                import time
-                
-                voiced_response = clean_text(practice_content)
-                
-                if language_code not in ["zh-TW", "zh-CN", "zh", "ja", "ko", "hi"]:
-                    voiced_response = re.sub(r'([.!?]) ', r'\1  ', voiced_response)
-                    voiced_response = re.sub(r'([,;:]) ', r'\1 ', voiced_response)
-                
-                tts_lang = LANGUAGE_MAP.get(language_code, "en")
-                
-                use_slow = language_code in ["zh-TW", "zh-CN", "zh", "hi", "ja", "ko"]
-                
-                tld = "com"
-                if language_code == "fr":
-                    tld = "fr"
-                elif language_code == "es":
-                    tld = "es"
-                elif language_code == "de":
-                    tld = "de"
+                voiced_response = space_sentences_for_tts(clean_text(practice_content), language_code)
                 
                 if difficulty == "easy":
                     voiced_response = f"{voiced_response}"
                 
-                tts = gTTS(
-                    text=voiced_response, 
-                    lang=tts_lang, 
-                    slow=use_slow,
-                    tld=tld
-                )
-                
-                tts.save(audio_path)
-                
-                time.sleep(0.1)
+                audio_file = speech_file("practice", voiced_response, language.tts_code,
+                                         tld=language.tts_tld, slow=language.tts_slow)
                 audio_url = f"/audio/{audio_file}"
             except Exception as e:
-                print(f"Error generating audio: {e}")
+                logger.error("Error generating audio: %s", e)
                 audio_url = None
                 
             return PracticeSentence(
@@ -1523,194 +1410,29 @@ async def generate_practice_sentence(request: PracticeSentenceRequest):
             )
             
         except Exception as api_error:
-            print(f"OpenAI API error: {str(api_error)}")
+            logger.error("OpenAI API error: %s", api_error)
             raise api_error
             
     except Exception as e:
-        print(f"Error generating practice content: {str(e)}")
-        FALLBACK_CONTENT = {
-            "en": {
-                "easy": ["hello", "apple", "book", "friend", "water", "house", "dog", "cat", 
-                        "good", "happy", "yes", "no", "please", "thank you", "sorry", "goodbye", 
-                        "welcome", "help", "food", "school", "family", "work", "play", "love", "music", 
-                        "movie", "game", "city", "country", "travel", "weather", "time", "day", "night"],
-                "medium": [
-                    "I'd like to schedule an appointment.",
-                    "Could you please repeat that?",
-                    "What time does the meeting start?", 
-                    "I need to improve my pronunciation.",
-                    "Can you help me with my homework?",
-                    "I enjoy reading books in my free time.",
-                    "The weather is nice today.",
-                    "I would like to order a coffee.",
-                    "Can you recommend a good restaurant?"
-                ],
-                "hard": [
-                    "The pronunciation of certain English words can be challenging.",
-                    "I believe that effective communication is essential in today's global economy.", 
-                    "Understanding cultural nuances can greatly enhance language learning.",
-                    "The intricacies of grammar can often lead to confusion for learners."
-                ]
-            },
-            "ja": {
-                "easy": ["こんにちは", "りんご", "本", "友達", "水", "家", "犬", "猫", "良い", "嬉しい", 
-                        "はい", "いいえ", "お願いします", "ありがとう", "すみません", "さようなら", 
-                        "いらっしゃいませ", "助け", "食べ物", "学校", "家族", "仕事", "遊ぶ", "愛", "音楽"],
-                "medium": [
-                    "予約を取りたいのですが。",
-                    "もう一度言っていただけますか？",
-                    "会議は何時に始まりますか？",
-                    "発音を改善したいです。",
-                    "宿題を手伝ってもらえますか？"
-                ],
-                "hard": [
-                    "日本語の発音は時として難しいことがあります。",
-                    "効果的なコミュニケーションは現代のグローバル経済において不可欠です。",
-                    "文化的なニュアンスを理解することで語学学習が大幅に向上します。"
-                ]
-            },
-            "ko": {
-                "easy": ["안녕하세요", "사과", "책", "친구", "물", "집", "개", "고양이", "좋은", "행복한",
-                        "네", "아니요", "부탁합니다", "감사합니다", "죄송합니다", "안녕히 가세요",
-                        "환영합니다", "도움", "음식", "학교", "가족", "일", "놀기", "사랑", "음악"],
-                "medium": [
-                    "예약을 하고 싶습니다.",
-                    "다시 한 번 말씀해 주시겠어요?",
-                    "회의는 몇 시에 시작하나요?",
-                    "발음을 개선하고 싶습니다.",
-                    "숙제를 도와주시겠어요?"
-                ],
-                "hard": [
-                    "한국어 발음은 때때로 어려울 수 있습니다.",
-                    "효과적인 의사소통은 오늘날의 글로벌 경제에서 필수적입니다.",
-                    "문화적 뉘앙스를 이해하면 언어 학습이 크게 향상될 수 있습니다."
-                ]
-            },
-            "zh-CN": {
-                "easy": ["你好", "苹果", "书", "朋友", "水", "家", "狗", "猫", "好", "快乐",
-                        "是", "不", "请", "谢谢", "对不起", "再见", "欢迎", "帮助", "食物", "学校"],
-                "medium": [
-                    "我想预约一下。",
-                    "你能再说一遍吗？", 
-                    "会议什么时候开始？",
-                    "我需要改善我的发音。",
-                    "你能帮我做作业吗？"
-                ],
-                "hard": [
-                    "中文发音有时可能很有挑战性。",
-                    "我认为有效的沟通在当今全球经济中是必不可少的。",
-                    "理解文化细节可以大大提高语言学习效果。"
-                ]
-            },
-            "es": {
-                "easy": ["hola", "manzana", "libro", "amigo", "agua", "casa", "perro", "gato", 
-                        "bueno", "feliz", "sí", "no", "por favor", "gracias", "lo siento", "adiós"],
-                "medium": [
-                    "Me gustaría programar una cita.",
-                    "¿Podrías repetir eso?",
-                    "¿A qué hora empieza la reunión?",
-                    "Necesito mejorar mi pronunciación.",
-                    "¿Puedes ayudarme con mi tarea?"
-                ],
-                "hard": [
-                    "La pronunciación de ciertas palabras españolas puede ser desafiante.",
-                    "Creo que la comunicación efectiva es esencial en la economía global de hoy.",
-                    "Entender los matices culturales puede mejorar enormemente el aprendizaje de idiomas."
-                ]
-            },
-            "fr": {
-                "easy": ["bonjour", "pomme", "livre", "ami", "eau", "maison", "chien", "chat", 
-                        "bon", "heureux", "oui", "non", "s'il vous plaît", "merci", "désolé", "au revoir"],
-                "medium": [
-                    "J'aimerais prendre rendez-vous.",
-                    "Pourriez-vous répéter cela ?",
-                    "À quelle heure commence la réunion ?",
-                    "Je dois améliorer ma prononciation.",
-                    "Pouvez-vous m'aider avec mes devoirs ?"
-                ],
-                "hard": [
-                    "La prononciation de certains mots français peut être difficile.",
-                    "Je crois que la communication efficace est essentielle dans l'économie mondiale actuelle.",
-                    "Comprendre les nuances culturelles peut grandement améliorer l'apprentissage des langues."
-                ]
-            },
-            "de": {
-                "easy": ["hallo", "apfel", "buch", "freund", "wasser", "haus", "hund", "katze", 
-                        "gut", "glücklich", "ja", "nein", "bitte", "danke", "entschuldigung", "auf wiedersehen"],
-                "medium": [
-                    "Ich möchte einen Termin vereinbaren.",
-                    "Könnten Sie das bitte wiederholen?",
-                    "Wann beginnt das Meeting?",
-                    "Ich muss meine Aussprache verbessern.",
-                    "Können Sie mir bei meinen Hausaufgaben helfen?"
-                ],
-                "hard": [
-                    "Die Aussprache bestimmter deutscher Wörter kann herausfordernd sein.",
-                    "Ich glaube, dass effektive Kommunikation in der heutigen globalen Wirtschaft unerlässlich ist.",
-                    "Das Verständnis kultureller Nuancen kann das Sprachenlernen erheblich verbessern."
-                ]
-            },
-            "it": {
-                "easy": ["ciao", "mela", "libro", "amico", "acqua", "casa", "cane", "gatto", 
-                        "buono", "felice", "sì", "no", "per favore", "grazie", "mi dispiace", "arrivederci"],
-                "medium": [
-                    "Vorrei prenotare un appuntamento.",
-                    "Puoi ripetere per favore?",
-                    "A che ora inizia la riunione?",
-                    "Devo migliorare la mia pronuncia.",
-                    "Puoi aiutarmi con i compiti?"
-                ],
-                "hard": [
-                    "La pronuncia di alcune parole italiane può essere impegnativa.",
-                    "Credo che una comunicazione efficace sia essenziale nell'economia globale di oggi.",
-                    "Comprendere le sfumature culturali può migliorare notevolmente l'apprendimento delle lingue."
-                ]
-            },
-            "hi": {
-                "easy": ["नमस्ते", "सेब", "किताब", "मित्र", "पानी", "घर", "कुत्ता", "बिल्ली", 
-                        "अच्छा", "खुश", "हाँ", "नहीं", "कृपया", "धन्यवाद", "माफ़ कीजिये", "अलविदा"],
-                "medium": [
-                    "मैं एक अपॉइंटमेंट लेना चाहता हूँ।",
-                    "क्या आप इसे दोहरा सकते हैं?",
-                    "बैठक कब शुरू होगी?",
-                    "मुझे अपनी उच्चारण सुधारने की जरूरत है।",
-                    "क्या आप मेरी होमवर्क में मदद कर सकते हैं?"
-                ],
-                "hard": [
-                    "कुछ हिंदी शब्दों का उच्चारण चुनौतीपूर्ण हो सकता है।",
-                    "मेरा मानना है कि प्रभावी संवाद आज की वैश्विक अर्थव्यवस्था में आवश्यक है।",
-                    "संस्कृति के बारीकियों को समझना भाषा सीखने को बहुत बढ़ा सकता है।"
-                ]
-            }
-        }
+        logger.error("Error generating practice content: %s", e)
         
         try:
-            lang_code = language_code if language_code in FALLBACK_CONTENT else "en"
-            fallback_options = FALLBACK_CONTENT[lang_code][difficulty]
+            fallback_options = content_pack.get(language_code, "practice", {})[difficulty]
             fallback_content = random.choice(fallback_options)
             
-            print(f"Using fallback content: {fallback_content}")
-            
-            audio_file = f"practice-{uuid.uuid4()}.mp3"
-            audio_path = os.path.join(SOUND_RESPONSE_DIR, audio_file)
+            logger.debug("Using fallback content: %s", fallback_content)
             
             try:
-                from gtts import gTTS
                 voiced_response = clean_text(fallback_content)
                 
                 if difficulty == "easy":
                     voiced_response = f"{voiced_response}. {voiced_response}"
                 
-                tts = gTTS(
-                    text=voiced_response, 
-                    lang=LANGUAGE_MAP.get(language_code, "en"), 
-                    slow=language_code in ["zh-TW", "zh-CN", "zh", "hi", "ja", "ko"],
-                    tld="com"
-                )
-                tts.save(audio_path)
+                audio_file = speech_file("practice", voiced_response, language.tts_code,
+                                         tld=language.tts_tld, slow=language.tts_slow)
                 audio_url = f"/audio/{audio_file}"
             except Exception as audio_error:
-                print(f"Error generating audio for fallback: {audio_error}")
+                logger.error("Error generating audio for fallback: %s", audio_error)
                 audio_url = None
                 
             return PracticeSentence(
@@ -1720,7 +1442,7 @@ async def generate_practice_sentence(request: PracticeSentenceRequest):
             )
             
         except Exception as fallback_error:
-            print(f"Error using fallback content: {str(fallback_error)}")
+            logger.error("Error using fallback content: %s", fallback_error)
             
             if difficulty == "easy":
                 return PracticeSentence(
@@ -1740,25 +1462,14 @@ async def generate_varied_word(request: Request):
     """Alternative endpoint for generating varied vocabulary"""
     try:
         data = await request.json()
-        language = data.get("language", "en")
+        language = normalize_language(data.get("language", "en"))
         difficulty_level = data.get("difficulty_level", 1)
         seed = data.get("seed", random.randint(1, 1000000))
         avoid_words = data.get("avoid_words", [])
         
         random.seed(seed)
         
-        language_name = {
-            "en": "English",
-            "es": "Spanish", 
-            "fr": "French",
-            "de": "German",
-            "it": "Italian",
-            "zh-CN": "Chinese (Simplified)",
-            "ja": "Japanese",
-            "ko": "Korean",
-            "hi": "Hindi",
-            "zh-TW": "Chinese (Traditional)",
-        }.get(language, "English")
+        language_name = get_language(language).name
         
         avoid_text = f"Do not use these words: {', '.join(avoid_words[:20])}" if avoid_words else ""
         
@@ -1778,7 +1489,7 @@ async def generate_varied_word(request: Request):
                    
                    Return only the word in {language_name}:"""
         
-        response = client.chat.completions.create(
+        response = await client.chat.completions.create_async(
             model="gpt-3.5-turbo",
             messages=[
                 {"role": "system", "content": f"You are a vocabulary generator. Return only the word itself, no extra information."},
@@ -1790,77 +1501,14 @@ async def generate_varied_word(request: Request):
         
         raw_word = response.choices[0].message.content.strip()
         
-        # Clean the response to extract only the actual word
-        def clean_word(text, lang):
-            if not text:
-                return text
-                
-            # Remove common patterns
-            text = text.strip().strip('"\'`""''')
-            
-            # Remove content in parentheses (like pronunciation guides)
-            import re
-            text = re.sub(r'\([^)]*\)', '', text).strip()
-            
-            # Remove content after dashes or hyphens (explanations)
-            text = re.sub(r'\s*[-–—]\s*.*$', '', text).strip()
-            
-            # Remove content after commas
-            text = re.sub(r'\s*,\s*.*$', '', text).strip()
-            
-            # For Asian languages, take only the first sequence of characters
-            if lang in ['ko', 'ja', 'zh-CN', 'zh-TW']:
-                # Remove any Latin characters, numbers, or punctuation
-                text = re.sub(r'[a-zA-Z0-9\s\-_.,!?()[\]{}]+', '', text).strip()
-                
-                # For Korean, keep only Hangul characters
-                if lang == 'ko':
-                    korean_chars = re.findall(r'[가-힣]+', text)
-                    if korean_chars:
-                        text = korean_chars[0]
-                
-                # For Japanese, keep only Japanese characters (Hiragana, Katakana, Kanji)
-                elif lang == 'ja':
-                    japanese_chars = re.findall(r'[ひらがなカタカナ一-龯ぁ-ゖァ-ヾ]+', text)
-                    if japanese_chars:
-                        text = japanese_chars[0]
-                
-                # For Chinese, keep only Chinese characters
-                elif lang in ['zh-CN', 'zh-TW']:
-                    chinese_chars = re.findall(r'[一-龯]+', text)
-                    if chinese_chars:
-                        text = chinese_chars[0]
-            
-            else:
-                # For Latin-based languages, take only the first word
-                words = text.split()
-                if words:
-                    text = words[0]
-                    # Remove punctuation from the word
-                    text = re.sub(r'[^\w]', '', text)
-            
-            return text
-        
-        cleaned_word = clean_word(raw_word, language)
+        cleaned_word = clean_generated_text(raw_word, language, 'word')
         
         # Fallback if cleaning resulted in empty string
         if not cleaned_word:
-            fallback_words = {
-                "en": ["practice", "learn", "speak", "listen", "understand"],
-                "ja": ["練習", "学習", "話す", "聞く", "理解"],
-                "ko": ["연습", "학습", "말하기", "듣기", "이해"],
-                "zh-CN": ["练习", "学习", "说话", "听", "理解"],
-                "zh-TW": ["練習", "學習", "說話", "聽", "理解"],
-                "es": ["práctica", "aprender", "hablar", "escuchar", "entender"],
-                "fr": ["pratique", "apprendre", "parler", "écouter", "comprendre"],
-                "de": ["übung", "lernen", "sprechen", "hören", "verstehen"],
-                "it": ["pratica", "imparare", "parlare", "ascoltare", "capire"],
-                "hi": ["अभ्यास", "सीखना", "बोलना", "सुनना", "समझना"]
-            }
-            words = fallback_words.get(language, fallback_words["en"])
+            words = content_pack.get(language, "vocabulary_fallback", ("practice",))
             cleaned_word = random.choice(words)
         
-        print(f"Original response: '{raw_word}' -> Cleaned: '{cleaned_word}'")
+        logger.debug("Original response: '%s' -> Cleaned: '%s'", raw_word, cleaned_word)
         
         return {
             "text": cleaned_word,
@@ -1869,22 +1517,9 @@ async def generate_varied_word(request: Request):
         }
         
     except Exception as e:
-        print(f"Error in generate_varied_word: {str(e)}")
+        logger.error("Error in generate_varied_word: %s", e)
         # Return language-specific fallback
-        fallback_words = {
-            "en": ["practice", "learn", "speak", "listen", "understand"],
-            "ja": ["練習", "学習", "話す", "聞く", "理解"],
-            "ko": ["연습", "학습", "말하기", "듣기", "이해"],
-            "zh-CN": ["练习", "学习", "说话", "听", "理解"],
-            "zh-TW": ["練習", "學習", "說話", "聽", "理解"],
-            "es": ["práctica", "aprender", "hablar", "escuchar", "entender"],
-            "fr": ["pratique", "apprendre", "parler", "écouter", "comprendre"],
-            "de": ["übung", "lernen", "sprechen", "hören", "verstehen"],
-            "it": ["pratica", "imparare", "parlare", "ascoltare", "capire"],
-            "hi": ["अभ्यास", "सीखना", "बोलना", "सुनना", "समझना"]
-        }
-        
-        words = fallback_words.get(language, fallback_words["en"])
+        words = content_pack.get(language, "vocabulary_fallback", ("practice",))
         return {
             "text": random.choice(words),
             "difficulty": "easy", 
@@ -1920,34 +1555,44 @@ async def score_pronunciation(request: PronunciationRequest):
         return PronunciationResponse(score=score, feedback=feedback)
         
     except Exception as e:
-        print(f"Error scoring pronunciation: {str(e)}")
+        logger.error("Error scoring pronunciation: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to score pronunciation: {str(e)}")
 
 @app.get("/api/conversation_history")
-async def get_conversation_history(username: str):
+async def get_conversation_history(request: Request, username: str, since: Optional[str] = None):
+    """
+    Chat history with an ETag; `since` (an earlier `cursor`) returns only newer
+    messages, plus an overlap window the caller de-duplicates by id, unless
+    messages were deleted since (then the full history, with delta false).
+    """
     try:
         if not username:
-            return JSONResponse(
+            return MongoJSONResponse(
                 status_code=400, 
                 content={"error": "Username is required"}
             )
         
+        history_after, epoch = parse_history_cursor(since)
         # Use the global db_manager
-        user_profile = db_manager.load_user_profile(username)
+        user_profile = db_manager.load_user_profile(username, history_after=history_after, epoch=epoch)
         
         if not user_profile:
-            return JSONResponse(
+            return MongoJSONResponse(
                 status_code=404,
                 content={"error": f"User profile not found for {username}"}
             )
         
-        return JSONResponse(
-            status_code=200,
-            content={"chat_history": user_profile.get("chat_history", [])}
-        )
+        chat_history = user_profile.get("chat_history", [])
+        current_epoch = history_epoch(user_profile)
+        delta = history_after is not None and epoch == current_epoch
+        return conditional_json(request, {
+            "chat_history": chat_history,
+            "cursor": f"{history_cursor(chat_history, history_after if delta else None) or ''}.{current_epoch}",
+            "delta": delta
+        })
     except Exception as e:
-        print(f"Error in get_conversation_history: {e}")
-        return JSONResponse(
+        logger.error("Error in get_conversation_history: %s", e)
+        return MongoJSONResponse(
             status_code=500,
             content={"error": f"Failed to get conversation history: {str(e)}"}
         )
@@ -1964,7 +1609,7 @@ async def save_roleplay_conversation(request: Request):
         timestamp = data.get("timestamp", datetime.now().isoformat())
 
         if not username or not scenario or not conversation:
-            return JSONResponse(
+            return MongoJSONResponse(
                 status_code=400,
                 content={"error": "Username, scenario, and conversation are required"}
             )
@@ -1983,13 +1628,13 @@ async def save_roleplay_conversation(request: Request):
         
         result = roleplay_collection.insert_one(conversation_doc)
         
-        return JSONResponse(
+        return MongoJSONResponse(
             content={"success": True, "id": str(result.inserted_id)},
             status_code=200
         )
     except Exception as e:
-        print(f"Error saving roleplay conversation: {str(e)}")
-        return JSONResponse(
+        logger.error("Error saving roleplay conversation: %s", e)
+        return MongoJSONResponse(
             content={"error": f"Failed to save roleplay conversation: {str(e)}"},
             status_code=500
         )
@@ -2015,17 +1660,18 @@ async def save_user_scenario(request: Request):
             "id": scenario_id,
             "username": username,
             "title": title,
+            "title_key": title_key(title),
             "description": description,
             "language": language,
             "custom": True,
             "created_at": timestamp
         }
         
-        print(f"Saving custom scenario: {scenario}")
+        logger.debug("Saving custom scenario: %s", scenario)
         
         result = db_manager.db["user_scenarios"].insert_one(scenario)
         
-        return JSONResponse(
+        return MongoJSONResponse(
             content={
                 "success": True,
                 "message": "Custom scenario saved successfully",
@@ -2033,11 +1679,17 @@ async def save_user_scenario(request: Request):
             }
         )
         
+    except DuplicateKeyError:
+        return MongoJSONResponse(
+            status_code=409,
+            content={
+                "error": f"A scenario titled '{title}' already exists",
+                "message": f"A scenario titled '{title}' already exists"
+            }
+        )
     except Exception as e:
-        print(f"Error saving user scenario: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return JSONResponse(
+        logger.error("Error saving user scenario: %s", e, exc_info=True)
+        return MongoJSONResponse(
             status_code=500,
             content={"error": f"Failed to save scenario: {str(e)}"}
         )
@@ -2046,14 +1698,14 @@ async def save_user_scenario(request: Request):
 async def get_user_scenarios(username: str):
     try:
         if not username:
-            return JSONResponse(
+            return MongoJSONResponse(
                 status_code=400,
                 content={"error": "Username is required"}
             )
         
         user_profile = load_user_profile(username)
         if user_profile and "custom_scenarios" in user_profile:
-            return JSONResponse(
+            return MongoJSONResponse(
                 content={"scenarios": user_profile.get("custom_scenarios", [])},
                 status_code=200
             )
@@ -2066,17 +1718,57 @@ async def get_user_scenarios(username: str):
             doc["_id"] = str(doc["_id"])
             scenarios.append(doc)
         
-        return JSONResponse(
+        return MongoJSONResponse(
             content={"scenarios": scenarios},
             status_code=200
         )
     except Exception as e:
-        print(f"Error getting user scenarios: {str(e)}")
-        return JSONResponse(
+        logger.error("Error getting user scenarios: %s", e)
+        return MongoJSONResponse(
             content={"error": f"Failed to fetch user scenarios: {str(e)}"},
             status_code=500
         )
     
+SCENARIO_SEARCH_FIELDS = {"_id": 0, "id": 1, "title": 1, "description": 1, "language": 1, "created_at": 1}
+
+@app.get("/api/user_scenarios/search")
+async def search_user_scenarios(username: str, q: str, limit: int = 20):
+    """
+    Search a user's custom scenarios. Titles starting with the query come
+    first (a prefix range on the title_key index), then word matches in title
+    or description ranked by the text index.
+    """
+    key = title_key(q)
+    if not username or not key:
+        return MongoJSONResponse(
+            status_code=400,
+            content={"error": "Username and q are required"}
+        )
+    limit = max(1, min(limit, 50))
+    collection = db_manager.db["user_scenarios"]
+    try:
+        results = list(collection.find(
+            {"username": username, "title_key": {"$regex": "^" + re.escape(key)}},
+            SCENARIO_SEARCH_FIELDS
+        ).sort("title_key", 1).limit(limit))
+        if len(results) < limit:
+            seen = {scenario["id"] for scenario in results}
+            cursor = collection.find(
+                {"username": username, "$text": {"$search": q}},
+                {**SCENARIO_SEARCH_FIELDS, "score": {"$meta": "textScore"}}
+            ).sort([("score", {"$meta": "textScore"})]).limit(limit)
+            for scenario in cursor:
+                scenario.pop("score", None)
+                if scenario["id"] not in seen and len(results) < limit:
+                    results.append(scenario)
+        return MongoJSONResponse(content={"scenarios": results})
+    except Exception as e:
+        logger.error("Error searching user scenarios: %s", e, exc_info=True)
+        return MongoJSONResponse(
+            status_code=500,
+            content={"error": f"Failed to search user scenarios: {str(e)}"}
+        )
+
 @app.post("/api/delete_custom_scenario")
 async def delete_custom_scenario(request: Request):
     try:
@@ -2084,10 +1776,10 @@ async def delete_custom_scenario(request: Request):
         username = data.get("username")
         scenario_id = data.get("scenario_id")
         
-        print(f"Request to delete scenario {scenario_id} for user {username}")
+        logger.debug("Request to delete scenario %s for user %s", scenario_id, username)
         
         if not username or not scenario_id:
-            return JSONResponse(
+            return MongoJSONResponse(
                 status_code=400,
                 content={"error": "Username and scenario_id are required"}
             )
@@ -2098,25 +1790,23 @@ async def delete_custom_scenario(request: Request):
         })
         
         if result.deleted_count > 0:
-            print(f"Successfully deleted scenario {scenario_id} for user {username}")
-            return JSONResponse(
+            logger.debug("Successfully deleted scenario %s for user %s", scenario_id, username)
+            return MongoJSONResponse(
                 content={
                     "success": True,
                     "message": f"Scenario {scenario_id} deleted successfully"
                 }
             )
         else:
-            print(f"No scenario found with ID {scenario_id} for user {username}")
-            return JSONResponse(
+            logger.debug("No scenario found with ID %s for user %s", scenario_id, username)
+            return MongoJSONResponse(
                 status_code=404,
                 content={"error": f"Scenario {scenario_id} not found for user {username}"}
             )
             
     except Exception as e:
-        print(f"Error in delete_custom_scenario: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return JSONResponse(
+        logger.error("Error in delete_custom_scenario: %s", e, exc_info=True)
+        return MongoJSONResponse(
             status_code=500,
             content={"error": f"Server error: {str(e)}"}
         )
@@ -2128,10 +1818,10 @@ async def check_existing_scenario_endpoint(request: Request):
         username = data.get("username")
         title = data.get("title")
         
-        print(f"Checking if scenario '{title}' exists for user '{username}'")
+        logger.debug("Checking if scenario '%s' exists for user '%s'", title, username)
         
         if not username or not title:
-            return JSONResponse(
+            return MongoJSONResponse(
                 status_code=400,
                 content={
                     "exists": False,
@@ -2139,26 +1829,16 @@ async def check_existing_scenario_endpoint(request: Request):
                 }
             )
         
-        query = {
-            "username": username,
-            "title": {"$regex": f"^{re.escape(title)}$", "$options": "i"}
-        }
-        
-        print(f"MongoDB query: {query}")
-        
-        count = db_manager.db["user_scenarios"].count_documents(query)
-        
-        existing_scenario = None
-        if count > 0:
-            existing_scenario = db_manager.db["user_scenarios"].find_one(query)
-            if existing_scenario:
-                existing_scenario["_id"] = str(existing_scenario["_id"])
-                print(f"Found existing scenario: {existing_scenario}")
+        # Point lookup on the unique (username, title_key) index
+        existing_scenario = db_manager.db["user_scenarios"].find_one(
+            {"username": username, "title_key": title_key(title)}, {"_id": 1}
+        )
         
-        exists = count > 0
-        print(f"Scenario '{title}' for user '{username}' exists: {exists} (count: {count})")
+        exists = existing_scenario is not None
+        count = int(exists)
+        logger.debug("Scenario '%s' for user '%s' exists: %s (count: %s)", title, username, exists, count)
         
-        return JSONResponse(
+        return MongoJSONResponse(
             content={
                 "exists": exists,
                 "count": count,
@@ -2166,10 +1846,8 @@ async def check_existing_scenario_endpoint(request: Request):
             }
         )
     except Exception as e:
-        print(f"Error checking existing scenario: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return JSONResponse(
+        logger.error("Error checking existing scenario: %s", e, exc_info=True)
+        return MongoJSONResponse(
             status_code=500,
             content={
                 "exists": False,
@@ -2188,36 +1866,31 @@ async def save_scenario_messages(request: Request):
         language = data.get("language", "en")
         created_at = data.get("created_at", datetime.now().isoformat())
         
-        print(f"Saving scenario conversation for {username}, scenario: {scenario_title}")
-        
-        conversation_id = await db_manager.insert_scenario_conversation(
-            username=username,
-            scenario_title=scenario_title,
-            is_custom=is_custom,
-            language=language,
-            created_at=created_at
-        )
-        
-        print(f"Created conversation with ID: {conversation_id}, saving {len(messages)} messages")
-        
-        message_ids = []
-        for message in messages:
-            message_id = await db_manager.insert_scenario_message(
-                conversation_id=conversation_id,
-                text=message.get("text"),
-                sender=message.get("sender"),
-                audio_url=message.get("audio_url"),
-                timestamp=message.get("timestamp", datetime.now().isoformat())
+        logger.debug("Saving scenario conversation for %s, scenario: %s", username, scenario_title)
+        
+        # One insert for the conversation and one insert_many for its messages
+        conversation_id, message_ids, timings = await anyio.to_thread.run_sync(
+            lambda: db_manager.save_scenario_conversation(
+                username=username,
+                scenario_title=scenario_title,
+                messages=messages,
+                is_custom=is_custom,
+                language=language,
+                created_at=created_at
             )
-            message_ids.append(message_id)
+        )
         
-        print(f"Successfully saved {len(message_ids)} messages for conversation {conversation_id}")
-        return {"success": True, "conversation_id": conversation_id, "message_count": len(message_ids)}
+        logger.debug("Saved %s messages for conversation %s in %sms", len(message_ids), conversation_id, timings["total_ms"])
+        return {
+            "success": True,
+            "conversation_id": conversation_id,
+            "message_ids": message_ids,
+            "message_count": len(message_ids),
+            "timings": timings
+        }
     except Exception as e:
-        print(f"Error saving scenario messages: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return JSONResponse(
+        logger.error("Error saving scenario messages: %s", e, exc_info=True)
+        return MongoJSONResponse(
             status_code=500,
             content={"detail": f"Failed to save scenario messages: {str(e)}"}
         )
@@ -2225,7 +1898,7 @@ async def save_scenario_messages(request: Request):
 @app.get("/api/get_scenario_conversations")
 async def get_scenario_conversations(username: str):
     try:
-        print(f"Fetching scenario conversations for user: {username}")
+        logger.debug("Fetching scenario conversations for user: %s", username)
         
         conversation_collection = db_manager.db["scenario_conversations"]
         conversations_docs = list(conversation_collection.find({"username": username}))
@@ -2254,15 +1927,13 @@ async def get_scenario_conversations(username: str):
         
         conversations.sort(key=lambda x: x.get("created_at", ""), reverse=True)
         
-        return JSONResponse(
+        return MongoJSONResponse(
             content={"conversations": conversations},
             status_code=200
         )
     except Exception as e:
-        print(f"Error fetching scenario conversations: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return JSONResponse(
+        logger.error("Error fetching scenario conversations: %s", e, exc_info=True)
+        return MongoJSONResponse(
             content={"error": f"Failed to fetch scenario conversations: {str(e)}"},
             status_code=500
         )
@@ -2275,7 +1946,7 @@ async def delete_scenario_conversation(request: Request):
         conversation_id = data.get("conversation_id")
         
         if not username or not conversation_id:
-            return JSONResponse(
+            return MongoJSONResponse(
                 status_code=400,
                 content={"error": "Username and conversation_id are required"}
             )
@@ -2288,20 +1959,18 @@ async def delete_scenario_conversation(request: Request):
         )
         
         if result.modified_count > 0 or result.deleted_count > 0:
-            return JSONResponse(
+            return MongoJSONResponse(
                 content={"success": True, "message": "Conversation deleted successfully"}
             )
         else:
-            return JSONResponse(
+            return MongoJSONResponse(
                 status_code=404,
                 content={"error": f"Conversation not found or you don't have permission to delete it"}
             )
             
     except Exception as e:
-        print(f"Error deleting scenario conversation: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return JSONResponse(
+        logger.error("Error deleting scenario conversation: %s", e, exc_info=True)
+        return MongoJSONResponse(
             status_code=500,
             content={"error": f"Server error: {str(e)}"}
         )
@@ -2313,25 +1982,25 @@ async def delete_chat_message(request: dict):
         batch_id = request.get("batch_id")
         timestamps = request.get("timestamps", [])
         
-        print(f"Delete request received - username: {username}, batch_id: {batch_id}")
-        print(f"Timestamps to delete: {timestamps}")
+        logger.debug("Delete request received - username: %s, batch_id: %s", username, batch_id)
+        logger.debug("Timestamps to delete: %s", timestamps)
         
         if not username:
-            print("Error: No username provided")
+            logger.warning("No username provided")
             raise HTTPException(status_code=400, detail="Username is required")
         
         user_profile = db_manager.load_user_profile(username)
         
         if not user_profile:
-            print(f"Error: No user profile found for {username}")
+            logger.warning("No user profile found for %s", username)
             return {"success": False, "message": "User profile not found"}
             
         if "chat_history" not in user_profile or not user_profile["chat_history"]:
-            print(f"Warning: No chat history found for {username}")
+            logger.warning("No chat history found for %s", username)
             return {"success": False, "message": "Chat history not found or empty"}
             
         history_count = len(user_profile["chat_history"]) if user_profile.get("chat_history") else 0
-        print(f"Found {history_count} messages in chat history for {username}")
+        logger.debug("Found %s messages in chat history for %s", history_count, username)
         
         original_count = len(user_profile["chat_history"])
         
@@ -2371,64 +2040,49 @@ async def delete_chat_message(request: dict):
         
         if removed > 0:
             db_manager.save_user_profile(user_profile)
-            print(f"Successfully deleted {removed} messages for user {username}")
+            logger.debug("Successfully deleted %s messages for user %s", removed, username)
             return {"success": True, "message": f"Successfully deleted {removed} messages"}
         else:
             if batch_id:
-                print(f"Warning: No messages found with batch_id: {batch_id}")
+                logger.warning("No messages found with batch_id: %s", batch_id)
                 if len(user_profile["chat_history"]) > 0:
                     sample = user_profile["chat_history"][0]
-                    print(f"Sample message keys: {list(sample.keys())}")
+                    logger.debug("Sample message keys: %s", list(sample.keys()))
                     
                     batch_ids = [msg.get("batch_id") for msg in user_profile["chat_history"] if msg.get("batch_id")]
-                    print(f"Sample of batch_ids in database: {batch_ids[:5] if batch_ids else 'None'}")
+                    logger.debug("Sample of batch_ids in database: %s", batch_ids[:5] if batch_ids else 'None')
             
             return {"success": False, "message": "No matching messages found"}
             
     except Exception as e:
-        print(f"Error deleting chat message: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error deleting chat message: %s", e, exc_info=True)
         return {"success": False, "message": f"Error: {str(e)}"}
     
-@app.post("/api/update_profile_image")
-async def update_profile_image(request: dict):
-    username = request.get("username")
-    image_data = request.get("image") 
-    
-    if not username or not image_data:
-        return {"success": False, "message": "Missing required fields"}
-    
-    try:
-        result = db_manager.db["users"].update_one(
-            {"username": username},
-            {"$set": {"profile_image": image_data}}
-        )
-        
-        image_url = f"http://localhost:8000/api/profile_image/{username}"
-        
-        return {"success": True, "imageUrl": image_url}
-    except Exception as e:
-        return {"success": False, "message": str(e)}
+# Absolute base for URLs the browser loads directly (images are <img src>)
+PUBLIC_API_URL = os.getenv("PUBLIC_API_URL", "http://localhost:8000")
+IMMUTABLE = "public, max-age=31536000, immutable"
+blob_store = LocalBlobStore()
+
+
+def blob_response(request, name, cache_control=IMMUTABLE):
+    """Serve a blob from disk; its name is its content hash, so that is the ETag."""
+    path = blob_store.path(name)
+    if path is None or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Image not found")
+    etag = f'"{name.split(".", 1)[0]}"'
+    if etag_matches(request, etag):
+        return not_modified(etag, cache_control)
+    return FileResponse(path, media_type=profile_images.content_type_of(name),
+                        headers={"ETag": etag, "Cache-Control": cache_control})
+
+
+def _store_legacy_profile_image(username, image_data):
+    """Move a base64 data URL still embedded in a users document into the blob store."""
+    reference = profile_images.store_image(blob_store, profile_images.decode_data_url(image_data))
+    db_manager.db["users"].update_one({"username": username}, {"$set": {"profile_image": reference}})
+    logger.info("Moved embedded profile image of %s to the blob store", username)
+    return reference
 
-@app.get("/api/profile_image/{username}")
-async def get_profile_image(username: str):
-    user_data = db_manager.db["users"].find_one({"username": username})
-    
-    if not user_data or "profile_image" not in user_data:
-        return Response(status_code=404)
-    
-    image_data = user_data["profile_image"]
-    image_format = "jpeg" 
-    
-    if "data:image/" in image_data:
-        format_part = image_data.split("data:image/")[1].split(";base64,")[0]
-        image_format = format_part
-    
-    return Response(
-        content=base64.b64decode(image_data.split(",")[1]), 
-        media_type=f"image/{image_format}"
-    )
 
 @app.post("/api/update_profile_image")
 async def update_profile_image(request: Request):
@@ -2440,53 +2094,64 @@ async def update_profile_image(request: Request):
         raise HTTPException(status_code=400, detail="Missing required fields")
     
     try:
-        if "base64," in image_data:
-            format_match = re.search(r"data:image/([a-zA-Z]+);base64,", image_data)
-            image_format = format_match.group(1) if format_match else "jpeg"
-            
-            base64_data = image_data.split("base64,")[1]
-            
-            file_name = f"{username}_{uuid.uuid4()}.{image_format}"
-            file_path = os.path.join("profile_images", file_name)
-            
-            os.makedirs("profile_images", exist_ok=True)
-            
-            with open(file_path, "wb") as f:
-                f.write(base64.b64decode(base64_data))
-            
-            image_url = f"http://localhost:8000/profile_images/{file_name}"
-            
-            db_manager.db["users"].update_one(
-                {"username": username},
-                {"$set": {"profile_image": image_url}}
-            )
-            
-            return {"success": True, "imageUrl": image_url}
-        
-        else:
-            raise HTTPException(status_code=400, detail="Invalid image format")
-    
+        # Decoding and resizing are CPU work; keep them off the event loop
+        reference = await anyio.to_thread.run_sync(
+            lambda: profile_images.store_image(blob_store, profile_images.decode_data_url(image_data))
+        )
+    except profile_images.InvalidImage as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        print(f"Error processing image upload: {str(e)}")
+        logger.error("Error processing image upload: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error processing image: {str(e)}")
+    
+    db_manager.db["users"].update_one(
+        {"username": username},
+        {"$set": {"profile_image": reference}}
+    )
+    
+    return {
+        "success": True,
+        "imageUrl": f"{PUBLIC_API_URL}/api/images/{profile_images.variant(reference, profile_images.DEFAULT_SIZE)}",
+        "originalUrl": f"{PUBLIC_API_URL}/api/images/{reference['original']}",
+        "thumbnails": {size: f"{PUBLIC_API_URL}/api/images/{name}" for size, name in reference["thumbnails"].items()}
+    }
+
+@app.get("/api/images/{name}")
+async def get_image(request: Request, name: str):
+    return blob_response(request, name)
+
+@app.get("/api/profile_image/{username}")
+async def get_profile_image(request: Request, username: str, size: Optional[int] = None):
+    """The user's current image; revalidated, since it changes when they upload a new one."""
+    user_data = db_manager.db["users"].find_one({"username": username}, {"profile_image": 1})
+    reference = (user_data or {}).get("profile_image")
+    if not reference:
+        return Response(status_code=404)
+    
+    if isinstance(reference, str):
+        if "base64," not in reference:
+            # A URL from the old file-based handler
+            return RedirectResponse(reference)
+        try:
+            reference = await anyio.to_thread.run_sync(_store_legacy_profile_image, username, reference)
+        except profile_images.InvalidImage:
+            return Response(status_code=404)
+    
+    return blob_response(request, profile_images.variant(reference, size), cache_control="public, max-age=300")
 
 @app.get("/profile_images/{file_name}")
-async def get_profile_image(file_name: str):
-    file_path = os.path.join("profile_images", file_name)
+async def get_legacy_profile_image(request: Request, file_name: str):
+    """Files written by the previous upload handler, for URLs already saved in Firebase profiles."""
+    file_path = os.path.join("profile_images", os.path.basename(file_name))
     
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="Image not found")
     
-    content_type = "image/jpeg" 
-    if file_name.endswith(".png"):
-        content_type = "image/png"
-    elif file_name.endswith(".gif"):
-        content_type = "image/gif"
-    
-    with open(file_path, "rb") as f:
-        image_data = f.read()
-    
-    return Response(content=image_data, media_type=content_type)
+    return FileResponse(file_path, headers={"Cache-Control": IMMUTABLE})
+
+@app.api_route("/audio/{file_name}", methods=["GET", "HEAD"])
+async def get_audio(request: Request, file_name: str):
+    return await audio_files.serve(request, SOUND_RESPONSE_DIR, file_name)
 
 @app.post("/api/generate_audio")
 async def generate_audio(request: Request):
@@ -2498,27 +2163,22 @@ async def generate_audio(request: Request):
     
     os.makedirs(SOUND_RESPONSE_DIR, exist_ok=True)
     
-    print(f"Sound responses directory: {os.path.abspath(SOUND_RESPONSE_DIR)}")
-    
-    filename = f"speech_{language}_{int(time.time())}_{uuid.uuid4().hex[:8]}.mp3"
-    file_path = os.path.join(SOUND_RESPONSE_DIR, filename)
+    logger.debug("Sound responses directory: %s", os.path.abspath(SOUND_RESPONSE_DIR))
     
     try:
-        from gtts import gTTS
-        tts = gTTS(text=text, lang=language)
-        tts.save(file_path)
+        filename = speech_file("speech", text, get_language(language).tts_code)
+        file_path = os.path.join(SOUND_RESPONSE_DIR, filename)
         
-        print(f"Audio saved to: {os.path.abspath(file_path)}")
+        logger.debug("Audio saved to: %s", os.path.abspath(file_path))
         
-        return JSONResponse(content={
+        return MongoJSONResponse(content={
             "audio_url": f"/audio/{filename}", 
             "full_path": os.path.abspath(file_path)
         })
         
     except Exception as e:
-        print(f"Error generating audio: {e}")
-        traceback.print_exc()  # Add this to get detailed error information
-        return JSONResponse(
+        logger.error("Error generating audio: %s", e, exc_info=True)
+        return MongoJSONResponse(
             status_code=500,
             content={"error": str(e)}
         )
@@ -2535,7 +2195,7 @@ async def clear_conversation(request: dict = Body(...)):
         if not username:
             raise HTTPException(status_code=400, detail="Username is required")
         
-        logger.info(f"Flagging conversation as discarded for user: {username}, is_discarded: {is_discarded}")
+        logger.info("Flagging conversation as discarded for user: %s, is_discarded: %s", username, is_discarded)
         
         # Get the user profile
         user_profile = load_user_profile(username)
@@ -2549,6 +2209,8 @@ async def clear_conversation(request: dict = Body(...)):
         # Set discard flag in preferences
         user_profile["preferences"]["discard_conversation"] = True
         user_profile["preferences"]["save_to_history"] = False
+        # Clients holding a delta cursor must reload the history
+        user_profile["history_version"] = user_profile.get("history_version", 0) + 1
         
         # Instead of clearing messages, FLAG them as discarded
         if "chat_history" in user_profile:
@@ -2561,7 +2223,7 @@ async def clear_conversation(request: dict = Body(...)):
                     message["is_discarded"] = True
                     marked_count += 1
             
-            logger.info(f"Marked {marked_count} messages as discarded")
+            logger.info("Marked %s messages as discarded", marked_count)
         
         # Save the updated profile
         save_user_profile(user_profile)
@@ -2574,8 +2236,8 @@ async def clear_conversation(request: dict = Body(...)):
         }
         
     except Exception as e:
-        logger.error(f"Error in clear_conversation: {str(e)}")
-        return JSONResponse(
+        logger.error("Error in clear_conversation: %s", e)
+        return MongoJSONResponse(
             status_code=500,
             content={"error": f"Failed to mark conversation as discarded: {str(e)}"}
         )
@@ -2588,18 +2250,18 @@ async def discard_by_batchid(request: dict = Body(...)):
         
         if not username or not batch_id:
             logger.error("Username and batch_id are required")
-            return JSONResponse(
+            return MongoJSONResponse(
                 status_code=400,
                 content={"detail": "Username and batch_id are required"}
             )
         
-        logger.info(f"Received request to delete messages with batch_id {batch_id} for user {username}")
+        logger.info("Received request to delete messages with batch_id %s for user %s", batch_id, username)
         
         # Get the user document to find user_id
         user = db_manager.users_collection.find_one({"username": username})
         if not user:
-            logger.error(f"User {username} not found")
-            return JSONResponse(
+            logger.error("User %s not found", username)
+            return MongoJSONResponse(
                 status_code=404,
                 content={"detail": f"User {username} not found"}
             )
@@ -2615,7 +2277,9 @@ async def discard_by_batchid(request: dict = Body(...)):
         # If you want to physically delete the messages:
         result = db_manager.db.chat_messages.delete_many(query)
         deleted_count = result.deleted_count
-        logger.info(f"Deleted {deleted_count} messages from chat_messages collection")
+        logger.info("Deleted %s messages from chat_messages collection", deleted_count)
+        if deleted_count:
+            db_manager.bump_history_version(user_id)
         
         # Or if you want to mark them as discarded instead:
         # result = db_manager.db.chat_messages.update_many(
@@ -2625,20 +2289,49 @@ async def discard_by_batchid(request: dict = Body(...)):
         # modified_count = result.modified_count
         # logger.info(f"Marked {modified_count} messages as discarded in chat_messages collection")
         
-        return JSONResponse(
+        return MongoJSONResponse(
             status_code=200,
             content={"status": "success", "deleted_count": deleted_count}
         )
         
     except Exception as e:
-        logger.exception(f"Error in discard_by_batchid: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return JSONResponse(
+        logger.exception("Error in discard_by_batchid: %s", e)
+        return MongoJSONResponse(
             status_code=500,
             content={"detail": f"Failed to process request: {str(e)}"}
         )
 
+@app.get("/api/debug_llm_stats")
+async def debug_llm_stats():
+    """Counters for issued versus coalesced upstream LLM calls"""
+    return {"counters": metrics.snapshot()}
+
+@app.get("/api/debug_log_levels")
+def debug_log_levels():
+    """Logger levels explicitly set in this worker"""
+    return {"pid": os.getpid(), "levels": get_levels()}
+
+@app.post("/api/debug_log_levels")
+def update_log_levels(levels: Dict[str, str] = Body(...)):
+    """
+    Set levels per logger, e.g. {"app.main": "DEBUG", "root": "WARNING"}, in
+    this worker. Refused unless LOG_LEVEL_CONTROL=1, since DEBUG logging can
+    expose user content and flood the log pipeline.
+    """
+    if not LOG_LEVEL_CONTROL:
+        raise HTTPException(status_code=403, detail="Log level changes are disabled (set LOG_LEVEL_CONTROL=1)")
+    try:
+        for name, level in levels.items():
+            set_level(name, level)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"pid": os.getpid(), "levels": get_levels()}
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """This worker's counters, gauges and histograms in Prometheus text format"""
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.get("/api/debug_db")
 async def debug_db():
     """Test database connectivity and check user records"""
@@ -2728,8 +2421,7 @@ async def debug_conversations(username: str = None):
             
         return result
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.error("Error in debug_conversations: %s", e, exc_info=True)
         return {"error": str(e)}
     
 @app.post("/api/migrate_chat_history")
@@ -2804,8 +2496,7 @@ async def migrate_chat_history(username: str = None):
         }
         
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.error("Error migrating chat history: %s", e, exc_info=True)
         return {
             "success": False,
             "error": str(e)
@@ -2844,8 +2535,7 @@ async def debug_chat_messages(username: str):
         }
         
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.error("Error in debug_chat_messages: %s", e, exc_info=True)
         return {"error": str(e)}
     
 if __name__ == "__main__":
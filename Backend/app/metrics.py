@@ -0,0 +1,354 @@
+"""
+In-process counters, gauges and histograms, rendered for Prometheus by /metrics.
+
+Every worker records into its own registry. With METRICS_MULTIPROC_DIR set
+(server.py does this before starting workers), each worker also writes its
+registry to a file there every METRICS_FLUSH_SECONDS and on exit, and a
+scrape of any worker merges all the files: counters and histograms are
+summed across workers, while gauges keep one series per live worker under a
+`pid` label. When a worker exits, the gunicorn master folds its counters and
+histograms into an archive file (mark_process_dead), so totals never go
+backwards when workers are recycled. Without the directory a scrape reports
+only the worker that served it.
+"""
+import atexit
+import json
+import logging
+import math
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Seconds; spans a cache hit through a slow escalated LLM call.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR") or None
+FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+ARCHIVE_FILE = "archive.json"
+
+_lock = threading.Lock()
+_counters = defaultdict(float)
+_gauges = defaultdict(float)
+# series -> [per-bucket counts..., +Inf count], sum, bucket bounds
+_histograms = {}
+_started_at = time.time()
+# (pid, file name) of this process's registry file, and the pid running the flush thread
+_own_file = None
+_flusher_pid = None
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _series(name, labels):
+    if not labels:
+        return name
+    rendered = ",".join(f'{key}="{_escape(labels[key])}"' for key in sorted(labels))
+    return f"{name}{{{rendered}}}"
+
+
+def _split(series):
+    name, _, labels = series.partition("{")
+    return name, labels.rstrip("}")
+
+
+def increment(name, value=1, **labels):
+    """Add `value` to the counter identified by `name` and `labels`."""
+    series = _series(name, labels)
+    _ensure_flusher()
+    with _lock:
+        _counters[series] += value
+
+
+def get(name, **labels):
+    with _lock:
+        return _counters.get(_series(name, labels), 0)
+
+
+def set_gauge(name, value, **labels):
+    series = _series(name, labels)
+    _ensure_flusher()
+    with _lock:
+        _gauges[series] = value
+
+
+def add_gauge(name, delta, **labels):
+    series = _series(name, labels)
+    _ensure_flusher()
+    with _lock:
+        _gauges[series] += delta
+
+
+def observe(name, value, buckets=DEFAULT_BUCKETS, **labels):
+    """Record one observation in the histogram identified by `name` and `labels`."""
+    series = _series(name, labels)
+    _ensure_flusher()
+    with _lock:
+        histogram = _histograms.get(series)
+        if histogram is None:
+            histogram = _histograms[series] = [[0] * (len(buckets) + 1), 0.0, tuple(buckets)]
+        counts, _, bounds = histogram
+        index = len(bounds)
+        for i, bound in enumerate(bounds):
+            if value <= bound:
+                index = i
+                break
+        counts[index] += 1
+        histogram[1] += value
+
+
+@contextmanager
+def timer(name, **labels):
+    """Observe the wall time of the `with` block, including when it raises."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - started, **labels)
+
+
+@contextmanager
+def in_flight(name, **labels):
+    """Hold the gauge one higher for the duration of the `with` block."""
+    add_gauge(name, 1, **labels)
+    try:
+        yield
+    finally:
+        add_gauge(name, -1, **labels)
+
+
+def snapshot():
+    """Counters plus histogram `_sum`/`_count`, keyed by rendered series name."""
+    with _lock:
+        values = dict(_counters)
+        for series, (counts, total, _) in _histograms.items():
+            name, labels = _split(series)
+            suffix = f"{{{labels}}}" if labels else ""
+            values[f"{name}_sum{suffix}"] = total
+            values[f"{name}_count{suffix}"] = sum(counts)
+        return values
+
+
+def _format(value):
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _family_order(item):
+    # (name, labels), so each family stays contiguous under its TYPE line;
+    # sorting whole series strings puts "x_total" between "x" and "x{...}"
+    return _split(item[0])
+
+
+def _state():
+    with _lock:
+        return {
+            "counters": dict(_counters),
+            "gauges": dict(_gauges),
+            "histograms": {series: [list(counts), total, list(bounds)]
+                           for series, (counts, total, bounds) in _histograms.items()},
+        }
+
+
+def _own_file_name():
+    global _own_file
+    pid = os.getpid()
+    if _own_file is None or _own_file[0] != pid:
+        # Unique per process, so a recycled pid never overwrites a dead worker's totals
+        _own_file = (pid, f"worker-{pid}-{uuid.uuid4().hex[:8]}.json")
+    return _own_file[1]
+
+
+def _read(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _write(path, data):
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(temporary, path)
+
+
+def flush():
+    """Write this process's registry to METRICS_MULTIPROC_DIR for the other workers' scrapes."""
+    if not MULTIPROC_DIR:
+        return
+    data = {"pid": os.getpid(), "started_at": _started_at, **_state()}
+    _write(os.path.join(MULTIPROC_DIR, _own_file_name()), data)
+
+
+def _flush_forever():
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+        try:
+            flush()
+        except OSError:
+            logger.warning("Could not write metrics to %s", MULTIPROC_DIR, exc_info=True)
+
+
+def _ensure_flusher():
+    global _flusher_pid
+    if not MULTIPROC_DIR or _flusher_pid == os.getpid():
+        return
+    with _lock:
+        if _flusher_pid == os.getpid():
+            return
+        _flusher_pid = os.getpid()
+    threading.Thread(target=_flush_forever, name="metrics-flush", daemon=True).start()
+    atexit.register(flush)
+
+
+def _merge(counters, histograms, data):
+    for series, value in data.get("counters", {}).items():
+        counters[series] += value
+    for series, (counts, total, bounds) in data.get("histograms", {}).items():
+        bounds = tuple(bounds)
+        current = histograms.get(series)
+        if current is None:
+            histograms[series] = [list(counts), total, bounds]
+        elif current[2] == bounds:
+            current[0] = [a + b for a, b in zip(current[0], counts)]
+            current[1] += total
+
+
+def _alive(pid):
+    if pid == os.getpid() or os.name == "nt":  # os.kill(pid, 0) terminates the process on Windows
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+def _with_pid(series, pid):
+    name, labels = _split(series)
+    prefix = f"{labels}," if labels else ""
+    return f'{name}{{{prefix}pid="{pid}"}}'
+
+
+def mark_process_dead(pid, directory=None):
+    """Fold an exited worker's counters and histograms into the archive file.
+
+    Called by the gunicorn master (child_exit), the archive's only writer.
+    """
+    directory = directory or MULTIPROC_DIR
+    if not directory:
+        return
+    archive_path = os.path.join(directory, ARCHIVE_FILE)
+    archive = _read(archive_path) or {"files": [], "counters": {}, "histograms": {}}
+    counters = defaultdict(float, archive["counters"])
+    histograms = {series: [counts, total, tuple(bounds)]
+                  for series, (counts, total, bounds) in archive["histograms"].items()}
+    prefix = f"worker-{pid}-"
+    names = [name for name in os.listdir(directory) if name.startswith(prefix) and name.endswith(".json")]
+    for name in names:
+        data = _read(os.path.join(directory, name))
+        if data is not None and name not in archive["files"]:
+            _merge(counters, histograms, data)
+            archive["files"].append(name)
+    archive["counters"] = counters
+    archive["histograms"] = {series: [counts, total, list(bounds)]
+                             for series, (counts, total, bounds) in histograms.items()}
+    # Archive first: a scrape skips files the archive already lists
+    _write(archive_path, archive)
+    for name in names:
+        try:
+            os.remove(os.path.join(directory, name))
+        except FileNotFoundError:
+            pass
+
+
+def _collect(directory):
+    """Registries of every worker under `directory`, merged."""
+    counters = defaultdict(float)
+    gauges = {}
+    histograms = {}
+    starts = {}
+    # Worker files before the archive, so a file archived in between is seen in one of them
+    workers = []
+    for name in sorted(os.listdir(directory)):
+        if name.startswith("worker-") and name.endswith(".json"):
+            data = _read(os.path.join(directory, name))
+            if data is not None:
+                workers.append((name, data))
+    archive = _read(os.path.join(directory, ARCHIVE_FILE)) or {}
+    archived = set(archive.get("files", ()))
+    _merge(counters, histograms, archive)
+    for name, data in workers:
+        if name in archived:
+            continue
+        _merge(counters, histograms, data)
+        pid = data["pid"]
+        if _alive(pid):
+            starts[pid] = data["started_at"]
+            for series, value in data["gauges"].items():
+                gauges[_with_pid(series, pid)] = value
+    return counters, gauges, histograms, starts
+
+
+def render():
+    """Every series in the Prometheus text exposition format (version 0.0.4).
+
+    Merged across workers when METRICS_MULTIPROC_DIR is set.
+    """
+    if MULTIPROC_DIR:
+        flush()
+        counters, gauges, histograms, starts = _collect(MULTIPROC_DIR)
+    else:
+        with _lock:
+            counters, gauges = dict(_counters), dict(_gauges)
+            histograms = {series: (list(counts), total, bounds)
+                          for series, (counts, total, bounds) in _histograms.items()}
+        starts = {os.getpid(): _started_at}
+    counters = sorted(counters.items(), key=_family_order)
+    gauges = sorted(gauges.items(), key=_family_order)
+    histograms = sorted(((series, (counts, total, tuple(bounds)))
+                         for series, (counts, total, bounds) in histograms.items()), key=_family_order)
+
+    lines = []
+    typed = set()
+
+    def declare(name, kind):
+        if name not in typed:
+            typed.add(name)
+            lines.append(f"# TYPE {name} {kind}")
+
+    declare("process_start_time_seconds", "gauge")
+    for pid, started_at in sorted(starts.items()):
+        lines.append(f'process_start_time_seconds{{pid="{pid}"}} {_format(started_at)}')
+
+    for kind, items in (("counter", counters), ("gauge", gauges)):
+        for series, value in items:
+            declare(_split(series)[0], kind)
+            lines.append(f"{series} {_format(value)}")
+
+    for series, (counts, total, bounds) in histograms:
+        name, labels = _split(series)
+        declare(name, "histogram")
+        prefix = f"{labels}," if labels else ""
+        cumulative = 0
+        for bound, count in zip(bounds + (math.inf,), counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{prefix}le="{_format(bound)}"}} {cumulative}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {_format(total)}")
+        lines.append(f"{name}_count{suffix} {cumulative}")
+
+    return "\n".join(lines) + "\n"
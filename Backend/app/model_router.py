@@ -0,0 +1,92 @@
+import functools
+import logging
+import os
+import time
+
+import anyio
+
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+# Default model per request class and the model to escalate to when the
+# cheap answer fails its quality check.
+ROUTES = {
+    "small_talk": {"model": "gpt-3.5-turbo", "escalate_to": "gpt-4"},
+    "roleplay": {"model": "gpt-3.5-turbo", "escalate_to": "gpt-4"},
+    "analysis": {"model": "gpt-3.5-turbo", "escalate_to": "gpt-4"},
+    "lesson_plan": {"model": "gpt-3.5-turbo", "escalate_to": "gpt-4"},
+}
+
+# USD per 1K tokens, used only for the cost metrics.
+MODEL_PRICING = {
+    "gpt-4": {"prompt": 0.03, "completion": 0.06},
+    "gpt-3.5-turbo": {"prompt": 0.0005, "completion": 0.0015},
+}
+
+
+def _routes_from_env(routes):
+    """Apply MODEL_ROUTE_OVERRIDES, e.g. "roleplay=gpt-4,analysis=gpt-4"."""
+    routes = {name: dict(spec) for name, spec in routes.items()}
+    for item in os.getenv("MODEL_ROUTE_OVERRIDES", "").split(","):
+        if "=" in item:
+            route, model = (part.strip() for part in item.split("=", 1))
+            routes.setdefault(route, {})["model"] = model
+    return routes
+
+
+def token_cost(model, usage):
+    pricing = MODEL_PRICING.get(model)
+    if not pricing or usage is None:
+        return 0.0
+    prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+    return (prompt_tokens * pricing["prompt"] + completion_tokens * pricing["completion"]) / 1000.0
+
+
+class ModelRouter:
+    """
+    Picks a model per request class, trying the cheap model first and only
+    escalating when `quality_check(response)` rejects its answer.
+    """
+
+    def __init__(self, client, routes=None):
+        self.client = client
+        self.routes = _routes_from_env(routes or ROUTES)
+
+    def _call(self, route, model, kwargs):
+        started = time.perf_counter()
+        try:
+            response = self.client.chat.completions.create(model=model, **kwargs)
+        finally:
+            metrics.observe("llm_route_latency_seconds", time.perf_counter() - started, route=route, model=model)
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            metrics.increment("llm_route_tokens_total", getattr(usage, "total_tokens", 0) or 0, route=route, model=model)
+            metrics.increment("llm_route_cost_usd_total", token_cost(model, usage), route=route, model=model)
+        metrics.increment("llm_route_requests_total", route=route, model=model)
+        return response
+
+    def complete(self, route, quality_check=None, **kwargs):
+        spec = self.routes[route]
+        response = self._call(route, spec["model"], kwargs)
+
+        escalate_to = spec.get("escalate_to")
+        if quality_check and escalate_to and escalate_to != spec["model"]:
+            try:
+                passed = quality_check(response)
+            except Exception as e:
+                logger.warning("Quality check for route %s raised: %s", route, e)
+                passed = False
+            if not passed:
+                logger.info("Escalating route %s from %s to %s", route, spec["model"], escalate_to)
+                metrics.increment("llm_route_escalations_total", route=route)
+                try:
+                    response = self._call(route, escalate_to, kwargs)
+                except Exception as e:
+                    logger.warning("Escalation to %s failed, keeping cheap answer: %s", escalate_to, e)
+        return response
+
+    async def complete_async(self, route, quality_check=None, **kwargs):
+        """`complete` on a worker thread, so retries and rate-limit waits never block the event loop."""
+        return await anyio.to_thread.run_sync(functools.partial(self.complete, route, quality_check, **kwargs))
@@ -0,0 +1,184 @@
+"""
+Per-request accounting of MongoDB round trips.
+
+A pymongo CommandListener adds every command to the stats of the request
+that issued it: operations, documents returned, reply bytes and time.
+MongoTraceMiddleware opens the per-request stats, records them in /metrics
+by route, and checks them against OPERATION_BUDGETS. With MONGO_TRACE_DEBUG=1
+it also returns X-Mongo-Ops, X-Mongo-Docs, X-Mongo-Bytes and X-Mongo-Time-Ms
+headers. Reply bytes are only measured in debug mode, because measuring them
+means re-encoding the reply.
+
+Commands issued outside a request (startup warm-up, background jobs) are
+counted under the route "background".
+"""
+import contextvars
+import logging
+import os
+import threading
+
+from app import metrics
+from app.tracing import route_label
+
+logger = logging.getLogger(__name__)
+
+DEBUG = os.getenv("MONGO_TRACE_DEBUG") == "1"
+
+# Most round trips a single request to the route may make. load_user_profile
+# alone is 3 (users, chat_messages, custom_scenarios); anything that grows
+# with the size of the payload or history is an N+1 and should fail here.
+OPERATION_BUDGETS = {
+    "/api/chat": 10,
+    "/api/user_profile": 5,
+    "/api/set_user_profile": 5,
+    "/api/init_user_profile": 2,
+    "/api/get_suggestions": 5,
+    "/api/get_lessons": 4,
+    "/api/save_conversation": 4,
+    "/api/generate_practice_sentence": 0,
+    "/api/score_pronunciation": 0,
+    "/api/generate_audio": 0,
+    "/api/translate": 0,
+}
+
+OPS_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+
+_current = contextvars.ContextVar("mongo_request_stats", default=None)
+_totals = {}
+_totals_lock = threading.Lock()
+
+
+class RequestStats:
+    __slots__ = ("ops", "docs", "bytes", "seconds", "commands")
+
+    def __init__(self):
+        self.ops = 0
+        self.docs = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.commands = {}
+
+
+def current_stats():
+    return _current.get()
+
+
+def _returned_documents(reply):
+    cursor = reply.get("cursor")
+    if cursor:
+        return len(cursor.get("firstBatch") or cursor.get("nextBatch") or ())
+    return int(reply.get("n", 0) or 0)
+
+
+def record(command, docs=0, size=0, seconds=0.0):
+    """Add one round trip to the current request (or to "background")."""
+    stats = _current.get()
+    if stats is None:
+        metrics.increment("mongo_commands_total", command=command, route="background")
+        with _totals_lock:
+            _add_totals("background", 1, docs, size, seconds, requests=0)
+        return
+    stats.ops += 1
+    stats.docs += docs
+    stats.bytes += size
+    stats.seconds += seconds
+    stats.commands[command] = stats.commands.get(command, 0) + 1
+
+
+def _add_totals(route, ops, docs, size, seconds, requests=1):
+    entry = _totals.setdefault(route, {"requests": 0, "mongo_ops": 0, "docs": 0, "bytes": 0, "seconds": 0.0})
+    entry["requests"] += requests
+    entry["mongo_ops"] += ops
+    entry["docs"] += docs
+    entry["bytes"] += size
+    entry["seconds"] += seconds
+
+
+def route_totals():
+    """{route: {"requests", "mongo_ops", "docs", "bytes", "seconds"}} since start."""
+    with _totals_lock:
+        return {route: dict(entry) for route, entry in _totals.items()}
+
+
+def budget_violations(totals=None):
+    """Routes whose average ops per request exceed their budget: {route: (average, budget)}."""
+    violations = {}
+    for route, entry in (totals if totals is not None else route_totals()).items():
+        budget = OPERATION_BUDGETS.get(route)
+        if budget is None or not entry["requests"]:
+            continue
+        average = entry["mongo_ops"] / entry["requests"]
+        if average > budget:
+            violations[route] = (round(average, 2), budget)
+    return violations
+
+
+def install():
+    """Register the listener for every MongoClient created afterwards."""
+    from pymongo import monitoring
+
+    class CommandTracer(monitoring.CommandListener):
+        def started(self, event):
+            pass
+
+        def succeeded(self, event):
+            reply = event.reply or {}
+            size = 0
+            if DEBUG:
+                import bson
+                size = len(bson.encode(reply))
+            record(event.command_name, _returned_documents(reply), size, event.duration_micros / 1e6)
+
+        def failed(self, event):
+            record(event.command_name, 0, 0, event.duration_micros / 1e6)
+
+    monitoring.register(CommandTracer())
+
+
+class MongoTraceMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+
+        async def send_with_stats(message):
+            if DEBUG and message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers += [
+                    (b"x-mongo-ops", str(stats.ops).encode()),
+                    (b"x-mongo-docs", str(stats.docs).encode()),
+                    (b"x-mongo-bytes", str(stats.bytes).encode()),
+                    (b"x-mongo-time-ms", f"{stats.seconds * 1000:.1f}".encode()),
+                ]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            _current.reset(token)
+            self._finish(route_label(scope), stats)
+
+    @staticmethod
+    def _finish(route, stats):
+        metrics.observe("mongo_ops_per_request", stats.ops, buckets=OPS_BUCKETS, route=route)
+        if stats.ops:
+            metrics.observe("mongo_request_seconds", stats.seconds, route=route)
+            metrics.increment("mongo_documents_returned_total", stats.docs, route=route)
+            if DEBUG:
+                metrics.increment("mongo_reply_bytes_total", stats.bytes, route=route)
+            for command, count in stats.commands.items():
+                metrics.increment("mongo_commands_total", count, command=command, route=route)
+        with _totals_lock:
+            _add_totals(route, stats.ops, stats.docs, stats.bytes, stats.seconds)
+
+        budget = OPERATION_BUDGETS.get(route)
+        if budget is not None and stats.ops > budget:
+            metrics.increment("mongo_budget_exceeded_total", route=route)
+            logger.warning("%s made %d MongoDB round trips (budget %d): %s", route, stats.ops, budget, stats.commands)
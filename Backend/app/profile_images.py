@@ -0,0 +1,110 @@
+"""
+Profile image pipeline: validate an upload, store it in the blob store and
+render the thumbnail sizes once, at upload time.
+
+The users document only keeps the reference returned by `store_image`:
+
+    {"original": "<sha256>.png", "content_type": "image/png",
+     "thumbnails": {"64": "<sha256>.jpg", "256": "<sha256>.jpg"}}
+
+Thumbnails need Pillow (in requirements.txt). Without it every size points
+at the full original, which a warning at import and the
+profile_image_thumbnails_skipped_total counter make visible.
+"""
+import base64
+import binascii
+import io
+import logging
+
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+    logger.warning("Pillow is not installed: profile image thumbnails are disabled and clients get full-size originals")
+
+MAX_IMAGE_BYTES = 5 * 1024 * 1024
+THUMBNAIL_SIZES = (64, 256)
+DEFAULT_SIZE = 256
+
+_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "png", "image/png"),
+    (b"\xff\xd8\xff", "jpg", "image/jpeg"),
+    (b"GIF87a", "gif", "image/gif"),
+    (b"GIF89a", "gif", "image/gif"),
+)
+CONTENT_TYPES = {"png": "image/png", "jpg": "image/jpeg", "gif": "image/gif", "webp": "image/webp"}
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+def sniff(data):
+    """(extension, content type) from the file signature, not the client's claim."""
+    for signature, extension, content_type in _SIGNATURES:
+        if data.startswith(signature):
+            return extension, content_type
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp", "image/webp"
+    raise InvalidImage("Unsupported image type")
+
+
+def decode_data_url(image_data):
+    """Raw bytes from a data URL ("data:image/png;base64,...") or bare base64."""
+    encoded = image_data.split("base64,", 1)[1] if "base64," in image_data else image_data
+    if len(encoded) > MAX_IMAGE_BYTES * 4 // 3 + 4:
+        raise InvalidImage("Image is too large")
+    try:
+        return base64.b64decode(encoded, validate=False)
+    except (binascii.Error, ValueError) as e:
+        raise InvalidImage("Image is not valid base64") from e
+
+
+def _thumbnail(data, size):
+    with Image.open(io.BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((size, size))
+        output = io.BytesIO()
+        if image.mode in ("RGBA", "LA", "P"):
+            image.save(output, format="PNG", optimize=True)
+            return output.getvalue(), "png"
+        image.convert("RGB").save(output, format="JPEG", quality=85, optimize=True)
+        return output.getvalue(), "jpg"
+
+
+def store_image(store, data):
+    """Store the original and its thumbnails; returns the reference for the users document."""
+    if len(data) > MAX_IMAGE_BYTES:
+        raise InvalidImage("Image is too large")
+    extension, content_type = sniff(data)
+    original = store.put(data, extension)
+    thumbnails = {}
+    for size in THUMBNAIL_SIZES:
+        if Image is None:
+            metrics.increment("profile_image_thumbnails_skipped_total")
+            thumbnails[str(size)] = original
+            continue
+        try:
+            thumbnail, thumbnail_extension = _thumbnail(data, size)
+        except Exception as e:
+            raise InvalidImage(f"Image could not be decoded: {e}") from e
+        thumbnails[str(size)] = store.put(thumbnail, thumbnail_extension)
+    return {"original": original, "content_type": content_type, "thumbnails": thumbnails}
+
+
+def variant(reference, size=None):
+    """Blob name of the requested size (the nearest one not smaller, else the original)."""
+    if not size:
+        return reference["original"]
+    for candidate in sorted(int(key) for key in reference.get("thumbnails", {})):
+        if candidate >= size:
+            return reference["thumbnails"][str(candidate)]
+    return reference["original"]
+
+
+def content_type_of(name):
+    return CONTENT_TYPES.get(name.rsplit(".", 1)[-1], "application/octet-stream")
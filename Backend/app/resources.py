@@ -0,0 +1,115 @@
+"""
+Process-wide singletons that are expensive to build (MongoDB connection,
+OpenAI client, scenario cache).
+
+Importing app.main only registers factories. Each resource is built on first
+use, or in the background by the startup hook, and closed on shutdown, so
+importing the app does no network work and a forked worker never inherits a
+live socket from its parent.
+"""
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+class Lazy:
+    """
+    Proxy that builds its target with `factory()` on first attribute access.
+
+    A factory that raises or returns None leaves the resource unbuilt, so a
+    dependency that was down at startup is picked up once it recovers. Retries
+    are at most every RETRY_INTERVAL seconds; in between, `get()` re-raises
+    the last error (or returns None) without calling the factory.
+    """
+
+    RETRY_INTERVAL = 5.0
+
+    def __init__(self, name, factory, close=None):
+        self._name = name
+        self._factory = factory
+        self._close = close
+        self._value = None
+        self._built = False
+        self._error = None
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+        _registry[name] = self
+
+    @property
+    def initialized(self):
+        return self._built
+
+    def get(self):
+        if not self._built:
+            with self._lock:
+                if not self._built:
+                    return self._build()
+        return self._value
+
+    def _build(self):
+        if time.monotonic() < self._retry_at:
+            if self._error is not None:
+                raise self._error
+            return None
+        started = time.perf_counter()
+        try:
+            value = self._factory()
+        except Exception as e:
+            self._error, self._retry_at = e, time.monotonic() + self.RETRY_INTERVAL
+            raise
+        if value is None:
+            self._error, self._retry_at = None, time.monotonic() + self.RETRY_INTERVAL
+            logger.warning("%s is unavailable, retrying in %.0fs", self._name, self.RETRY_INTERVAL)
+            return None
+        self._value, self._built, self._error = value, True, None
+        logger.info("Initialized %s in %.3fs", self._name, time.perf_counter() - started)
+        return value
+
+    def close(self):
+        with self._lock:
+            if self._built and self._value is not None and self._close:
+                try:
+                    self._close(self._value)
+                except Exception as e:
+                    logger.warning("Error closing %s: %s", self._name, e)
+            self._value = None
+            self._built = False
+            self._error = None
+            self._retry_at = 0.0
+
+    def __getattr__(self, attr):
+        return getattr(self.get(), attr)
+
+    def __bool__(self):
+        # Never builds: truth-testing a proxy must not open a connection
+        return self._built and self._value is not None
+
+    def __repr__(self):
+        state = "initialized" if self._built else "pending"
+        return f"<Lazy {self._name} ({state})>"
+
+
+def initialize_all():
+    """Build every registered resource; returns {name: seconds} for this call."""
+    timings = {}
+    for name, resource in list(_registry.items()):
+        started = time.perf_counter()
+        try:
+            resource.get()
+        except Exception as e:
+            logger.error("Failed to initialize %s: %s", name, e)
+        timings[name] = time.perf_counter() - started
+    return timings
+
+
+def all_initialized():
+    return all(resource.initialized for resource in _registry.values())
+
+
+def close_all():
+    for resource in reversed(list(_registry.values())):
+        resource.close()
@@ -0,0 +1,46 @@
+"""
+JSON serialization for API responses.
+
+`dumps` encodes with orjson when it is installed, which handles datetime,
+date and UUID natively and is several times faster than the stdlib encoder
+on large chat histories. ObjectId (and anything else it does not know) goes
+through `_default`. Without orjson the stdlib encoder is used with the same
+fallbacks, so responses look the same either way.
+"""
+import json
+from datetime import date, datetime
+
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    return str(value)
+
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(content):
+        return orjson.dumps(content, default=_default, option=_OPTIONS)
+else:
+    def dumps(content):
+        return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+class MongoJSONResponse(JSONResponse):
+    """JSONResponse that serializes with `dumps` (ObjectId and datetime included)."""
+
+    def render(self, content):
+        return dumps(content)
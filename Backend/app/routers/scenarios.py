@@ -7,7 +7,8 @@ import sys
 # Add the parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 from utilsEdit import load_user_profile, save_user_profile, infer_ai_role  # Changed from utils to utilsEdit
-from prompts import DEFAULT_SCENARIOS, LANGUAGE_MAP
+from prompts import DEFAULT_SCENARIOS
+from app.languages import pick_localized
 
 # Get OpenAI client from main instead of llm
 from app.main import client
@@ -37,8 +38,9 @@ async def set_scenario(request: ScenarioRequest):
         user_profile["language"] = language
     # Load user profile
     if request.scenario in DEFAULT_SCENARIOS.keys():
-        user_profile["scenario"] = DEFAULT_SCENARIOS[request.scenario][user_profile["language"]]["desc"]
-        user_profile["ai_role"] = DEFAULT_SCENARIOS[request.scenario][user_profile["language"]]["role"]
+        entry = pick_localized(DEFAULT_SCENARIOS[request.scenario], user_profile["language"])
+        user_profile["scenario"] = entry["desc"]
+        user_profile["ai_role"] = entry["role"]
     else:
         # Update scenario
         user_profile["scenario"] = scenario
@@ -0,0 +1,162 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from pymongo.errors import DuplicateKeyError
+
+from app import audio_files, metrics
+
+logger = logging.getLogger(__name__)
+
+
+def scenario_hash(scenario):
+    """Stable hash of a scenario text, insensitive to case and whitespace."""
+    normalized = " ".join(str(scenario).split()).lower()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class ScenarioCache:
+    """
+    Shared cache of inferred AI roles per (scenario, language) and opening
+    lines per (scenario, language, AI role).
+
+    Lookups hit an in-process LRU first and fall back to the MongoDB
+    `scenario_cache` collection, which is shared by every worker.
+    """
+
+    def __init__(self, db=None, max_entries=1024, collection_name="scenario_cache"):
+        self.max_entries = max_entries
+        self.collection = db[collection_name] if db is not None else None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, kind, scenario, language, variant=None):
+        key = f"{kind}:{scenario_hash(scenario)}:{(language or 'en').lower()}"
+        if variant:
+            key += f":{scenario_hash(variant)[:16]}"
+        return key
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, kind, scenario, language, variant=None):
+        key = self._key(kind, scenario, language, variant)
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                metrics.increment("scenario_cache_requests_total", kind=kind, result="memory_hit")
+                return value
+
+        if self.collection is not None:
+            try:
+                doc = self.collection.find_one({"_id": key}, {"value": 1})
+            except Exception as e:
+                logger.warning("Scenario cache lookup failed for %s: %s", key, e)
+                doc = None
+            if doc and doc.get("value") is not None:
+                self._remember(key, doc["value"])
+                self.hits += 1
+                metrics.increment("scenario_cache_requests_total", kind=kind, result="mongo_hit")
+                return doc["value"]
+
+        self.misses += 1
+        metrics.increment("scenario_cache_requests_total", kind=kind, result="miss")
+        return None
+
+    def put(self, kind, scenario, language, value, variant=None):
+        key = self._key(kind, scenario, language, variant)
+        self._remember(key, value)
+
+        if self.collection is not None:
+            try:
+                self.collection.update_one(
+                    {"_id": key},
+                    {"$set": {
+                        "kind": kind,
+                        "language": (language or "en").lower(),
+                        "value": value,
+                        "updated_at": datetime.now().isoformat()
+                    }},
+                    upsert=True
+                )
+            except Exception as e:
+                logger.warning("Scenario cache write failed for %s: %s", key, e)
+
+    def get_ai_role(self, scenario, language, infer):
+        """Return the cached role for a scenario, calling `infer()` on a miss."""
+        ai_role = self.get("role", scenario, language)
+        if ai_role is None:
+            ai_role = infer()
+            if ai_role:
+                self.put("role", scenario, language, ai_role)
+        return ai_role
+
+    def acquire_lease(self, name, seconds):
+        """
+        True for the one worker (across processes and hosts) that may run
+        `name` until the lease expires. Without MongoDB every caller wins.
+        """
+        if self.collection is None:
+            return True
+        now = time.time()
+        try:
+            self.collection.update_one(
+                {"_id": f"lease:{name}", "expires_at": {"$lt": now}},
+                {"$set": {"expires_at": now + seconds, "pid": os.getpid()}},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            # The lease document exists and has not expired
+            return False
+
+    def get_opening(self, scenario, language, generate, ai_role=None, audio_dir=None, render_audio=None):
+        """
+        Return {"text": ..., "audio_file": ...} for a scenario's opening line
+        as spoken by `ai_role`.
+
+        `generate()` produces the greeting text on a miss. When `render_audio`
+        is given, the audio is rendered once to a deterministic file name in
+        `audio_dir` and re-rendered only if that file has gone missing; a
+        reused file is touched so the audio janitor keeps it.
+        """
+        opening = self.get("opening", scenario, language, ai_role)
+        changed = opening is None
+        if opening is None:
+            text = generate()
+            if not text:
+                return None
+            opening = {"text": text, "audio_file": None}
+
+        if render_audio and audio_dir:
+            opening_hash = scenario_hash(f"{scenario}|{ai_role or ''}")
+            audio_file = opening.get("audio_file") or (
+                f"opening-{opening_hash[:16]}-{(language or 'en').lower()}.mp3"
+            )
+            audio_path = os.path.join(audio_dir, audio_file)
+            if not audio_files.touch(audio_path):
+                try:
+                    render_audio(opening["text"], audio_path)
+                except Exception as e:
+                    logger.warning("Failed to render opening audio for %s: %s", audio_file, e)
+                    audio_file = None
+            if opening.get("audio_file") != audio_file:
+                opening = {"text": opening["text"], "audio_file": audio_file}
+                changed = True
+
+        if changed:
+            self.put("opening", scenario, language, opening, ai_role)
+
+        return opening
@@ -0,0 +1,86 @@
+"""
+Cold-start profile of the backend, run through `python server.py --profile-startup`.
+
+A fresh interpreter imports app.main under `-X importtime`, then builds the
+lazy resources one by one. The report lists per-phase wall time and the
+slowest top-level packages by cumulative import time. The exit status is
+non-zero when importing builds any lazy resource or the import phase
+exceeds the budget, so the same command doubles as a cold-start check in CI
+(tests/test_startup.py) and before rolling deploys.
+"""
+import json
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_CHILD = """
+import json, os, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+from app import resources
+phases = {"import app.main": imported - started}
+print("STARTUP_BUILT " + json.dumps([name for name, r in resources._registry.items() if r.initialized]))
+if os.environ.get("PROFILE_INIT") == "1":
+    phases.update({f"init {name}": seconds for name, seconds in resources.initialize_all().items()})
+print("STARTUP_PHASES " + json.dumps(phases))
+"""
+
+
+def parse_importtime(stderr):
+    """{top-level package: cumulative microseconds} from `-X importtime` output."""
+    packages = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        try:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            cumulative = int(cumulative)
+        except ValueError:
+            continue
+        # Nested imports are indented below the module that triggered them
+        name = name[1:]
+        if name and not name.startswith(" "):
+            packages[name] = packages.get(name, 0) + cumulative
+    return packages
+
+
+def profile_startup(budget_ms=None, top=15, include_init=True):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _CHILD],
+        cwd=BACKEND_DIR, capture_output=True, text=True,
+        env=dict(os.environ, PROFILE_INIT="1" if include_init else "0"),
+    )
+    phases = {}
+    built_at_import = []
+    for line in result.stdout.splitlines():
+        if line.startswith("STARTUP_PHASES "):
+            phases = json.loads(line[len("STARTUP_PHASES "):])
+        elif line.startswith("STARTUP_BUILT "):
+            built_at_import = json.loads(line[len("STARTUP_BUILT "):])
+
+    if result.returncode != 0 or not phases:
+        tail = "\n".join(line for line in result.stderr.splitlines() if not line.startswith("import time:"))[-2000:]
+        print(f"Startup failed (exit {result.returncode}):\n{tail}")
+        return 1
+
+    packages = sorted(parse_importtime(result.stderr).items(), key=lambda item: item[1], reverse=True)
+    print("Phase                                wall ms")
+    for name, seconds in phases.items():
+        print(f"  {name:<34} {seconds * 1000:8.1f}")
+    print(f"\nSlowest top-level imports (cumulative ms, top {top})")
+    for name, micros in packages[:top]:
+        print(f"  {name:<34} {micros / 1000:8.1f}")
+
+    if built_at_import:
+        print(f"\nFAIL: importing app.main built {', '.join(built_at_import)}")
+        return 1
+
+    import_ms = phases["import app.main"] * 1000
+    if budget_ms is not None:
+        within = import_ms <= budget_ms
+        print(f"\n{'PASS' if within else 'FAIL'}: import app.main took {import_ms:.0f} ms (budget {budget_ms:.0f} ms)")
+        return 0 if within else 1
+    return 0
@@ -0,0 +1,199 @@
+"""
+Micro-batching of suggestion prompts into shared chat completions.
+
+Suggestion requests arrive in bursts (every user gets new suggestions after
+every turn) and each used to be its own upstream call. SuggestionBatcher
+holds a request for a short window, packs everything that arrived meanwhile
+into one JSON-mode completion and hands each caller its own slice of the
+answer.
+
+    SUGGESTION_BATCH_MAX=16         prompts per upstream call
+    SUGGESTION_BATCH_WINDOW_MS=25   longest a prompt waits for company
+    SUGGESTION_SLO_MS=2500          latency target for a suggestion request
+    SUGGESTION_FALLBACK_CONCURRENCY=4  single-request fallbacks in flight at once
+
+The window shrinks when upstream calls are slow: waiting is only allowed
+out of the part of the SLO that the (moving average) call latency leaves
+over, so under a slow upstream requests are dispatched immediately. A prompt
+that ends up alone, or whose result is missing from the batched answer, is
+sent through its caller's own single-request path instead, a few at a time.
+
+When the batched call itself fails because the upstream is unavailable (open
+breaker, rate limit, 5xx, timeout), every prompt in it gets that error rather
+than a call of its own: the single path goes to the same upstream, and
+fanning out would multiply the load on it. Only a rejected request (a
+non-retryable 4xx) falls back prompt by prompt.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+
+from app import metrics
+from app.llm_policy import is_client_error
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+BATCH_INSTRUCTIONS = (
+    "You write reply suggestions for language learners. The user message is a JSON list of "
+    "requests, each with an id, a language and instructions. Follow each request's instructions "
+    "independently and write its suggestions in its language. Respond with a JSON object "
+    '{"results": [{"id": "<request id>", "suggestions": ["...", "...", "..."]}]} '
+    "containing one entry for every request id."
+)
+
+
+class _Job:
+    __slots__ = ("prompt", "language_name", "single", "future", "enqueued")
+
+    def __init__(self, prompt, language_name, single, future):
+        self.prompt = prompt
+        self.language_name = language_name
+        self.single = single
+        self.future = future
+        self.enqueued = time.monotonic()
+
+
+def _parse_results(text):
+    """{request id: [suggestion, ...]} from a batched reply; ignores malformed entries."""
+    try:
+        payload = json.loads(text or "")
+    except ValueError:
+        return {}
+    results = payload.get("results") if isinstance(payload, dict) else None
+    parsed = {}
+    for entry in results if isinstance(results, list) else ():
+        if not isinstance(entry, dict) or not isinstance(entry.get("suggestions"), list):
+            continue
+        suggestions = [str(item).strip() for item in entry["suggestions"] if str(item).strip()]
+        if suggestions:
+            parsed[str(entry.get("id"))] = suggestions
+    return parsed
+
+
+class SuggestionBatcher:
+    def __init__(self, client, model="gpt-3.5-turbo", max_batch=None, max_wait=None, slo=None,
+                 tokens_per_prompt=120, fallback_concurrency=None):
+        self.client = client
+        self.model = model
+        self.max_batch = max_batch or int(os.getenv("SUGGESTION_BATCH_MAX", "16"))
+        self.max_wait = max_wait if max_wait is not None else float(os.getenv("SUGGESTION_BATCH_WINDOW_MS", "25")) / 1000.0
+        self.slo = slo if slo is not None else float(os.getenv("SUGGESTION_SLO_MS", "2500")) / 1000.0
+        self.tokens_per_prompt = tokens_per_prompt
+        self.fallback_concurrency = fallback_concurrency or int(os.getenv("SUGGESTION_FALLBACK_CONCURRENCY", "4"))
+        self._fallback_slots = None
+        self._pending = []
+        self._timer = None
+        self._call_seconds = None
+        self._tasks = set()
+
+    def window(self):
+        """Seconds the first prompt of a batch may wait for others."""
+        if self._call_seconds is None or self.max_batch <= 1:
+            return self.max_wait if self.max_batch > 1 else 0.0
+        return max(0.0, min(self.max_wait, self.slo - self._call_seconds))
+
+    async def submit(self, prompt, language_name, single):
+        """
+        Suggestions for `prompt`, as a list of strings.
+
+        `single` is an async callable producing the same list from a call of
+        its own; it is used whenever the prompt cannot be answered in a batch.
+        """
+        loop = asyncio.get_running_loop()
+        job = _Job(prompt, language_name, single, loop.create_future())
+        self._pending.append(job)
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            window = self.window()
+            metrics.set_gauge("suggestion_batch_window_seconds", window)
+            if window <= 0:
+                self._flush()
+            else:
+                self._timer = loop.call_later(window, self._flush)
+        return await job.future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        now = time.monotonic()
+        for job in batch:
+            metrics.observe("suggestion_batch_wait_seconds", now - job.enqueued)
+        metrics.observe("suggestion_batch_size", len(batch), buckets=BATCH_SIZE_BUCKETS)
+        batch = [job for job in batch if not job.future.done()]
+        if len(batch) == 1:
+            await self._run_single(batch[0], "single")
+            return
+        if not batch:
+            return
+
+        results = {}
+        started = time.perf_counter()
+        try:
+            response = await self.client.chat.completions.create_async(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": BATCH_INSTRUCTIONS},
+                    {"role": "user", "content": json.dumps(
+                        [{"id": str(index), "language": job.language_name, "instructions": job.prompt.strip()}
+                         for index, job in enumerate(batch)],
+                        ensure_ascii=False
+                    )},
+                ],
+                response_format={"type": "json_object"},
+                temperature=0.7,
+                max_tokens=self.tokens_per_prompt * len(batch),
+            )
+            results = _parse_results(response.choices[0].message.content)
+            elapsed = time.perf_counter() - started
+            self._call_seconds = elapsed if self._call_seconds is None else 0.8 * self._call_seconds + 0.2 * elapsed
+        except Exception as e:
+            if not is_client_error(e):
+                logger.warning("Batched suggestion call for %d prompts failed, failing them: %s", len(batch), e)
+                for job in batch:
+                    if not job.future.done():
+                        metrics.increment("suggestion_batch_jobs_total", result="failed")
+                        job.future.set_exception(e)
+                return
+            logger.warning("Batched suggestion call for %d prompts was rejected: %s", len(batch), e)
+
+        missing = []
+        for index, job in enumerate(batch):
+            suggestions = results.get(str(index))
+            if suggestions is None:
+                missing.append(job)
+            elif not job.future.done():
+                metrics.increment("suggestion_batch_jobs_total", result="batched")
+                job.future.set_result(suggestions)
+        if missing:
+            await asyncio.gather(*(self._run_fallback(job) for job in missing))
+
+    async def _run_fallback(self, job):
+        loop = asyncio.get_running_loop()
+        if self._fallback_slots is None or self._fallback_slots[0] is not loop:
+            self._fallback_slots = (loop, asyncio.Semaphore(self.fallback_concurrency))
+        async with self._fallback_slots[1]:
+            await self._run_single(job, "fallback")
+
+    async def _run_single(self, job, result):
+        metrics.increment("suggestion_batch_jobs_total", result=result)
+        try:
+            suggestions = await job.single()
+        except Exception as e:
+            if not job.future.done():
+                job.future.set_exception(e)
+            return
+        if not job.future.done():
+            job.future.set_result(suggestions)
@@ -0,0 +1,164 @@
+"""
+Text post-processing shared by the chat, suggestion, lesson and pronunciation
+handlers. Patterns are compiled once at import and character-level filters are
+`str.translate` tables, so each stage is a single pass over the text.
+"""
+import re
+import unicodedata
+
+try:
+    import emoji
+except ImportError:
+    emoji = None
+
+SENTENCE_ENDINGS = ('.', '!', '?', '。', '！', '？', '।')
+
+# Unicode whitespace as matched by `\s` (identical to str.isspace()).
+_WHITESPACE = (
+    '\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f \x85\xa0\u1680'
+    '\u2000\u2001\u2002\u2003\u2004\u2005\u2006\u2007\u2008\u2009\u200a'
+    '\u2028\u2029\u202f\u205f\u3000'
+)
+
+_REPEATED_PUNCTUATION = re.compile(r'([.!?])\1+')
+_SPACE_AFTER_PUNCTUATION = str.maketrans({'.': '. ', '!': '! ', '?': '? '})
+_NON_SPEAKABLE = re.compile(r'[^\w\s.!?,;:\-\'"\(\)，。？！；：（）【】]')
+_SENTENCE_GAP = re.compile(r'([.!?]) ')
+
+_PARENTHESIZED = re.compile(r'\([^)]*\)')
+_DASH_TAIL = re.compile(r'\s*[-–—]\s*.*$')
+_COMMA_TAIL = re.compile(r'\s*,\s*.*$')
+_NON_WORD = re.compile(r'[^\w]')
+_LIST_MARKER = re.compile(r'^[\d\.\-\*\•\⁃\⦁\◦\▪\□\▫\–\—\⁌\→\>\s]+')
+_STARRED_ASIDE = re.compile(r'\*.*?\*')
+
+_TRAILING_LIST_MARKER = re.compile(r'\d+\.\s*$')
+_SENTENCE_END = re.compile(r'(?<!\d)[.!?。！？।]["\'”’」』)）]*')
+
+# Latin letters, digits, whitespace and ASCII punctuation dropped from
+# CJK vocabulary words before the first run of native script is taken.
+_CJK_WORD_NOISE = str.maketrans('', '', (
+    'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
+    + _WHITESPACE + '-_.,!?()[]{}'
+))
+
+# First run of native script per language for single-word extraction.
+_WORD_SCRIPT = {
+    'ko': re.compile(r'[가-힣]+'),
+    'ja': re.compile(r'[ひらがなカタカナ一-龯ぁ-ゖァ-ヾ]+'),
+    'zh-CN': re.compile(r'[一-龯]+'),
+    'zh-TW': re.compile(r'[一-龯]+'),
+}
+_CJK_WORD_LANGUAGES = ('ko', 'ja', 'zh-CN', 'zh-TW')
+_TTS_SPACED_LANGUAGES_EXCLUDED = ('zh-TW', 'zh-CN', 'zh', 'ja', 'ko', 'hi')
+_CJK_LANGUAGES = ('zh', 'zh-cn', 'zh-tw', 'ja')
+
+
+def collapse_whitespace(text):
+    return ' '.join(text.split())
+
+
+def clean_text(text):
+    """Normalize generated text for TTS: single punctuation, spacing, speakable characters only."""
+    text = _REPEATED_PUNCTUATION.sub(r'\1', text)
+    text = text.translate(_SPACE_AFTER_PUNCTUATION)
+    text = _NON_SPEAKABLE.sub('', text)
+    return collapse_whitespace(text)
+
+
+def space_sentences_for_tts(text, language):
+    """Add a longer pause between sentences for languages that use spaces."""
+    if language in _TTS_SPACED_LANGUAGES_EXCLUDED:
+        return text
+    return _SENTENCE_GAP.sub(r'\1  ', text)
+
+
+def clean_spoken_text(text):
+    """Drop *stage directions*, emoji and extra whitespace from a spoken reply."""
+    text = _STARRED_ASIDE.sub('', text)
+    if emoji is not None:
+        text = emoji.replace_emoji(text, replace='')
+    return collapse_whitespace(text)
+
+
+def clean_generated_text(text, language, content_type):
+    """Clean generated text to remove explanations and extra information"""
+    if not text:
+        return text
+
+    text = text.strip().strip('"\'`')
+    text = _PARENTHESIZED.sub('', text).strip()
+    text = _DASH_TAIL.sub('', text).strip()
+
+    if content_type != 'word':
+        return text
+
+    text = _COMMA_TAIL.sub('', text).strip()
+
+    if language in _CJK_WORD_LANGUAGES:
+        text = text.translate(_CJK_WORD_NOISE)
+        match = _WORD_SCRIPT[language].search(text)
+        if match:
+            text = match.group(0)
+    else:
+        words = text.split()
+        if words:
+            text = _NON_WORD.sub('', words[0])
+
+    return text
+
+
+def strip_list_marker(line):
+    """Remove leading numbering, bullets and dashes from a generated line."""
+    return _LIST_MARKER.sub('', line).strip()
+
+
+def split_suggestions(text, limit=3):
+    """Split a model reply into at most `limit` non-empty, unbulleted lines."""
+    suggestions = []
+    for line in text.split('\n'):
+        cleaned = strip_list_marker(line.strip())
+        if cleaned:
+            suggestions.append(cleaned)
+            if len(suggestions) == limit:
+                break
+    return suggestions
+
+
+def _terminator_for(language):
+    language = (language or 'en').lower()
+    if language.startswith(_CJK_LANGUAGES):
+        return '。'
+    if language == 'hi':
+        return '।'
+    return '.'
+
+
+def trim_to_last_sentence(text, language='en', min_keep=0.4):
+    """
+    Cut a reply that stopped mid-sentence back to its last complete sentence.
+
+    If the last sentence boundary would keep less than `min_keep` of the text
+    (or there is none), the text is kept and a terminator is appended instead.
+    """
+    if not text:
+        return text
+
+    text = text.strip()
+    if _TRAILING_LIST_MARKER.search(text):
+        text = _TRAILING_LIST_MARKER.sub('', text).strip()
+    if not text or text.endswith(SENTENCE_ENDINGS):
+        return text
+
+    last_end = None
+    for match in _SENTENCE_END.finditer(text):
+        last_end = match.end()
+    if last_end and last_end >= len(text) * min_keep:
+        return text[:last_end].strip()
+
+    return text.rstrip(' ,;:-–—、，') + _terminator_for(language)
+
+
+def title_key(title):
+    """Comparison key for scenario titles: NFKC, case-folded, whitespace collapsed."""
+    return collapse_whitespace(unicodedata.normalize('NFKC', title or '').casefold())
@@ -0,0 +1,89 @@
+"""
+Per-request trace IDs and request-level metrics.
+
+TraceMiddleware reuses an incoming X-Request-ID (or the trace id of a W3C
+traceparent header) and otherwise mints one, exposes it to the handler via
+`current_trace_id()`, adds it to every log record through TraceIdFilter and
+echoes it back as X-Request-ID. It also records the in-flight gauge and the
+per-endpoint latency histogram, labelled by route template rather than raw
+path so usernames and file names do not explode the series count.
+"""
+import contextvars
+import logging
+import re
+import time
+import uuid
+
+from app import metrics
+
+TRACE_HEADER = "x-request-id"
+
+_trace_id = contextvars.ContextVar("trace_id", default=None)
+_valid_trace_id = re.compile(r"^[A-Za-z0-9._-]{8,64}$")
+
+
+def current_trace_id():
+    return _trace_id.get()
+
+
+def _incoming_trace_id(headers):
+    for key, value in headers:
+        if key == b"x-request-id":
+            candidate = value.decode("latin-1")
+            if _valid_trace_id.match(candidate):
+                return candidate
+        elif key == b"traceparent":
+            parts = value.decode("latin-1").split("-")
+            if len(parts) == 4 and len(parts[1]) == 32:
+                return parts[1]
+    return None
+
+
+def route_label(scope):
+    route = scope.get("route")
+    if route is not None and getattr(route, "path", None):
+        return route.path
+    # Mounted apps (e.g. /audio static files) only leave their prefix behind
+    return scope.get("root_path") or "unmatched"
+
+
+class TraceIdFilter(logging.Filter):
+    """Attach `record.trace_id` ("-" outside a request) for the log format."""
+
+    def filter(self, record):
+        record.trace_id = _trace_id.get() or "-"
+        return True
+
+
+class TraceMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace_id = _incoming_trace_id(scope.get("headers", ())) or uuid.uuid4().hex
+        token = _trace_id.set(trace_id)
+        status = 500
+
+        async def send_with_trace(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((TRACE_HEADER.encode("latin-1"), trace_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        started = time.perf_counter()
+        metrics.add_gauge("http_requests_in_flight", 1)
+        try:
+            await self.app(scope, receive, send_with_trace)
+        finally:
+            metrics.add_gauge("http_requests_in_flight", -1)
+            labels = {"method": scope["method"], "route": route_label(scope), "status": str(status)}
+            metrics.observe("http_request_duration_seconds", time.perf_counter() - started, **labels)
+            metrics.increment("http_requests_total", **labels)
+            _trace_id.reset(token)
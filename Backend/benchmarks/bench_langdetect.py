@@ -0,0 +1,102 @@
+"""
+Accuracy and latency check for the local language detector.
+
+    python -m benchmarks.bench_langdetect [--iterations 20000] [--budget-us 100]
+
+Every sample must be accepted for its own language and rejected for every
+language written in another script; p50/p99 per-call latency must stay under
+the budget. matches_language fails open between Latin-script languages on
+sentences this short, so Latin-vs-Latin rejections are reported as recall
+rather than required (tests/test_langdetect.py holds the accuracy checks).
+"""
+import argparse
+import json
+import sys
+import time
+
+from app.langdetect import detect_language, matches_language
+from app.languages import LATIN, get_language
+
+SAMPLES = {
+    "en": [
+        "I'd love to help you find a table. How many people are in your party tonight?",
+        "That sounds like a great plan for the weekend. What time should we meet?",
+    ],
+    "es": [
+        "¡Claro! Tenemos una mesa junto a la ventana. ¿Cuántas personas son?",
+        "Me gustaría reservar una habitación para dos noches, por favor.",
+    ],
+    "fr": [
+        "Bien sûr, nous avons une table près de la fenêtre. Combien de personnes êtes-vous ?",
+        "Je voudrais réserver une chambre pour deux nuits, s'il vous plaît.",
+    ],
+    "de": [
+        "Natürlich, wir haben einen Tisch am Fenster. Wie viele Personen sind Sie?",
+        "Ich möchte ein Zimmer für zwei Nächte reservieren, bitte.",
+    ],
+    "it": [
+        "Certo, abbiamo un tavolo vicino alla finestra. Quante persone siete?",
+        "Vorrei prenotare una camera per due notti, per favore.",
+    ],
+    "zh-CN": ["当然，我们有一张靠窗的桌子。请问你们几位？", "我想预订一个房间，住两个晚上。这个价格多少钱？"],
+    "zh-TW": ["當然，我們有一張靠窗的桌子。請問你們幾位？", "我想預訂一個房間，住兩個晚上。這個價格多少錢？"],
+    "ja": ["もちろんです。窓際のお席がございます。何名様ですか？", "二泊で部屋を予約したいのですが。"],
+    "ko": ["물론이죠. 창가 자리가 있습니다. 몇 분이세요?", "이틀 밤 묵을 방을 예약하고 싶어요."],
+    "hi": ["ज़रूर, हमारे पास खिड़की के पास एक मेज़ है। आप कितने लोग हैं?", "मैं दो रातों के लिए एक कमरा बुक करना चाहता हूँ।"],
+}
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--budget-us", type=float, default=100.0)
+    args = parser.parse_args()
+
+    errors = []
+    latin_pairs = latin_rejected = 0
+    for language, texts in SAMPLES.items():
+        for text in texts:
+            if detect_language(text) != language:
+                errors.append(f"detect {language}: got {detect_language(text)!r} for {text!r}")
+            for other in SAMPLES:
+                matched = matches_language(text, other)
+                if other == language:
+                    if not matched:
+                        errors.append(f"matches_language({text!r}, {other!r}) rejected its own language")
+                elif get_language(language).script == LATIN and get_language(other).script == LATIN:
+                    latin_pairs += 1
+                    latin_rejected += not matched
+                elif matched:
+                    errors.append(f"matches_language({text!r}, {other!r}) accepted another script")
+
+    corpus = [(text, language) for language, texts in SAMPLES.items() for text in texts]
+    timings = []
+    for i in range(args.iterations):
+        text, language = corpus[i % len(corpus)]
+        started = time.perf_counter()
+        matches_language(text, language)
+        timings.append((time.perf_counter() - started) * 1e6)
+
+    report = {
+        "samples": len(corpus),
+        "errors": len(errors),
+        "latin_mismatch_recall": round(latin_rejected / latin_pairs, 2) if latin_pairs else None,
+        "p50_us": round(percentile(timings, 50), 2),
+        "p99_us": round(percentile(timings, 99), 2),
+    }
+    print(json.dumps(report, indent=2))
+    for error in errors:
+        print(f"FAIL: {error}")
+    if report["p99_us"] > args.budget_us:
+        print(f"FAIL: p99 {report['p99_us']}us exceeds budget {args.budget_us}us")
+        return 1
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
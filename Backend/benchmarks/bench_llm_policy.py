@@ -0,0 +1,83 @@
+"""
+Fault-injection run of the upstream LLM policy against the local fake server.
+
+    python -m benchmarks.bench_llm_policy
+
+Phase 1 injects intermittent 429/5xx responses and checks that retries keep the
+success rate up. Phase 2 takes the upstream down completely and checks that the
+circuit breaker opens and later calls fail fast instead of waiting on retries.
+Exits non-zero if either check fails.
+"""
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from openai import OpenAI
+
+from app import metrics
+from app.llm_gateway import CoalescingClient
+from app.llm_policy import UpstreamPolicy
+from benchmarks.fake_openai import FakeOpenAIServer, FaultConfig
+
+
+def run_requests(client, count, concurrency=8):
+    def one(i):
+        started = time.perf_counter()
+        try:
+            client.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=[{"role": "user", "content": f"Say hello #{i}"}],
+                max_tokens=50,
+            )
+            ok = True
+        except Exception:
+            ok = False
+        return ok, time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(count)))
+    latencies = sorted(latency for _, latency in results)
+    return {
+        "requests": count,
+        "succeeded": sum(1 for ok, _ in results if ok),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1),
+        "max_ms": round(latencies[-1] * 1000, 1),
+    }
+
+
+def main():
+    server = FakeOpenAIServer(config=FaultConfig(latency_ms=20, error_rate=0.3, retry_after=0.05)).start()
+    policy = UpstreamPolicy(max_attempts=4, base_delay=0.05, max_delay=0.5,
+                            failure_threshold=5, recovery_timeout=2.0)
+    client = CoalescingClient(OpenAI(api_key="fake", base_url=server.base_url, max_retries=0), policy=policy)
+
+    flaky = run_requests(client, 100)
+
+    server.config.error_rate = 1.0
+    outage = run_requests(client, 50)
+
+    server.stop()
+
+    report = {
+        "flaky_upstream": flaky,
+        "outage": outage,
+        "upstream_requests": server.requests,
+        "injected_failures": server.failures,
+        "counters": metrics.snapshot(),
+    }
+    print(json.dumps(report, indent=2))
+
+    checks = {
+        "retries keep >= 95% success at 30% fault rate": flaky["succeeded"] >= 95,
+        "breaker opened during outage": metrics.get("llm_circuit_opened_total", model="gpt-3.5-turbo") >= 1,
+        "rejected calls fail fast": metrics.get("llm_circuit_rejected_total", model="gpt-3.5-turbo") > 0
+                                    and outage["p50_ms"] < 50,
+    }
+    for name, passed in checks.items():
+        print(f"{'PASS' if passed else 'FAIL'}: {name}")
+    return 0 if all(checks.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
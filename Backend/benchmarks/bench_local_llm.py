@@ -0,0 +1,107 @@
+"""
+CPU throughput of the llama.cpp provider under concurrent multi-turn chats.
+
+    python -m benchmarks.bench_local_llm --model model.gguf [--users 8] [--turns 4]
+        [--max-tokens 64] [--replicas 1 2] [--threads 0] [--cache-mb 512]
+
+Each simulated user holds one conversation and sends its turns back to back,
+appending the model's reply and a new user message each time, the way the
+chat endpoint grows its prompt. The run is repeated for every --replicas
+value. Reported per run: completion tokens per second over the wall time,
+p50/p95 request latency, median latency per turn number (flat when each turn
+only evaluates its new tokens, rising with the transcript when it does not;
+compare against --cache-mb 0), how often the scheduler placed a turn on the
+replica that already held its conversation (llm_local_affinity_total) and
+how often a saved conversation snapshot was resumed (llm_local_kv_cache_total).
+"""
+import argparse
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app import metrics
+from app.llm_providers import LlamaCppClient, LlamaCppEngine
+
+SYSTEM = ("You are a friendly English tutor. Keep replies short, correct the learner's mistakes "
+          "gently and end every reply with a question that keeps the conversation going.")
+USER_TURNS = (
+    "Hi! I want practice my English for job interview.",
+    "I am work as software developer since three years.",
+    "My biggest weakness is I am speaking too fast when nervous.",
+    "What question I should ask to the interviewer in the end?",
+    "Thank you, can you tell me how I did today?",
+)
+
+
+def conversation(client, user, turns, max_tokens):
+    messages = [{"role": "system", "content": SYSTEM}]
+    latencies, tokens = [], 0
+    for turn in range(turns):
+        messages.append({"role": "user", "content": f"[{user}] {USER_TURNS[turn % len(USER_TURNS)]}"})
+        started = time.perf_counter()
+        response = client.chat.completions.create(messages=list(messages), max_tokens=max_tokens, temperature=0.7)
+        latencies.append(time.perf_counter() - started)
+        tokens += response.usage.completion_tokens
+        messages.append({"role": "assistant", "content": response.choices[0].message.content})
+    return latencies, tokens
+
+
+def counts():
+    counters = metrics.snapshot()
+    keys = [("affinity", result) for result in ("continuation", "partial", "miss")]
+    keys += [("kv_cache", result) for result in ("hit", "miss")]
+    return {(kind, result): counters.get(f'llm_local_{kind}_total{{result="{result}"}}', 0) for kind, result in keys}
+
+
+def run(args, replicas):
+    engine = LlamaCppEngine(args.model, replicas=replicas, n_ctx=args.ctx, n_threads=args.threads or None,
+                            cache_bytes=args.cache_mb << 20, queue_size=max(64, args.users))
+    client = LlamaCppClient(engine, timeout=3600)
+    before = counts()
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=args.users) as pool:
+            results = list(pool.map(lambda user: conversation(client, user, args.turns, args.max_tokens),
+                                    range(args.users)))
+    finally:
+        client.close()
+    wall = time.perf_counter() - started
+    after = counts()
+
+    latencies = sorted(latency for user_latencies, _ in results for latency in user_latencies)
+    tokens = sum(user_tokens for _, user_tokens in results)
+    delta = {key: int(after[key] - before[key]) for key in after}
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    by_turn = [statistics.median(user_latencies[turn] for user_latencies, _ in results) for turn in range(args.turns)]
+    print(f"replicas={replicas:<3} requests={len(latencies):<4} {tokens / wall:7.1f} tok/s  "
+          f"p50 {statistics.median(latencies):6.2f}s  p95 {p95:6.2f}s")
+    print(f"    median by turn: {'  '.join(f'{latency:.2f}s' for latency in by_turn)}")
+    print(f"    affinity continuation/partial/miss {delta['affinity', 'continuation']}/"
+          f"{delta['affinity', 'partial']}/{delta['affinity', 'miss']}  "
+          f"kv snapshot hit/miss {delta['kv_cache', 'hit']}/{delta['kv_cache', 'miss']}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", required=True, help="path to a GGUF model")
+    parser.add_argument("--users", type=int, default=8)
+    parser.add_argument("--turns", type=int, default=4)
+    parser.add_argument("--max-tokens", type=int, default=64)
+    parser.add_argument("--replicas", type=int, nargs="+", default=[1, 2])
+    parser.add_argument("--threads", type=int, default=0, help="threads per replica (0: cores / replicas)")
+    parser.add_argument("--ctx", type=int, default=4096)
+    parser.add_argument("--cache-mb", type=int, default=512)
+    args = parser.parse_args()
+
+    try:
+        import llama_cpp  # noqa: F401
+    except ImportError:
+        sys.exit("llama-cpp-python is not installed (pip install llama-cpp-python)")
+
+    for replicas in args.replicas:
+        run(args, replicas)
+
+
+if __name__ == "__main__":
+    main()
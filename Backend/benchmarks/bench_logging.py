@@ -0,0 +1,106 @@
+"""
+Per-call cost of logging on the request path, old setup versus the queue pipeline.
+
+    python -m benchmarks.bench_logging [--calls 20000] [--threads 8] [--sink-latency-us 50]
+
+"sync" is the previous basicConfig StreamHandler writing to stdout from the
+calling thread; "queue" is app.logging_setup. Each case logs a ~2 KB message
+(a chat reply sized payload) from several threads at once. Output goes to
+/dev/null, and --sink-latency-us adds a blocking delay per write to stand in
+for a stdout pipe whose reader (container log driver, terminal) falls behind.
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app import logging_setup
+
+PAYLOAD = "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 36
+
+
+class SlowSink:
+    def __init__(self, stream, latency):
+        self.stream = stream
+        self.latency = latency
+
+    def write(self, text):
+        if self.latency:
+            time.sleep(self.latency)
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+def reset_root():
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    return root
+
+
+def run_case(logger, emit, calls, threads):
+    per_thread = calls // threads
+
+    def worker(_):
+        for i in range(per_thread):
+            emit(logger, i)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(worker, range(threads)))
+    return (time.perf_counter() - started) / (per_thread * threads) * 1e6
+
+
+CASES = {
+    "info f-string": lambda logger, i: logger.info(f"Final suggestions {i}: {PAYLOAD}"),
+    "info %-args": lambda logger, i: logger.info("Final suggestions %s: %s", i, PAYLOAD),
+    "debug disabled": lambda logger, i: logger.debug("Final suggestions %s: %s", i, PAYLOAD),
+    "info sampled 1/100": lambda logger, i: logger.info("Final suggestions %s: %s", i, PAYLOAD,
+                                                        extra=logging_setup.sampled(100)),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--sink-latency-us", type=float, default=0)
+    args = parser.parse_args()
+
+    devnull = open(os.devnull, "w")
+    sink = SlowSink(devnull, args.sink_latency_us / 1e6)
+    logger = logging.getLogger("bench")
+    results = {}
+
+    root = reset_root()
+    sync = logging.StreamHandler(sink)
+    sync.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+    root.addHandler(sync)
+    root.setLevel(logging.INFO)
+    for name, emit in CASES.items():
+        results[("sync", name)] = run_case(logger, emit, args.calls, args.threads)
+
+    reset_root()
+    real_stdout, sys.stdout = sys.stdout, sink
+    try:
+        logging_setup.configure_logging()
+        logging.getLogger().setLevel(logging.INFO)
+        for name, emit in CASES.items():
+            results[("queue", name)] = run_case(logger, emit, args.calls, args.threads)
+        logging_setup.shutdown_logging()
+    finally:
+        sys.stdout = real_stdout
+        devnull.close()
+
+    print(f"{'case':<22} {'sync us/call':>14} {'queue us/call':>14}")
+    for name in CASES:
+        print(f"{name:<22} {results[('sync', name)]:14.2f} {results[('queue', name)]:14.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""
+Time to save a scenario conversation: one insert per message vs. the bulk path.
+
+    python -m benchmarks.bench_scenario_save [--messages 10 100 500] [--repeat 5]
+        [--mongo uri|mongomock] [--transaction]
+
+"per-message" is the previous behaviour of /api/save_scenario_messages
+(insert_scenario_conversation, then insert_scenario_message for each
+message); "bulk" is MongoDBManager.save_scenario_conversation. With
+--mongo uri (default) a throwaway database on MONGODB_URI is used and dropped
+afterwards; mongomock measures client overhead only, not round trips.
+--transaction runs the bulk path in a transaction (needs a replica set).
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+import uuid
+
+from database.mongodb_manager import MongoDBManager
+
+
+def connect(kind):
+    if kind == "mongomock":
+        import mongomock
+        return mongomock.MongoClient()[f"bench_{uuid.uuid4().hex[:8]}"]
+    from pymongo import MongoClient
+    client = MongoClient(os.getenv("MONGODB_URI", "mongodb://localhost:27017/"))
+    return client[f"bench_{uuid.uuid4().hex[:8]}"]
+
+
+def make_messages(count):
+    return [
+        {"text": f"Message {i} " + "lorem ipsum " * 8, "sender": "user" if i % 2 == 0 else "assistant",
+         "audio_url": None, "timestamp": f"2024-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}"}
+        for i in range(count)
+    ]
+
+
+async def per_message(manager, messages):
+    conversation_id = await manager.insert_scenario_conversation("bench", "Ordering coffee")
+    for message in messages:
+        await manager.insert_scenario_message(conversation_id, message["text"], message["sender"],
+                                              message["audio_url"], message["timestamp"])
+
+
+def bulk(manager, messages, transactional):
+    manager.save_scenario_conversation("bench", "Ordering coffee", messages, transactional=transactional)
+
+
+def timed(function, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--mongo", choices=["mongomock", "uri"], default="uri")
+    parser.add_argument("--transaction", action="store_true")
+    args = parser.parse_args()
+
+    db = connect(args.mongo)
+    manager = MongoDBManager(db=db)
+    try:
+        print(f"{'messages':>9} {'per-message ms':>15} {'bulk ms':>9} {'speedup':>8}")
+        for count in args.messages:
+            messages = make_messages(count)
+            old = timed(lambda: asyncio.run(per_message(manager, messages)), args.repeat)
+            new = timed(lambda: bulk(manager, messages, args.transaction), args.repeat)
+            print(f"{count:>9} {old:>15.1f} {new:>9.1f} {old / new:>7.1f}x")
+    finally:
+        db.client.drop_database(db.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Serialization time and bytes on the wire for a large chat history.
+
+    python -m benchmarks.bench_serialization [--messages 10000] [--repeat 5]
+
+Builds a /api/user_profile payload with --messages chat_history entries
+(mixed Latin and CJK text, ISO timestamps, ObjectId ids) and reports:
+- encode time for the previous stdlib path (json.dumps with an ObjectId
+  default, as JSONResponse did) and for app.responses.dumps (orjson when
+  installed);
+- body size uncompressed, gzip and brotli (when installed), with the time
+  CompressionMiddleware would spend compressing.
+"""
+import argparse
+import gzip
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from app import compression, responses
+
+TEXTS = (
+    "I would like to order a coffee and a croissant, please.",
+    "Could you tell me where the nearest train station is?",
+    "すみません、駅はどこですか？この近くにありますか。",
+    "我想点一杯咖啡和一个牛角面包，谢谢。",
+    "오늘 날씨가 정말 좋네요. 산책하러 갈까요?",
+    "¿Podrías recomendarme un buen restaurante cerca de aquí?",
+)
+
+
+def build_profile(count):
+    random.seed(7)
+    started = datetime(2024, 1, 1, 9, 0, 0)
+    history = []
+    for index in range(count):
+        history.append({
+            "id": ObjectId(),
+            "user": random.choice(TEXTS),
+            "ai": " ".join(random.choice(TEXTS) for _ in range(3)),
+            "timestamp": (started + timedelta(seconds=37 * index)).isoformat(),
+            "conversation_id": f"conv-{index // 20}",
+            "batch_id": f"batch-{index // 20}",
+            "is_discarded": False,
+        })
+    return {
+        "username": "benchmark-user",
+        "language": "Japanese",
+        "locale": "ja",
+        "chat_history": history,
+        "custom_scenarios": [{"id": f"s{i}", "title": f"Scenario {i}", "created_at": started.isoformat()}
+                             for i in range(20)],
+    }
+
+
+def stdlib_dumps(content):
+    # What JSONResponse.render did: ensure_ascii=False, compact separators
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":"),
+                      default=lambda value: str(value) if isinstance(value, ObjectId) else None).encode("utf-8")
+
+
+def best_of(repeat, fn, *args):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    profile = build_profile(args.messages)
+    print(f"{args.messages} messages, encoder: {'orjson' if responses.orjson else 'stdlib json'}")
+
+    stdlib_seconds, stdlib_body = best_of(args.repeat, stdlib_dumps, profile)
+    fast_seconds, fast_body = best_of(args.repeat, responses.dumps, profile)
+    assert json.loads(stdlib_body) == json.loads(fast_body)
+    print(f"  encode  stdlib {stdlib_seconds * 1000:7.1f}ms   app.responses {fast_seconds * 1000:7.1f}ms"
+          f"   ({stdlib_seconds / fast_seconds:.1f}x)")
+
+    print(f"  identity {len(fast_body) / 1024:9.0f} KiB")
+    encodings = ["gzip"] + (["br"] if compression.brotli else [])
+    for encoding in encodings:
+        seconds, compressed = best_of(args.repeat, compression.compress, fast_body, encoding)
+        print(f"  {encoding:<8} {len(compressed) / 1024:9.0f} KiB  ({len(fast_body) / len(compressed):4.1f}x smaller, "
+              f"{seconds * 1000:.1f}ms to compress)")
+    if not compression.brotli:
+        print("  br       skipped (pip install brotli)")
+    assert gzip.decompress(compression.compress(fast_body, "gzip")) == fast_body
+
+
+if __name__ == "__main__":
+    main()
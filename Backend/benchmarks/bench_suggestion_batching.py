@@ -0,0 +1,84 @@
+"""
+Upstream calls and latency for a burst of suggestion requests, batched or not.
+
+    python -m benchmarks.bench_suggestion_batching [--requests 300] [--burst-ms 500]
+        [--latency-ms 800] [--per-prompt-ms 40] [--window-ms 25] [--max-batch 16]
+
+Requests arrive uniformly spread over --burst-ms (everyone's turn ending at
+about the same time) and go through app.suggestion_batcher against a fake
+client whose call takes --latency-ms plus --per-prompt-ms for every prompt
+packed into it. "unbatched" is the same run with a batch size of 1, i.e. the
+previous one-call-per-request behaviour.
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from types import SimpleNamespace
+
+from app.suggestion_batcher import SuggestionBatcher
+
+
+class FakeCompletions:
+    def __init__(self, latency, per_prompt):
+        self.latency = latency
+        self.per_prompt = per_prompt
+        self.calls = 0
+
+    async def create_async(self, **kwargs):
+        self.calls += 1
+        prompts = json.loads(kwargs["messages"][-1]["content"]) if "response_format" in kwargs else [None]
+        await asyncio.sleep(self.latency + self.per_prompt * len(prompts))
+        if "response_format" in kwargs:
+            content = json.dumps({"results": [{"id": p["id"], "suggestions": ["One.", "Two.", "Three."]}
+                                              for p in prompts]})
+        else:
+            content = "One.\nTwo.\nThree."
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+async def run(args, max_batch):
+    completions = FakeCompletions(args.latency_ms / 1000.0, args.per_prompt_ms / 1000.0)
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    batcher = SuggestionBatcher(client, max_batch=max_batch, max_wait=args.window_ms / 1000.0,
+                                slo=args.slo_ms / 1000.0)
+
+    async def one(delay):
+        await asyncio.sleep(delay)
+        started = time.perf_counter()
+
+        async def single():
+            response = await completions.create_async(messages=[{"role": "system", "content": "prompt"}])
+            return response.choices[0].message.content.split("\n")
+
+        await batcher.submit("Suggest three replies.", "English", single)
+        return time.perf_counter() - started
+
+    random.seed(1)
+    delays = [random.uniform(0, args.burst_ms / 1000.0) for _ in range(args.requests)]
+    latencies = sorted(await asyncio.gather(*(one(delay) for delay in delays)))
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    label = "unbatched" if max_batch == 1 else f"batch<={max_batch}"
+    print(f"{label:<11} upstream calls {completions.calls:4d}  requests/call {args.requests / completions.calls:5.1f}  "
+          f"p50 {statistics.median(latencies) * 1000:6.0f}ms  p95 {p95 * 1000:6.0f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--burst-ms", type=float, default=500)
+    parser.add_argument("--latency-ms", type=float, default=800)
+    parser.add_argument("--per-prompt-ms", type=float, default=40)
+    parser.add_argument("--window-ms", type=float, default=25)
+    parser.add_argument("--slo-ms", type=float, default=2500)
+    parser.add_argument("--max-batch", type=int, default=16)
+    args = parser.parse_args()
+
+    asyncio.run(run(args, 1))
+    asyncio.run(run(args, args.max_batch))
+
+
+if __name__ == "__main__":
+    main()
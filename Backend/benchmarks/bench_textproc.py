@@ -0,0 +1,173 @@
+"""
+Microbenchmark and equivalence check for app.textproc.
+
+    python -m benchmarks.bench_textproc [--iterations 20000] [--fuzz 5000]
+
+The reference functions below are the inline implementations textproc
+replaced, kept verbatim. Every textproc function must produce identical output
+on the multilingual corpus and on randomly generated strings; the script exits
+non-zero on the first mismatch and otherwise prints per-call timings.
+"""
+import argparse
+import json
+import random
+import re
+import sys
+import time
+
+from app import textproc
+
+LANGUAGES = ["en", "es", "fr", "de", "it", "zh-CN", "zh-TW", "ja", "ko", "hi"]
+
+CORPUS = [
+    "Hello!! How are you today?? I'm fine... thanks (really) - see you",
+    "\"water\" (noun) - a clear liquid, essential",
+    "¡Hola! ¿Cómo estás? Me llamo Ana — encantada.",
+    "Bonjour !! Comment ça va ? Très bien, merci.",
+    "Guten Tag. Wie geht's?  Mir geht es gut!",
+    "Ciao! Come stai? Bene, grazie.",
+    "水 (mizu) - water",
+    "물 (mul) - water, drink",
+    "练习 (liànxí)",
+    "練習 - practice",
+    "「こんにちは」、元気ですか？ Hello",
+    "नमस्ते! आप कैसे हैं? 😊",
+    "1. I'd like a coffee.\n2. Could I see the menu?\n- What do you recommend?",
+    "*smiles* That's great 🎉🎉 news!!   Really.",
+    "   ",
+    "",
+]
+
+ALPHABET = (
+    "abcXYZ019 .,!?;:-–—_()[]{}\"'`*\n\t　 "
+    "가힣ひらがなカタカナ一龯ぁゖァヾ，。？！；：（）【】🎉😊•◦▪→>"
+    "नमस्ते"
+)
+
+
+def legacy_clean_text(text):
+    text = re.sub(r'([.!?])\1+', r'\1', text)
+    text = text.replace(".", ". ")
+    text = text.replace("!", "! ")
+    text = text.replace("?", "? ")
+    text = re.sub(r'[^\w\s.!?,;:\-\'"\(\)，。？！；：""''（）【】]', '', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text
+
+
+def legacy_clean_generated_text(text, language, content_type):
+    if not text:
+        return text
+    text = text.strip().strip('"\'`""''')
+    text = re.sub(r'\([^)]*\)', '', text).strip()
+    text = re.sub(r'\s*[-–—]\s*.*$', '', text).strip()
+    if content_type == 'word':
+        text = re.sub(r'\s*,\s*.*$', '', text).strip()
+    if language in ['ko', 'ja', 'zh-CN', 'zh-TW']:
+        if content_type == 'word':
+            text = re.sub(r'[a-zA-Z0-9\s\-_.,!?()[\]{}]+', '', text).strip()
+            if language == 'ko':
+                korean_chars = re.findall(r'[가-힣]+', text)
+                if korean_chars:
+                    text = korean_chars[0]
+            elif language == 'ja':
+                japanese_chars = re.findall(r'[ひらがなカタカナ一-龯ぁ-ゖァ-ヾ]+', text)
+                if japanese_chars:
+                    text = japanese_chars[0]
+            elif language in ['zh-CN', 'zh-TW']:
+                chinese_chars = re.findall(r'[一-龯]+', text)
+                if chinese_chars:
+                    text = chinese_chars[0]
+    else:
+        if content_type == 'word':
+            words = text.split()
+            if words:
+                text = words[0]
+                text = re.sub(r'[^\w]', '', text)
+    return text
+
+
+def legacy_split_suggestions(text):
+    suggestions_raw = [s.strip() for s in text.split('\n') if s.strip()]
+    suggestions = []
+    for suggestion in suggestions_raw:
+        cleaned = re.sub(r'^[\d\.\-\*\•\⁃\⦁\◦\▪\□\▫\–\—\⁌\→\>\s]+', '', suggestion).strip()
+        if cleaned:
+            suggestions.append(cleaned)
+    return suggestions[:3]
+
+
+def legacy_tts_spacing(text, language_code):
+    if language_code not in ["zh-TW", "zh-CN", "zh", "ja", "ko", "hi"]:
+        text = re.sub(r'([.!?]) ', r'\1  ', text)
+        text = re.sub(r'([,;:]) ', r'\1 ', text)
+    return text
+
+
+def legacy_clean_spoken_text(text):
+    import emoji
+    text = re.sub(r'\*.*?\*', '', text)
+    text = emoji.replace_emoji(text, replace='')
+    text = ' '.join(text.split())
+    return text
+
+
+def pairs():
+    yield "clean_text", legacy_clean_text, textproc.clean_text, lambda t, lang: (t,)
+    yield "clean_generated_text(word)", legacy_clean_generated_text, textproc.clean_generated_text, \
+        lambda t, lang: (t, lang, "word")
+    yield "clean_generated_text(sentence)", legacy_clean_generated_text, textproc.clean_generated_text, \
+        lambda t, lang: (t, lang, "sentence")
+    yield "split_suggestions", legacy_split_suggestions, textproc.split_suggestions, lambda t, lang: (t,)
+    yield "space_sentences_for_tts", legacy_tts_spacing, textproc.space_sentences_for_tts, lambda t, lang: (t, lang)
+    if textproc.emoji is not None:
+        yield "clean_spoken_text", legacy_clean_spoken_text, textproc.clean_spoken_text, lambda t, lang: (t,)
+
+
+def random_text(rng):
+    return "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 40)))
+
+
+def per_call_us(fn, args, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn(*args)
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--fuzz", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=239)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    samples = CORPUS + [random_text(rng) for _ in range(args.fuzz)]
+
+    report = {}
+    for name, legacy, current, make_args in pairs():
+        for text in samples:
+            for language in LANGUAGES:
+                call_args = make_args(text, language)
+                expected, actual = legacy(*call_args), current(*call_args)
+                if expected != actual:
+                    print(f"MISMATCH in {name} for {call_args!r}: {expected!r} != {actual!r}")
+                    return 1
+
+        timing_args = make_args(CORPUS[0], "ja")
+        legacy_us = per_call_us(legacy, timing_args, args.iterations)
+        current_us = per_call_us(current, timing_args, args.iterations)
+        report[name] = {
+            "legacy_us": round(legacy_us, 2),
+            "textproc_us": round(current_us, 2),
+            "speedup": round(legacy_us / current_us, 2) if current_us else None,
+        }
+
+    print(json.dumps(report, indent=2))
+    print(f"All outputs identical over {len(samples)} samples x {len(LANGUAGES)} languages")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
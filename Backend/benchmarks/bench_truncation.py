@@ -0,0 +1,65 @@
+"""
+Regression benchmark for the local truncation fallback in /api/chat.
+
+    python -m benchmarks.bench_truncation [--iterations 20000] [--budget-us 100]
+
+Replaces what used to be a second gpt-3.5-turbo round trip, so it must stay
+in the microsecond range. Every trimmed reply must end on a sentence boundary.
+"""
+import argparse
+import json
+import sys
+import time
+
+from app.textproc import SENTENCE_ENDINGS, trim_to_last_sentence
+
+TRUNCATED_REPLIES = {
+    "en": "That sounds like a wonderful trip. Did you get a chance to visit the old town and try some of the",
+    "es": "¡Qué buena idea! Me encanta la comida mexicana. ¿Has probado alguna vez los tacos al pastor en",
+    "fr": "Bonjour ! Je suis ravi de vous aider aujourd'hui. Que souhaitez-vous commander pour le",
+    "de": "Das klingt sehr interessant. Ich war letztes Jahr auch in Berlin und habe viele",
+    "it": "Certo, posso aiutarti. Il ristorante è aperto fino a mezzanotte e il menu del giorno include",
+    "zh-CN": "好的，我明白了。请问您想点什么菜？我们今天的特色菜是",
+    "zh-TW": "好的，我明白了。請問您想點什麼菜？我們今天的特色菜是",
+    "ja": "いらっしゃいませ。ご注文はお決まりですか？本日のおすすめは",
+    "ko": "안녕하세요! 주문하시겠어요? 오늘의 추천 메뉴는",
+    "hi": "नमस्ते! आपका स्वागत है। आज हमारे पास कई स्वादिष्ट",
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--budget-us", type=float, default=100.0)
+    args = parser.parse_args()
+
+    results = {}
+    failures = []
+    for language, reply in TRUNCATED_REPLIES.items():
+        trimmed = trim_to_last_sentence(reply, language)
+        if not trimmed.endswith(SENTENCE_ENDINGS):
+            failures.append(language)
+
+        samples = []
+        for _ in range(args.iterations):
+            started = time.perf_counter_ns()
+            trim_to_last_sentence(reply, language)
+            samples.append(time.perf_counter_ns() - started)
+        samples.sort()
+        results[language] = {
+            "p50_us": round(samples[len(samples) // 2] / 1000, 2),
+            "p99_us": round(samples[int(len(samples) * 0.99)] / 1000, 2),
+            "trimmed": trimmed,
+        }
+
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+    slow = [language for language, r in results.items() if r["p99_us"] > args.budget_us]
+    if failures:
+        print(f"FAIL: replies not ending on a sentence boundary: {failures}")
+    if slow:
+        print(f"FAIL: p99 above {args.budget_us}us for {slow}")
+    return 1 if failures or slow else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""
+Throughput of the production launcher as the worker count grows.
+
+    python -m benchmarks.bench_workers [--workers 1 2 4] [--duration 10] [--concurrency 32]
+
+For each worker count this starts `server.py` against the local fake OpenAI
+server, drives /api/translate (one upstream call, no database access) and
+/healthz from a thread pool, then sends SIGTERM and times the drain. MongoDB
+is not needed: the URI points at a closed port with a short selection timeout.
+"""
+import argparse
+import http.client
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fake_openai import FakeOpenAIServer, FaultConfig
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(port, timeout=90):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/healthz")
+            if conn.getresponse().status == 200:
+                return True
+        except OSError:
+            pass
+        time.sleep(0.2)
+    return False
+
+
+def drive(port, path, duration, concurrency):
+    stop_at = time.monotonic() + duration
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def worker(worker_id):
+        nonlocal errors
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        i = 0
+        while time.monotonic() < stop_at:
+            i += 1
+            started = time.perf_counter()
+            try:
+                if path == "/healthz":
+                    conn.request("GET", path)
+                else:
+                    body = json.dumps({"text": f"Hello number {worker_id}-{i}", "source": "en", "target": "en"})
+                    conn.request("POST", path, body=body, headers={"Content-Type": "application/json"})
+                response = conn.getresponse()
+                response.read()
+                ok = response.status == 200
+            except (OSError, http.client.HTTPException):
+                ok = False
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+            elapsed = time.perf_counter() - started
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors += 1
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+
+    latencies.sort()
+    count = len(latencies)
+    return {
+        "requests_per_second": round(count / duration, 1),
+        "errors": errors,
+        "p50_ms": round(latencies[count // 2] * 1000, 1) if count else None,
+        "p99_ms": round(latencies[min(count - 1, int(count * 0.99))] * 1000, 1) if count else None,
+    }
+
+
+def run(workers, args, upstream):
+    port = free_port()
+    env = dict(
+        os.environ,
+        OPENAI_API_KEY="fake",
+        OPENAI_BASE_URL=upstream.base_url,
+        MONGODB_URI="mongodb://127.0.0.1:9/?serverSelectionTimeoutMS=200",
+        WEB_CONCURRENCY=str(workers),
+    )
+    process = subprocess.Popen(
+        [sys.executable, "server.py", "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers)],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        if not wait_until_up(port):
+            return {"workers": workers, "error": "server did not come up"}
+        drive(port, "/healthz", 1, 4)
+        result = {
+            "workers": workers,
+            "translate": drive(port, "/api/translate", args.duration, args.concurrency),
+            "healthz": drive(port, "/healthz", args.duration, args.concurrency),
+        }
+        started = time.monotonic()
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=60)
+        result["drain_seconds"] = round(time.monotonic() - started, 2)
+        return result
+    finally:
+        if process.poll() is None:
+            process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--upstream-latency-ms", type=int, default=50)
+    args = parser.parse_args()
+
+    upstream = FakeOpenAIServer(config=FaultConfig(latency_ms=args.upstream_latency_ms)).start()
+    try:
+        results = [run(workers, args, upstream) for workers in args.workers]
+    finally:
+        upstream.stop()
+
+    print(json.dumps(results, indent=2))
+    baseline = results[0].get("healthz", {}).get("requests_per_second")
+    for result in results[1:]:
+        rps = result.get("healthz", {}).get("requests_per_second")
+        if baseline and rps:
+            print(f"{result['workers']} workers: {rps / baseline:.2f}x /healthz throughput of {results[0]['workers']}")
+    return 0 if all("error" not in result for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
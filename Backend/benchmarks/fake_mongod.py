@@ -0,0 +1,336 @@
+"""
+Minimal MongoDB wire-protocol server backed by mongomock.
+
+A real pymongo MongoClient connects to it over TCP, so command monitoring
+(app.mongo_tracer's CommandListener) sees exactly the round trips the app
+makes, without a mongod binary. It speaks OP_MSG plus the legacy OP_QUERY
+handshake, reports itself as a standalone server without sessions, and
+implements the commands the backend issues: find, insert, update, delete,
+findAndModify, aggregate, count, distinct and index management. Every
+cursor is returned in its first batch.
+
+Run standalone:
+    python -m benchmarks.fake_mongod --port 27018
+
+then point the backend at it with MONGODB_URI=mongodb://127.0.0.1:27018/.
+"""
+import argparse
+import socketserver
+import struct
+import threading
+
+import bson
+from bson.codec_options import CodecOptions
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from pymongo import ReturnDocument
+
+OP_REPLY = 1
+OP_QUERY = 2004
+OP_MSG = 2013
+HEADER = struct.Struct("<iiii")
+CODEC_OPTIONS = CodecOptions(tz_aware=False)
+
+HELLO = {
+    "ismaster": True,
+    "isWritablePrimary": True,
+    "helloOk": True,
+    "maxBsonObjectSize": 16 * 1024 * 1024,
+    "maxMessageSizeBytes": 48000000,
+    "maxWriteBatchSize": 100000,
+    "minWireVersion": 0,
+    "maxWireVersion": 21,
+    "readOnly": False,
+    "ok": 1.0,
+}
+
+
+def _error(error):
+    details = getattr(error, "details", None) or {}
+    return {"ok": 0.0, "errmsg": details.get("errmsg", str(error)),
+            "code": getattr(error, "code", None) or 8000}
+
+
+def _is_update_document(update):
+    return isinstance(update, list) or any(key.startswith("$") for key in update)
+
+
+class FakeMongoServer:
+    """Threaded TCP server executing MongoDB commands against a mongomock client."""
+
+    def __init__(self, host="127.0.0.1", port=0, client=None):
+        if client is None:
+            import mongomock
+            client = mongomock.MongoClient()
+        self.client = client
+        self.commands = 0
+        # mongomock is not thread-safe; commands run one at a time
+        self._lock = threading.Lock()
+        self._server = socketserver.ThreadingTCPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def uri(self):
+        host, port = self._server.server_address[:2]
+        return f"mongodb://{host}:{port}/?directConnection=true"
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                while True:
+                    header = self._read(HEADER.size)
+                    if header is None:
+                        return
+                    length, request_id, _, op_code = HEADER.unpack(header)
+                    body = self._read(length - HEADER.size)
+                    if body is None:
+                        return
+                    if op_code == OP_MSG:
+                        reply = server.execute(self._parse_msg(body))
+                        payload = struct.pack("<I", 0) + b"\x00" + bson.encode(reply)
+                        self._send(request_id, OP_MSG, payload)
+                    elif op_code == OP_QUERY:
+                        reply = server.execute(self._parse_query(body))
+                        payload = struct.pack("<iqii", 0, 0, 0, 1) + bson.encode(reply)
+                        self._send(request_id, OP_REPLY, payload)
+                    else:
+                        return
+
+            def _read(self, size):
+                data = b""
+                while len(data) < size:
+                    chunk = self.request.recv(size - len(data))
+                    if not chunk:
+                        return None
+                    data += chunk
+                return data
+
+            def _send(self, response_to, op_code, payload):
+                self.request.sendall(HEADER.pack(HEADER.size + len(payload), 0, response_to, op_code) + payload)
+
+            @staticmethod
+            def _parse_msg(body):
+                flags, = struct.unpack_from("<I", body)
+                end = len(body) - (4 if flags & 1 else 0)
+                position = 4
+                command = None
+                while position < end:
+                    kind = body[position]
+                    position += 1
+                    size, = struct.unpack_from("<i", body, position)
+                    if kind == 0:
+                        command = bson.decode(body[position:position + size], CODEC_OPTIONS)
+                    else:
+                        section = body[position + 4:position + size]
+                        identifier, _, documents = section.partition(b"\x00")
+                        command[identifier.decode()] = bson.decode_all(documents, CODEC_OPTIONS)
+                    position += size
+                return command
+
+            @staticmethod
+            def _parse_query(body):
+                name_end = body.index(b"\x00", 4)
+                position = name_end + 1 + 8
+                size, = struct.unpack_from("<i", body, position)
+                return bson.decode(body[position:position + size], CODEC_OPTIONS)
+
+        return Handler
+
+    def execute(self, command):
+        name = next(iter(command))
+        handler = getattr(self, f"_cmd_{name.lower()}", None)
+        if handler is None:
+            return {"ok": 0.0, "errmsg": f"no such command: '{name}'", "code": 59}
+        with self._lock:
+            self.commands += 1
+            database = self.client[command.get("$db", "admin")]
+            try:
+                reply = handler(database, command, command[name])
+            except OperationFailure as e:
+                return _error(e)
+        reply.setdefault("ok", 1.0)
+        return reply
+
+    # Handshake and server status
+    def _cmd_ismaster(self, database, command, value):
+        return dict(HELLO)
+
+    _cmd_hello = _cmd_ismaster
+
+    def _cmd_ping(self, database, command, value):
+        return {}
+
+    def _cmd_buildinfo(self, database, command, value):
+        return {"version": "7.0.0", "versionArray": [7, 0, 0, 0]}
+
+    def _cmd_endsessions(self, database, command, value):
+        return {}
+
+    def _cmd_killcursors(self, database, command, value):
+        return {"cursorsKilled": command.get("cursors", [])}
+
+    # Reads
+    def _cursor(self, database, collection, documents):
+        return {"cursor": {"id": bson.int64.Int64(0), "ns": f"{database.name}.{collection}",
+                           "firstBatch": list(documents)}}
+
+    def _cmd_find(self, database, command, collection):
+        cursor = database[collection].find(command.get("filter") or {}, command.get("projection"))
+        if command.get("sort"):
+            cursor = cursor.sort(list(command["sort"].items()))
+        if command.get("skip"):
+            cursor = cursor.skip(command["skip"])
+        if command.get("limit"):
+            cursor = cursor.limit(abs(command["limit"]))
+        return self._cursor(database, collection, cursor)
+
+    def _cmd_aggregate(self, database, command, collection):
+        return self._cursor(database, collection, database[collection].aggregate(command.get("pipeline", [])))
+
+    def _cmd_count(self, database, command, collection):
+        options = {key: command[key] for key in ("skip", "limit") if command.get(key)}
+        return {"n": database[collection].count_documents(command.get("query") or {}, **options)}
+
+    def _cmd_distinct(self, database, command, collection):
+        return {"values": database[collection].distinct(command["key"], command.get("query") or {})}
+
+    def _cmd_listindexes(self, database, command, collection):
+        indexes = [{"name": name, **info} for name, info in database[collection].index_information().items()]
+        for index in indexes:
+            index["key"] = dict(index["key"])
+        return self._cursor(database, collection, indexes)
+
+    def _cmd_listcollections(self, database, command, value):
+        names = database.list_collection_names()
+        return self._cursor(database, "$cmd.listCollections", [{"name": name, "type": "collection"} for name in names])
+
+    # Writes
+    def _cmd_insert(self, database, command, collection):
+        written, errors = 0, []
+        for index, document in enumerate(command.get("documents", [])):
+            try:
+                database[collection].insert_one(document)
+                written += 1
+            except DuplicateKeyError as e:
+                errors.append({"index": index, "code": 11000, "errmsg": str(e)})
+                if command.get("ordered", True):
+                    break
+        return {"n": written, **({"writeErrors": errors} if errors else {})}
+
+    def _cmd_update(self, database, command, collection):
+        matched, modified, upserted, errors = 0, 0, [], []
+        for index, update in enumerate(command.get("updates", [])):
+            target = database[collection]
+            options = {"upsert": update.get("upsert", False)}
+            if update.get("arrayFilters"):
+                options["array_filters"] = update["arrayFilters"]
+            try:
+                if not _is_update_document(update["u"]):
+                    result = target.replace_one(update["q"], update["u"], upsert=options["upsert"])
+                elif update.get("multi"):
+                    result = target.update_many(update["q"], update["u"], **options)
+                else:
+                    result = target.update_one(update["q"], update["u"], **options)
+            except DuplicateKeyError as e:
+                errors.append({"index": index, "code": 11000, "errmsg": str(e)})
+                if command.get("ordered", True):
+                    break
+                continue
+            if result.upserted_id is not None:
+                upserted.append({"index": index, "_id": result.upserted_id})
+                matched += 1
+            else:
+                matched += result.matched_count
+                modified += result.modified_count
+        reply = {"n": matched, "nModified": modified}
+        if upserted:
+            reply["upserted"] = upserted
+        if errors:
+            reply["writeErrors"] = errors
+        return reply
+
+    def _cmd_delete(self, database, command, collection):
+        deleted = 0
+        for delete in command.get("deletes", []):
+            if delete.get("limit") == 1:
+                deleted += database[collection].delete_one(delete["q"]).deleted_count
+            else:
+                deleted += database[collection].delete_many(delete["q"]).deleted_count
+        return {"n": deleted}
+
+    def _cmd_findandmodify(self, database, command, collection):
+        target = database[collection]
+        query = command.get("query") or {}
+        options = {"projection": command.get("fields"),
+                   "sort": list(command["sort"].items()) if command.get("sort") else None}
+        if command.get("remove"):
+            value = target.find_one_and_delete(query, **options)
+            return {"value": value, "lastErrorObject": {"n": int(value is not None)}}
+        update = command["update"]
+        options.update(upsert=command.get("upsert", False),
+                       return_document=ReturnDocument.AFTER if command.get("new") else ReturnDocument.BEFORE)
+        existed = target.count_documents(query, limit=1) > 0
+        try:
+            if _is_update_document(update):
+                value = target.find_one_and_update(query, update, **options)
+            else:
+                value = target.find_one_and_replace(query, update, **options)
+        except DuplicateKeyError as e:
+            return {"ok": 0.0, "errmsg": str(e), "code": 11000}
+        last_error = {"n": int(existed or options["upsert"]), "updatedExisting": existed}
+        if not existed and options["upsert"] and value is not None:
+            last_error["upserted"] = value.get("_id")
+        return {"value": value, "lastErrorObject": last_error}
+
+    # Indexes and collections
+    def _cmd_createindexes(self, database, command, collection):
+        for index in command.get("indexes", []):
+            # mongomock treats any "unique" option as unique=True
+            options = {key: value for key, value in index.items()
+                       if key not in ("key", "v") and not (key == "unique" and not value)}
+            database[collection].create_index(list(index["key"].items()), **options)
+        return {}
+
+    def _cmd_dropindexes(self, database, command, collection):
+        if command.get("index") == "*":
+            database[collection].drop_indexes()
+        else:
+            database[collection].drop_index(command["index"])
+        return {}
+
+    def _cmd_drop(self, database, command, collection):
+        database.drop_collection(collection)
+        return {}
+
+    def _cmd_dropdatabase(self, database, command, value):
+        self.client.drop_database(database.name)
+        return {}
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-mongod", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=27018)
+    args = parser.parse_args()
+
+    server = FakeMongoServer(args.host, args.port)
+    print(f"Fake MongoDB server listening on {server.uri}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Local OpenAI-compatible chat completions server with injectable faults.
+
+Run standalone:
+    python -m benchmarks.fake_openai --port 8100 --latency-ms 200 --error-rate 0.1
+
+then point the backend at it with OPENAI_BASE_URL=http://127.0.0.1:8100/v1.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = "That sounds great. Let's keep practicing together.\nCould you tell me a bit more?\nI am happy to help you."
+
+
+class FaultConfig:
+    def __init__(self, latency_ms=0, tokens_per_second=0, error_rate=0.0,
+                 error_statuses=(429, 500, 503), retry_after=None, fail_first=0, reply=DEFAULT_REPLY):
+        self.latency_ms = latency_ms
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.retry_after = retry_after
+        self.fail_first = fail_first
+        self.reply = reply
+
+
+class FakeOpenAIServer:
+    """Threaded HTTP server answering POST /v1/chat/completions."""
+
+    def __init__(self, host="127.0.0.1", port=0, config=None):
+        self.config = config or FaultConfig()
+        self.requests = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _next_request(self):
+        with self._lock:
+            self.requests += 1
+            return self.requests
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status, body, headers=None):
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                config = server.config
+                number = server._next_request()
+
+                if config.latency_ms:
+                    time.sleep(config.latency_ms / 1000.0)
+
+                if number <= config.fail_first or random.random() < config.error_rate:
+                    with server._lock:
+                        server.failures += 1
+                    status = random.choice(config.error_statuses)
+                    headers = {"retry-after": str(config.retry_after)} if status == 429 and config.retry_after else None
+                    self._send_json(status, {"error": {"message": "injected fault", "type": "server_error"}}, headers)
+                    return
+
+                reply = config.reply
+                prompt_tokens = sum(len(str(m.get("content", ""))) for m in request.get("messages", [])) // 4
+                completion_tokens = min(len(reply) // 4, int(request.get("max_tokens") or 256))
+                if config.tokens_per_second:
+                    time.sleep(completion_tokens / float(config.tokens_per_second))
+
+                self._send_json(200, {
+                    "id": f"chatcmpl-{uuid.uuid4().hex}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": request.get("model", "gpt-3.5-turbo"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": reply},
+                        "finish_reason": "stop"
+                    }],
+                    "usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": completion_tokens,
+                        "total_tokens": prompt_tokens + completion_tokens
+                    }
+                })
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-openai", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=int, default=0)
+    parser.add_argument("--tokens-per-second", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=None)
+    args = parser.parse_args()
+
+    server = FakeOpenAIServer(args.host, args.port, FaultConfig(
+        latency_ms=args.latency_ms,
+        tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate,
+        retry_after=args.retry_after,
+    ))
+    print(f"Fake OpenAI server listening on {server.base_url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
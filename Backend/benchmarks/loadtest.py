@@ -0,0 +1,360 @@
+"""
+End-to-end load test of the API with realistic user journeys.
+
+    python -m benchmarks.loadtest [--users 20] [--duration 60] [--mongo mongomock]
+                                  [--llm-latency-ms 300] [--llm-tokens-per-second 80]
+                                  [--tts-latency-ms 150] [--output results.json]
+                                  [--compare benchmarks/results/loadtest-<sha>.json]
+
+Starts the local fake OpenAI server and `benchmarks.loadtest_app` (the real
+app.main:app with stubbed TTS and per-route Mongo op counting), then runs
+--users virtual users for --duration seconds. Each user repeatedly picks a
+journey:
+
+    practice    open profile, several chat turns, suggestions, save the batch
+    roleplay    chat turns inside a scenario (scenario_conversations/messages)
+    lessons     profile plus lesson critique of the saved history
+    drill       practice sentence (TTS), pronunciation scores, generate_audio
+
+Requests in the first --warmup seconds are not recorded; that also covers
+the startup scenario-cache warm-up, which talks to the same fake server.
+The report gives throughput, p50/p95/p99 and errors per endpoint plus Mongo
+ops per request, and is written as JSON (default
+benchmarks/results/loadtest-<git sha>.json).
+The run exits non-zero when a route averages more Mongo round trips per
+request than its app.mongo_tracer.OPERATION_BUDGETS entry, or, with
+--compare, when an endpoint's p95 grew by more than --max-regression percent
+over the baseline.
+
+Use --mongo mongomock (pip install mongomock) when no mongod is available;
+otherwise MONGODB_URI is used with a throwaway database.
+"""
+import argparse
+import base64
+import http.client
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from app.mongo_tracer import budget_violations
+from benchmarks.fake_openai import FakeOpenAIServer, FaultConfig
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+
+JOURNEY_WEIGHTS = {"practice": 5, "roleplay": 2, "lessons": 1, "drill": 2}
+PHRASES = [
+    "I went to the market yesterday and bought some apples.",
+    "Can you recommend a good book to read this summer?",
+    "My favourite hobby is cooking dishes from other countries.",
+    "What is the best way to improve my listening skills?",
+    "I would like to order a coffee and a croissant, please.",
+]
+SCENARIOS = ["Ordering food at a restaurant", "Checking in at a hotel", "Asking for directions"]
+SILENT_AUDIO = base64.b64encode(b"\x00" * 256).decode("ascii")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short=12", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.recording = False
+        self._lock = threading.Lock()
+
+    def add(self, endpoint, seconds, ok):
+        if not self.recording:
+            return
+        with self._lock:
+            if ok:
+                self.latencies[endpoint].append(seconds)
+            else:
+                self.errors[endpoint] += 1
+
+
+class VirtualUser:
+    def __init__(self, port, recorder, user_id):
+        self.port = port
+        self.recorder = recorder
+        self.username = f"loadtest-{user_id}-{uuid.uuid4().hex[:6]}"
+        self.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+
+    def call(self, method, endpoint, body=None, query=""):
+        path = endpoint + query
+        payload = json.dumps(body).encode("utf-8") if body is not None else None
+        headers = {"Content-Type": "application/json"} if payload is not None else {}
+        started = time.perf_counter()
+        try:
+            self.conn.request(method, path, body=payload, headers=headers)
+            response = self.conn.getresponse()
+            data = response.read()
+            ok = response.status < 400
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            self.conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=60)
+            data, ok = b"", False
+        self.recorder.add(f"{method} {endpoint}", time.perf_counter() - started, ok)
+        try:
+            return json.loads(data) if ok and data else None
+        except ValueError:
+            return None
+
+    def chat(self, message, scenario=None, conversation_id=None):
+        return self.call("POST", "/api/chat", {
+            "username": self.username,
+            "message": message,
+            "scenario": scenario or "Language Practice",
+            "language": "en",
+            "response_locale": "en",
+            "conversation_id": conversation_id,
+        })
+
+    def practice(self):
+        self.call("GET", "/api/user_profile", query=f"?username={self.username}")
+        conversation_id = str(uuid.uuid4())
+        turns = []
+        for _ in range(random.randint(2, 4)):
+            message = random.choice(PHRASES)
+            reply = self.chat(message, conversation_id=conversation_id) or {}
+            turns.append({"sender": "user", "text": message})
+            turns.append({"sender": "ai", "text": reply.get("response", "")})
+        self.call("POST", "/api/get_suggestions", {"username": self.username, "language": "en"})
+        self.call("POST", "/api/save_conversation", {
+            "username": self.username,
+            "conversation": turns,
+            "batch_id": f"batch-{uuid.uuid4().hex[:12]}",
+        })
+
+    def roleplay(self):
+        scenario = random.choice(SCENARIOS)
+        for _ in range(random.randint(2, 3)):
+            self.chat(random.choice(PHRASES), scenario=scenario)
+
+    def lessons(self):
+        self.call("GET", "/api/user_profile", query=f"?username={self.username}")
+        self.call("POST", "/api/get_lessons", {"username": self.username, "language": "en"})
+
+    def drill(self):
+        difficulty = random.choice(["easy", "medium", "hard"])
+        sentence = self.call("POST", "/api/generate_practice_sentence", {
+            "language": "en", "difficulty": difficulty, "username": self.username,
+        }) or {}
+        reference = sentence.get("text") or "Hello, how are you?"
+        for _ in range(2):
+            self.call("POST", "/api/score_pronunciation", {
+                "audio_data": SILENT_AUDIO, "reference_text": reference, "language": "en",
+            })
+        self.call("POST", "/api/generate_audio", {"text": reference, "language": "en"})
+
+    def run_until(self, stop_at):
+        self.call("POST", "/api/init_user_profile", {"username": self.username})
+        journeys = list(JOURNEY_WEIGHTS)
+        weights = list(JOURNEY_WEIGHTS.values())
+        while time.monotonic() < stop_at:
+            getattr(self, random.choices(journeys, weights)[0])()
+        self.conn.close()
+
+
+def get_json(port, path):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    try:
+        conn.request("GET", path)
+        response = conn.getresponse()
+        return response.status, json.loads(response.read() or b"null")
+    finally:
+        conn.close()
+
+
+def wait_until_up(port, process, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            return False
+        try:
+            if get_json(port, "/healthz")[0] == 200:
+                return True
+        except (OSError, ValueError, http.client.HTTPException):
+            pass
+        time.sleep(0.5)
+    return False
+
+
+def summarize(recorder, measured_seconds, mongo_stats):
+    endpoints = {}
+    for endpoint in sorted(set(recorder.latencies) | set(recorder.errors)):
+        values = sorted(recorder.latencies.get(endpoint, []))
+        route = endpoint.split(" ", 1)[1]
+        route_stats = mongo_stats.get(route, {})
+        requests = route_stats.get("requests") or 0
+        endpoints[endpoint] = {
+            "requests": len(values),
+            "errors": recorder.errors.get(endpoint, 0),
+            "throughput_rps": round(len(values) / measured_seconds, 2),
+            "p50_ms": round(percentile(values, 0.50) * 1000, 1) if values else None,
+            "p95_ms": round(percentile(values, 0.95) * 1000, 1) if values else None,
+            "p99_ms": round(percentile(values, 0.99) * 1000, 1) if values else None,
+            "mongo_ops_per_request": round(route_stats.get("mongo_ops", 0) / requests, 2) if requests else None,
+            "mongo_docs_per_request": round(route_stats.get("docs", 0) / requests, 2) if requests else None,
+        }
+    total = sum(entry["requests"] for entry in endpoints.values())
+    return {
+        "total_requests": total,
+        "total_errors": sum(entry["errors"] for entry in endpoints.values()),
+        "throughput_rps": round(total / measured_seconds, 2),
+        "endpoints": endpoints,
+    }
+
+
+def compare(result, baseline_path, max_regression):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    regressions = []
+    print(f"\nComparison with {baseline.get('revision')} ({baseline_path})")
+    for endpoint, current in result["summary"]["endpoints"].items():
+        previous = baseline.get("summary", {}).get("endpoints", {}).get(endpoint)
+        if not previous or not previous.get("p95_ms") or current["p95_ms"] is None:
+            continue
+        change = (current["p95_ms"] - previous["p95_ms"]) / previous["p95_ms"] * 100
+        flag = "  REGRESSION" if change > max_regression else ""
+        print(f"  {endpoint:<42} p95 {previous['p95_ms']:8.1f} -> {current['p95_ms']:8.1f} ms ({change:+.1f}%){flag}")
+        if flag:
+            regressions.append(endpoint)
+    return regressions
+
+
+def print_report(summary):
+    print(f"\n{'endpoint':<42} {'req':>6} {'err':>4} {'rps':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'mongo/req':>9}")
+    for endpoint, entry in summary["endpoints"].items():
+        cells = [entry[key] if entry[key] is not None else "-" for key in ("p50_ms", "p95_ms", "p99_ms", "mongo_ops_per_request")]
+        print(f"{endpoint:<42} {entry['requests']:>6} {entry['errors']:>4} {entry['throughput_rps']:>7} "
+              f"{cells[0]:>8} {cells[1]:>8} {cells[2]:>8} {cells[3]:>9}")
+    print(f"\nTotal: {summary['total_requests']} requests, {summary['total_errors']} errors, "
+          f"{summary['throughput_rps']} req/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=60)
+    parser.add_argument("--warmup", type=float, default=10)
+    parser.add_argument("--mongo", choices=["mongomock", "uri"], default="uri")
+    parser.add_argument("--llm-latency-ms", type=int, default=300)
+    parser.add_argument("--llm-tokens-per-second", type=float, default=0)
+    parser.add_argument("--tts-latency-ms", type=float, default=150)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output")
+    parser.add_argument("--compare")
+    parser.add_argument("--max-regression", type=float, default=20.0, help="allowed p95 growth in percent")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    revision = git_revision()
+    port = free_port()
+    upstream = FakeOpenAIServer(config=FaultConfig(
+        latency_ms=args.llm_latency_ms, tokens_per_second=args.llm_tokens_per_second,
+    )).start()
+    env = dict(
+        os.environ,
+        OPENAI_API_KEY="fake",
+        OPENAI_BASE_URL=upstream.base_url,
+        MONGODB_DB=f"loadtest_{uuid.uuid4().hex[:8]}",
+        LOG_LEVEL="WARNING",
+    )
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.loadtest_app", "--port", str(port),
+         "--mongo", args.mongo, "--tts-latency-ms", str(args.tts_latency_ms)],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL,
+    )
+    recorder = Recorder()
+    try:
+        if not wait_until_up(port, process):
+            print("Backend did not start", file=sys.stderr)
+            return 1
+
+        stop_at = time.monotonic() + args.warmup + args.duration
+        users = [VirtualUser(port, recorder, i) for i in range(args.users)]
+        baseline_stats = {}
+
+        def start_recording():
+            nonlocal baseline_stats
+            time.sleep(args.warmup)
+            baseline_stats = get_json(port, "/__loadtest/stats")[1] or {}
+            recorder.recording = True
+
+        timer = threading.Thread(target=start_recording, daemon=True)
+        timer.start()
+        with ThreadPoolExecutor(max_workers=args.users) as pool:
+            list(pool.map(lambda user: user.run_until(stop_at), users))
+        timer.join()
+        recorder.recording = False
+
+        final_stats = get_json(port, "/__loadtest/stats")[1] or {}
+        mongo_stats = {
+            route: {key: value - baseline_stats.get(route, {}).get(key, 0) for key, value in entry.items()}
+            for route, entry in final_stats.items()
+        }
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        upstream.stop()
+
+    result = {
+        "revision": revision,
+        "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "summary": summarize(recorder, args.duration, mongo_stats),
+        "mongo_ops_by_route": mongo_stats,
+        "mongo_budget_violations": budget_violations(mongo_stats),
+        "upstream_requests": upstream.requests,
+    }
+    print_report(result["summary"])
+
+    output = args.output or os.path.join(RESULTS_DIR, f"loadtest-{revision}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"Saved {output}")
+
+    failed = not result["summary"]["total_requests"]
+    for route, (average, budget) in result["mongo_budget_violations"].items():
+        print(f"MONGO BUDGET: {route} averaged {average} round trips per request (budget {budget})")
+        failed = True
+    if args.compare and compare(result, args.compare, args.max_regression):
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""
+app.main:app as served by the load test (`benchmarks.loadtest` starts this).
+
+    python -m benchmarks.loadtest_app --port 8001 [--mongo mongomock] [--tts-latency-ms 150]
+
+Differences from production, all applied before the app builds anything:
+- gTTS is replaced by a stub that sleeps for --tts-latency-ms and writes a
+  few bytes, so runs do not depend on Google's endpoint.
+- with --mongo mongomock, MongoDBManager gets an in-memory client whose
+  collection methods report to app.mongo_tracer (mongomock does not emit
+  pymongo command events).
+- GET /__loadtest/stats returns app.mongo_tracer.route_totals().
+"""
+import argparse
+import json
+import threading
+import time
+
+MONGO_OPERATIONS = (
+    "find", "find_one", "insert_one", "insert_many", "update_one", "update_many", "replace_one",
+    "delete_one", "delete_many", "count_documents", "aggregate", "distinct", "bulk_write",
+    "find_one_and_update", "find_one_and_delete", "create_index",
+)
+
+
+def install_mongomock():
+    import mongomock
+    from mongomock.collection import Collection
+
+    import database.mongodb_manager as mongodb_manager
+    from app import mongo_tracer
+
+    # mongomock implements some operations with others (find_one calls find);
+    # only the outermost call is a round trip
+    nesting = threading.local()
+
+    for name in MONGO_OPERATIONS:
+        original = getattr(Collection, name, None)
+        if original is None:
+            continue
+
+        def counted(self, *args, _original=original, _name=name, **kwargs):
+            depth = getattr(nesting, "depth", 0)
+            nesting.depth = depth + 1
+            started = time.perf_counter()
+            try:
+                return _original(self, *args, **kwargs)
+            finally:
+                nesting.depth = depth
+                if depth == 0:
+                    mongo_tracer.record(_name, seconds=time.perf_counter() - started)
+
+        setattr(Collection, name, counted)
+
+    shared = mongomock.MongoClient()
+    mongodb_manager.MongoClient = lambda *args, **kwargs: shared
+
+
+class SilentTTS:
+    latency = 0.0
+
+    def __init__(self, text, lang="en", tld="com", slow=False, **kwargs):
+        self.text = text
+
+    def save(self, path):
+        if self.latency:
+            time.sleep(self.latency)
+        with open(path, "wb") as f:
+            f.write(b"ID3\x03\x00\x00\x00\x00\x00\x00")
+
+
+class StatsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] == "/__loadtest/stats":
+            from app import mongo_tracer
+            body = json.dumps(mongo_tracer.route_totals()).encode("utf-8")
+            await send({"type": "http.response.start", "status": 200,
+                        "headers": [(b"content-type", b"application/json")]})
+            await send({"type": "http.response.body", "body": body})
+            return
+        await self.app(scope, receive, send)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--mongo", default="uri", help="'mongomock', or 'uri' to use MONGODB_URI")
+    parser.add_argument("--tts-latency-ms", type=float, default=0)
+    args = parser.parse_args()
+
+    if args.mongo == "mongomock":
+        install_mongomock()
+
+    import uvicorn
+
+    import app.main
+
+    SilentTTS.latency = args.tts_latency_ms / 1000.0
+    app.main.gTTS = SilentTTS
+    uvicorn.run(StatsMiddleware(app.main.app), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -23,15 +23,15 @@ def init_mongodb():
             db.chat_messages.create_index([("user_id", 1), ("timestamp", 1)])
             logger.info("MongoDB indexes created successfully")
         except Exception as e:
-            logger.warning(f"Error creating MongoDB indexes: {e}")
+            logger.warning("Error creating MongoDB indexes: %s", e)
         
         # Verify connection
         client.admin.command('ping')
-        logger.info(f"MongoDB initialized successfully: {mongo_uri}, db: {db_name}")
+        logger.info("MongoDB initialized successfully: %s, db: %s", mongo_uri, db_name)
         
         return db
     except Exception as e:
-        logger.error(f"Failed to initialize MongoDB: {e}")
+        logger.error("Failed to initialize MongoDB: %s", e)
         raise
 
 if __name__ == "__main__":
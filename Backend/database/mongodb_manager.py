@@ -1,15 +1,65 @@
 import os
 import json
-from datetime import datetime
+import hashlib
+from datetime import datetime, timedelta
 from pymongo import MongoClient
+from pymongo.errors import OperationFailure
 from dotenv import load_dotenv
 from bson import ObjectId
 from datetime import datetime
 import uuid
-import traceback
+import logging
+import time
+
+from app import metrics
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+HISTORY_SIZE_BUCKETS = (10, 50, 100, 250, 500, 1000, 2500, 5000)
+# chat_messages _ids are generated by each app worker before the insert, so
+# they do not arrive in _id order (clock skew, per-process ordering within a
+# second, slow inserts). A history delta re-reads this much before its cursor.
+HISTORY_CURSOR_OVERLAP = timedelta(seconds=int(os.getenv("HISTORY_CURSOR_OVERLAP_SECONDS", "120")))
+# Set SCENARIO_SAVE_TRANSACTIONS=1 on a replica set to save a scenario conversation atomically
+SCENARIO_SAVE_TRANSACTIONS = os.getenv("SCENARIO_SAVE_TRANSACTIONS") == "1"
+
+
+def history_epoch(profile):
+    """
+    Token for the current generation of a user's chat history. It changes when
+    messages are deleted (history_version is bumped) or the user is recreated
+    (new created_at), and a delta cursor from another epoch is not honoured.
+    """
+    seed = f"{profile.get('created_at')}:{profile.get('history_version', 0)}"
+    return hashlib.sha1(seed.encode("utf-8")).hexdigest()[:8]
+
+
+def create_scenario_indexes(db):
+    """
+    user_scenarios indexes. Duplicate checks are a point lookup on the unique
+    (username, title_key) index; the partial filter leaves documents that have
+    not been backfilled yet out of it. The text index is prefixed by username
+    so a search only walks one user's entries, and its language_override
+    points at an unused field because "language" holds UI locale codes that
+    MongoDB would reject as text-search languages.
+    """
+    collection = db.user_scenarios
+    collection.create_index(
+        [("username", 1), ("title_key", 1)],
+        name="username_title_key",
+        unique=True,
+        partialFilterExpression={"title_key": {"$type": "string"}}
+    )
+    collection.create_index(
+        [("username", 1), ("title", "text"), ("description", "text")],
+        name="username_title_text",
+        weights={"title": 5, "description": 1},
+        default_language="none",
+        language_override="text_language"
+    )
+
 class MongoDBManager:
 
     def __init__(self, db=None):
@@ -20,13 +70,13 @@ class MongoDBManager:
                     self.client = db.client
                 else:
                     # Just for logging
-                    print("Using provided db without direct client reference")
+                    logger.debug("Using provided db without direct client reference")
             else:
                 # Get connection string from environment or use default
                 self.uri = os.getenv("MONGODB_URI", "mongodb://localhost:27017/")
                 self.db_name = os.getenv("MONGODB_DB", "language_assistant_db")
                 
-                print(f"Connecting to MongoDB: {self.uri}")
+                logger.debug("Connecting to MongoDB: %s", self.uri)
                 self.client = MongoClient(self.uri)
                 self.db = self.client[self.db_name]
                 
@@ -36,10 +86,9 @@ class MongoDBManager:
             # Initialize indexes
             self._create_indexes()
             
-            print("MongoDB manager initialized successfully")
+            logger.info("MongoDB manager initialized successfully")
         except Exception as e:
-            print(f"Error initializing MongoDB manager: {e}")
-            traceback.print_exc()
+            logger.error("Error initializing MongoDB manager: %s", e, exc_info=True)
             raise
     
     def _create_indexes(self):
@@ -47,18 +96,35 @@ class MongoDBManager:
             self.db.users.create_index("username", unique=True)
             
             self.db.chat_messages.create_index([("user_id", 1), ("timestamp", 1)])
+            # Delta sync reads only the messages after a known _id
+            self.db.chat_messages.create_index([("user_id", 1), ("_id", 1)])
             self.db.chat_messages.create_index([("batch_id", 1)])
             self.db.chat_messages.create_index([("is_discarded", 1)])
             
         except Exception as e:
-            print(f"Error creating indexes: {e}")
+            logger.error("Error creating indexes: %s", e)
+
+        try:
+            create_scenario_indexes(self.db)
+        except Exception as e:
+            # Usually duplicate titles left from before title_key existed
+            logger.error("Error creating user_scenarios indexes (run migrate_scenario_titles.py): %s", e)
     
-    def load_user_profile(self, username):
+    def load_user_profile(self, username, history_after=None, epoch=None):
+        """
+        The user's profile with chat history and custom scenarios. With
+        `history_after` (a chat_messages _id) only messages created after it,
+        less HISTORY_CURSOR_OVERLAP, are loaded; the overlap can repeat
+        messages the caller already has, which it drops by id. `history_after`
+        is ignored unless `epoch` still matches history_epoch(profile), so a
+        caller whose copy predates a deletion gets the full history.
+        """
         try:
-            user = self.users_collection.find_one({"username": username})
+            # Older documents still embed the profile image as a data URL
+            user = self.users_collection.find_one({"username": username}, {"profile_image": 0})
             
             if not user:
-                print(f"User {username} not found, creating a new profile")
+                logger.debug("User %s not found, creating a new profile", username)
                 user_profile = {
                     "username": username,
                     "ai_role": "AI assistant",
@@ -72,15 +138,22 @@ class MongoDBManager:
                 self.save_user_profile(user_profile)
                 return user_profile
             
+            if history_after and epoch != history_epoch(user):
+                history_after = None
+
             # Get messages from chat_messages collection
             chat_history = []
             
             try:
                 # Query messages from chat_messages collection
-                cursor = self.db.chat_messages.find({"user_id": user["_id"]}).sort("timestamp", 1)
+                query = {"user_id": user["_id"]}
+                if history_after:
+                    window_start = ObjectId(history_after).generation_time - HISTORY_CURSOR_OVERLAP
+                    query["_id"] = {"$gte": ObjectId.from_datetime(window_start)}
+                cursor = self.db.chat_messages.find(query).sort("timestamp", 1)
                 
                 messages = list(cursor)
-                print(f"Raw chat history contains {len(messages)} total messages")
+                metrics.observe("profile_chat_history_messages", len(messages), buckets=HISTORY_SIZE_BUCKETS)
                 
                 # Process messages
                 i = 0
@@ -108,9 +181,7 @@ class MongoDBManager:
                     i += 1
                     
             except Exception as e:
-                print(f"Error loading chat messages: {e}")
-                import traceback
-                traceback.print_exc()
+                logger.error("Error loading chat messages: %s", e, exc_info=True)
             
             # Get custom scenarios
             custom_scenarios = []
@@ -126,7 +197,7 @@ class MongoDBManager:
                     }
                     custom_scenarios.append(formatted_scenario)
             except Exception as e:
-                print(f"Error loading custom scenarios: {e}")
+                logger.error("Error loading custom scenarios: %s", e)
             
             # Build the user profile
             user_profile = {
@@ -138,15 +209,14 @@ class MongoDBManager:
                 "created_at": user.get("created_at"),
                 "chat_history": chat_history,
                 "custom_scenarios": custom_scenarios,
-                "lessons": user.get("lessons", [])
+                "lessons": user.get("lessons", []),
+                "history_version": user.get("history_version", 0)
             }
             
             return user_profile
             
         except Exception as e:
-            print(f"Error loading user profile: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.error("Error loading user profile: %s", e, exc_info=True)
             raise
 
     def append_chat_history(self, username, conversation_data, is_discarded=False):
@@ -191,24 +261,19 @@ class MongoDBManager:
             
             return True
         except Exception as e:
-            print(f"Error appending chat history for {username}: {e}")
+            logger.error("Error appending chat history for %s: %s", username, e)
             return False
     
     def save_conversation(self, username: str, conversation: list, is_discarded: bool = False, batch_id: str = None) -> bool:
         """Save conversation messages to the database for a user"""
         from datetime import datetime
-        import traceback
         
         try:
             if not conversation or len(conversation) == 0:
-                print(f"Warning: Empty conversation array for user {username}")
+                logger.warning("Empty conversation array for user %s", username)
                 return True  # Return success as there's nothing to save
                 
-            print(f"MongoDB: Saving {len(conversation)} messages for user {username}, batch_id={batch_id}, is_discarded={is_discarded}")
-            
-            # Debug: Print the first message
-            if conversation and len(conversation) > 0:
-                print(f"First message sample: {conversation[0]}")
+            logger.debug("MongoDB: Saving %s messages for user %s, batch_id=%s, is_discarded=%s", len(conversation), username, batch_id, is_discarded)
             
             # First, ensure we have a batch_id
             if not batch_id:
@@ -220,14 +285,14 @@ class MongoDBManager:
                 if not batch_id:
                     import uuid
                     batch_id = f"batch-{datetime.now().strftime('%Y%m%d%H%M%S')}-{str(uuid.uuid4())[:8]}"
-                    print(f"Generated new batch_id: {batch_id}")
+                    logger.debug("Generated new batch_id: %s", batch_id)
             
             # Find or create user document to get the user_id
             user = self.users_collection.find_one({"username": username})
             
             if not user:
                 # Create new user if not exists
-                print(f"Creating new user document for {username}")
+                logger.debug("Creating new user document for %s", username)
                 user_result = self.users_collection.insert_one({
                     "username": username,
                     "created_at": datetime.now().isoformat(),
@@ -237,8 +302,8 @@ class MongoDBManager:
             else:
                 user_id = user["_id"]
             
-            # Update each message and save to chat_messages collection
-            inserted_count = 0
+            # Update each message and save them to chat_messages in one round trip
+            documents = []
             for msg in conversation:
                 if isinstance(msg, dict):
                     # Update message properties
@@ -250,11 +315,12 @@ class MongoDBManager:
                     if 'timestamp' not in msg or not msg['timestamp']:
                         msg['timestamp'] = datetime.now().isoformat()
                     
-                    # Insert into chat_messages collection
-                    self.db.chat_messages.insert_one(msg)
-                    inserted_count += 1
+                    documents.append(msg)
             
-            print(f"MongoDB: Successfully inserted {inserted_count} messages into chat_messages collection")
+            if documents:
+                self.db.chat_messages.insert_many(documents)
+            
+            logger.debug("MongoDB: Successfully inserted %s messages into chat_messages collection", len(documents))
             
             # Always update the timestamp on the user document
             self.users_collection.update_one(
@@ -265,19 +331,18 @@ class MongoDBManager:
             return True
                 
         except Exception as e:
-            print(f"Error saving conversation: {str(e)}")
-            traceback.print_exc()
+            logger.error("Error saving conversation: %s", e, exc_info=True)
             return False
         
     def save_user_profile(self, user_profile):
         try:
             if not user_profile or not isinstance(user_profile, dict):
-                print("Invalid user profile data")
+                logger.warning("Invalid user profile data")
                 return False
                 
             username = user_profile.get("username")
             if not username:
-                print("Username is required in user profile")
+                logger.warning("Username is required in user profile")
                 return False
             
             # Add timestamp
@@ -296,20 +361,22 @@ class MongoDBManager:
                 upsert=True
             )
             
-            print(f"Save user profile result - matched: {result.matched_count}, modified: {result.modified_count}, upserted: {result.upserted_id is not None}")
+            logger.debug("Save user profile result - matched: %s, modified: %s, upserted: %s", result.matched_count, result.modified_count, result.upserted_id is not None)
             
             return True
         except Exception as e:
-            print(f"Error saving user profile: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.error("Error saving user profile: %s", e, exc_info=True)
             return False
     
+    def bump_history_version(self, user_id):
+        """Record that messages were removed, so delta cursors handed out before now resync."""
+        self.users_collection.update_one({"_id": user_id}, {"$inc": {"history_version": 1}})
+
     def delete_user_profile(self, username):
         try:
             user = self.db.users.find_one({"username": username})
             if not user:
-                print(f"User {username} not found")
+                logger.debug("User %s not found", username)
                 return False
             
             user_id = user["_id"]
@@ -320,18 +387,18 @@ class MongoDBManager:
             
             self.db.users.delete_one({"_id": user_id})
             
-            print(f"User {username} and all associated data deleted")
+            logger.info("User %s and all associated data deleted", username)
             return True
             
         except Exception as e:
-            print(f"Error deleting user profile: {e}")
+            logger.error("Error deleting user profile: %s", e)
             raise
     
     def add_custom_scenario(self, username, scenario):
         try:
             user = self.db.users.find_one({"username": username})
             if not user:
-                print(f"User {username} not found")
+                logger.debug("User %s not found", username)
                 return False
             
             scenario_data = {
@@ -347,7 +414,7 @@ class MongoDBManager:
             return True
             
         except Exception as e:
-            print(f"Error adding custom scenario: {e}")
+            logger.error("Error adding custom scenario: %s", e)
             raise
     
     async def insert_scenario_conversation(self, username, scenario_title, is_custom=False, language="en", created_at=None):
@@ -369,7 +436,7 @@ class MongoDBManager:
         result = self.db["scenario_conversations"].insert_one(conversation_doc)
         conversation_id = str(result.inserted_id)
         
-        print(f"Created scenario conversation with ID: {conversation_id}")
+        logger.debug("Created scenario conversation with ID: %s", conversation_id)
         return conversation_id
 
     async def insert_scenario_message(self, conversation_id, text, sender, audio_url=None, timestamp=None):
@@ -391,9 +458,84 @@ class MongoDBManager:
         result = self.db["scenario_messages"].insert_one(message_doc)
         message_id = str(result.inserted_id)
         
-        print(f"Added message {message_id} to conversation {conversation_id}")
+        logger.debug("Added message %s to conversation %s", message_id, conversation_id)
         return message_id
     
+    def save_scenario_conversation(self, username, scenario_title, messages, is_custom=False, language="en",
+                                   created_at=None, transactional=None):
+        """
+        Save a scenario conversation with all of its messages in two round
+        trips (one insert_one, one insert_many) instead of one per message.
+        The conversation _id is generated here so the messages can reference
+        it before anything is written.
+
+        With `transactional` (default SCENARIO_SAVE_TRANSACTIONS) both writes
+        run in one transaction; servers without transaction support (a
+        standalone mongod) fall back to the plain writes. Without a
+        transaction, a failed message insert removes the conversation and any
+        messages already written, so readers never see a half-saved session.
+
+        Returns (conversation_id, message_ids, timings in ms).
+        """
+        started = time.perf_counter()
+        conversation_oid = ObjectId()
+        conversation_id = str(conversation_oid)
+        now = datetime.now().isoformat()
+        conversation_doc = {
+            "_id": conversation_oid,
+            "username": username,
+            "scenario_title": scenario_title,
+            "is_custom": is_custom,
+            "language": language,
+            "created_at": created_at or now
+        }
+        message_docs = [
+            {
+                "_id": ObjectId(),
+                "conversation_id": conversation_id,
+                "text": message.get("text"),
+                "sender": message.get("sender"),
+                "audio_url": message.get("audio_url"),
+                "timestamp": message.get("timestamp") or now
+            }
+            for message in messages or []
+        ]
+
+        def write(session=None):
+            self.db["scenario_conversations"].insert_one(conversation_doc, session=session)
+            if message_docs:
+                self.db["scenario_messages"].insert_many(message_docs, ordered=True, session=session)
+
+        if transactional is None:
+            transactional = SCENARIO_SAVE_TRANSACTIONS
+        mode = "plain"
+        if transactional:
+            try:
+                with self.client.start_session() as session:
+                    session.with_transaction(write)
+                mode = "transaction"
+            except OperationFailure as e:
+                # Code 20: transactions need a replica set or mongos
+                if e.code != 20:
+                    raise
+                logger.warning("Transactions unsupported by this deployment; saving without one")
+                transactional = False
+        if not transactional:
+            try:
+                write()
+            except Exception:
+                self.db["scenario_conversations"].delete_one({"_id": conversation_oid})
+                self.db["scenario_messages"].delete_many({"conversation_id": conversation_id})
+                raise
+
+        elapsed = time.perf_counter() - started
+        metrics.observe("scenario_save_seconds", elapsed, mode=mode)
+        metrics.observe("scenario_save_messages", len(message_docs), buckets=HISTORY_SIZE_BUCKETS)
+        logger.debug("Saved scenario conversation %s with %s messages in %.1fms (%s)",
+                     conversation_id, len(message_docs), elapsed * 1000, mode)
+        timings = {"total_ms": round(elapsed * 1000, 2), "mode": mode}
+        return conversation_id, [str(doc["_id"]) for doc in message_docs], timings
+
     def close(self):
         """Close database connection"""
         if self.client:
@@ -0,0 +1,73 @@
+import argparse
+
+from pymongo import UpdateOne
+
+from app.textproc import title_key
+from database.mongodb_manager import MongoDBManager, create_scenario_indexes
+
+BATCH_SIZE = 500
+
+def migrate_scenario_titles(dry_run=False):
+    """
+    Backfill user_scenarios.title_key and build the scenario indexes.
+
+    The oldest scenario per (username, title_key) gets the key. Later
+    duplicates are left without one, so they keep working and stay listed
+    but stay out of the unique index. They are reported so they can be
+    renamed or deleted.
+    """
+    db_manager = MongoDBManager()
+    collection = db_manager.db["user_scenarios"]
+
+    cursor = collection.find(
+        {"title_key": {"$exists": False}},
+        {"_id": 1, "username": 1, "title": 1}
+    ).sort([("username", 1), ("created_at", 1), ("_id", 1)])
+
+    taken = set(
+        (doc.get("username"), doc["title_key"])
+        for doc in collection.find({"title_key": {"$type": "string"}}, {"username": 1, "title_key": 1})
+    )
+
+    pending = []
+    updated = 0
+    duplicates = []
+    scanned = 0
+
+    for doc in cursor:
+        scanned += 1
+        key = title_key(doc.get("title"))
+        if not key:
+            continue
+        identity = (doc.get("username"), key)
+        if identity in taken:
+            duplicates.append((doc.get("username"), doc.get("title"), doc["_id"]))
+            continue
+        taken.add(identity)
+        pending.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"title_key": key}}))
+        if len(pending) >= BATCH_SIZE:
+            if not dry_run:
+                collection.bulk_write(pending, ordered=False)
+            updated += len(pending)
+            pending = []
+
+    if pending:
+        if not dry_run:
+            collection.bulk_write(pending, ordered=False)
+        updated += len(pending)
+
+    if not dry_run:
+        create_scenario_indexes(db_manager.db)
+
+    print("\nMigration Summary:")
+    print(f"Scenarios without title_key: {scanned}")
+    print(f"{'Would backfill' if dry_run else 'Backfilled'}: {updated}")
+    print(f"Duplicate titles left unkeyed: {len(duplicates)}")
+    for username, title, _id in duplicates:
+        print(f"  {username}: '{title}' ({_id})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill title_key on user_scenarios and build its indexes")
+    parser.add_argument("--dry-run", action="store_true", help="report what would change without writing")
+    args = parser.parse_args()
+    migrate_scenario_titles(dry_run=args.dry_run)
@@ -37,9 +37,3 @@ DEFAULT_SCENARIOS = {
 
 PROFILE_DIR = "user_profiles"
 SOUND_RESPONSE_DIR = "sound_responses"
-
-LANGUAGE_MAP = {
-    'English': 'en',
-    'Chinese': 'zh',
-    'Japanese': 'ja'
-}
\ No newline at end of file
@@ -1,11 +1,137 @@
+"""
+Backend launcher.
+
+    python server.py                  # production: gunicorn master + uvicorn workers
+    python server.py --workers 8
+    python server.py --dev            # single process with auto-reload
+    python server.py --profile-startup [--startup-budget-ms 3000]
+
+In production the read-only shared assets (language registry, detector
+tables, text patterns, content pack) are imported in the master before it
+forks, so workers share them copy-on-write. Everything that opens sockets
+(MongoDB, OpenAI clients) is built lazily inside each worker by
+app.resources. SIGTERM drains: workers flip /readyz to 503, stop accepting
+connections and get GRACEFUL_TIMEOUT seconds to finish in-flight requests.
+Without gunicorn (e.g. on Windows) it falls back to uvicorn's own process
+manager, which spawns rather than forks, so nothing is shared.
+
+/metrics is merged across workers through METRICS_MULTIPROC_DIR (see
+app.metrics); unless set, a temporary directory is created per run.
+"""
+import argparse
+import importlib
 import os
+import shutil
+import tempfile
+
 import dotenv
 import uvicorn
 
 # Load environment variables
 dotenv.load_dotenv()
 
+PRELOAD_MODULES = ("prompts", "app.languages", "app.langdetect", "app.textproc", "app.content_pack")
+
+
+def default_workers():
+    return int(os.getenv("WEB_CONCURRENCY", "0")) or min((os.cpu_count() or 1) * 2, 8)
+
+
+def preload_shared_assets():
+    for module in PRELOAD_MODULES:
+        importlib.import_module(module)
+
+
+def prepare_metrics_dir():
+    """Point METRICS_MULTIPROC_DIR at an empty directory; returns it if created here."""
+    directory = os.getenv("METRICS_MULTIPROC_DIR")
+    if not directory:
+        os.environ["METRICS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="chatty-metrics-")
+        return os.environ["METRICS_MULTIPROC_DIR"]
+    os.makedirs(directory, exist_ok=True)
+    # A previous run's totals would otherwise be added to this one's
+    for name in os.listdir(directory):
+        if name.endswith((".json", ".tmp")):
+            os.remove(os.path.join(directory, name))
+    return None
+
+
+def child_exit(server, worker):
+    from app import metrics
+    metrics.mark_process_dead(worker.pid)
+
+
+def run_gunicorn(host, port, workers, timeout, graceful_timeout):
+    from gunicorn.app.base import BaseApplication
+
+    class Application(BaseApplication):
+        def __init__(self, options):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from app.main import app
+            return app
+
+    preload_shared_assets()
+    Application({
+        "bind": f"{host}:{port}",
+        "workers": workers,
+        "worker_class": "app.draining.DrainingUvicornWorker",
+        "child_exit": child_exit,
+        "timeout": timeout,
+        "graceful_timeout": graceful_timeout,
+        "keepalive": 5,
+        "max_requests": int(os.getenv("MAX_REQUESTS", "0")),
+        "max_requests_jitter": int(os.getenv("MAX_REQUESTS_JITTER", "0")),
+        "accesslog": os.getenv("ACCESS_LOG") or None,
+    }).run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Chatty backend")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=default_workers())
+    parser.add_argument("--timeout", type=int, default=int(os.getenv("WORKER_TIMEOUT", "120")))
+    parser.add_argument("--graceful-timeout", type=int, default=int(os.getenv("GRACEFUL_TIMEOUT", "30")))
+    parser.add_argument("--dev", action="store_true", default=os.getenv("RELOAD") == "1",
+                        help="single worker with auto-reload")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="report per-phase import/init time of a cold start and exit")
+    parser.add_argument("--startup-budget-ms", type=float,
+                        default=float(os.getenv("STARTUP_BUDGET_MS")) if os.getenv("STARTUP_BUDGET_MS") else None,
+                        help="with --profile-startup, exit non-zero if importing app.main takes longer")
+    parser.add_argument("--skip-init", action="store_true",
+                        help="with --profile-startup, do not connect to MongoDB/OpenAI")
+    args = parser.parse_args()
+
+    if args.profile_startup:
+        from app.startup_profile import profile_startup
+        raise SystemExit(profile_startup(args.startup_budget_ms, include_init=not args.skip_init))
+
+    if args.dev:
+        uvicorn.run("app.main:app", host=args.host, port=args.port, reload=True)
+        return
+
+    created_metrics_dir = prepare_metrics_dir()
+    try:
+        try:
+            import gunicorn  # noqa: F401
+        except ImportError:
+            from app import draining
+            draining.run(uvicorn.Config("app.main:app", host=args.host, port=args.port, workers=args.workers,
+                                        timeout_keep_alive=5))
+        else:
+            run_gunicorn(args.host, args.port, args.workers, args.timeout, args.graceful_timeout)
+    finally:
+        if created_metrics_dir:
+            shutil.rmtree(created_metrics_dir, ignore_errors=True)
+
+
 if __name__ == "__main__":
-    port = int(os.getenv("PORT", "8000"))
-    host = os.getenv("HOST", "0.0.0.0")
-    uvicorn.run("app.main:app", host=host, port=port, reload=True)
\ No newline at end of file
+    main()
@@ -0,0 +1,50 @@
+import os
+import sys
+
+import pytest
+
+# Tests import the backend as `app.*`, the same way uvicorn does from Backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="module")
+def live_app(tmp_path_factory):
+    """
+    The real app on a TestClient, talking to a wire-level fake MongoDB (so
+    pymongo and app.mongo_tracer's listener run for real) and the fake OpenAI
+    server, with a silent TTS. Yields (client, app.main); environment and
+    module state are restored afterwards.
+    """
+    pytest.importorskip("mongomock")
+    pytest.importorskip("openai")
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+
+    from benchmarks.fake_mongod import FakeMongoServer
+    from benchmarks.fake_openai import FakeOpenAIServer
+    from benchmarks.loadtest_app import SilentTTS
+
+    mongo = FakeMongoServer().start()
+    upstream = FakeOpenAIServer().start()
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv("MONGODB_URI", mongo.uri)
+        patch.setenv("MONGODB_DB", "test_backend")
+        patch.setenv("OPENAI_API_KEY", "fake")
+        patch.setenv("OPENAI_BASE_URL", upstream.base_url)
+
+        import app.main
+        from app import resources
+
+        patch.setattr(app.main, "gTTS", SilentTTS)
+        patch.setattr(app.main, "SOUND_RESPONSE_DIR", str(tmp_path_factory.mktemp("audio")))
+        # Resources built by earlier tests point elsewhere; rebuild them here,
+        # outside any measured request
+        resources.close_all()
+        app.main.db_manager.get()
+        try:
+            # Startup hooks (warm-up, janitor) are not run: TestClient is not entered
+            yield TestClient(app.main.app), app.main
+        finally:
+            resources.close_all()
+    upstream.stop()
+    mongo.stop()
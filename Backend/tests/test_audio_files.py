@@ -0,0 +1,54 @@
+import os
+import time
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app import audio_files
+
+NAME = "speech-0123456789abcdef.mp3"
+BODY = bytes(range(256)) * 8
+
+
+@pytest.fixture
+def audio(tmp_path):
+    path = tmp_path / NAME
+    path.write_bytes(BODY)
+    old = time.time() - 7200
+    os.utime(path, (old, old))
+
+    app = FastAPI()
+
+    @app.get("/audio/{name}")
+    async def audio_route(request: Request, name: str):
+        return await audio_files.serve(request, str(tmp_path), name)
+
+    return TestClient(app), str(path)
+
+
+def test_validators_survive_a_touch(audio):
+    client, path = audio
+    etag = client.get(f"/audio/{NAME}").headers["etag"]
+
+    assert audio_files.touch(path)
+
+    conditional = client.get(f"/audio/{NAME}", headers={"If-None-Match": etag})
+    assert conditional.status_code == 304
+
+    resumed = client.get(f"/audio/{NAME}", headers={"Range": "bytes=100-199", "If-Range": etag})
+    assert resumed.status_code == 206
+    assert resumed.content == BODY[100:200]
+    assert resumed.headers["content-range"] == f"bytes 100-199/{len(BODY)}"
+
+
+def test_stale_if_range_gets_the_full_file(audio):
+    client, _ = audio
+
+    response = client.get(f"/audio/{NAME}", headers={"Range": "bytes=0-9", "If-Range": '"other"'})
+
+    assert response.status_code == 200
+    assert response.content == BODY
@@ -0,0 +1,42 @@
+import os
+import time
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+from app import audio_janitor
+from app.audio_janitor import AudioJanitor
+
+
+@pytest.fixture
+def janitor(tmp_path):
+    db = mongomock.MongoClient().db
+    db["scenario_messages"].insert_one({"audio_url": "http://host/audio/kept.mp3"})
+    old = time.time() - 7200
+    for name in ("kept.mp3", "stale.mp3"):
+        path = tmp_path / name
+        path.write_bytes(b"x" * 10)
+        os.utime(path, (old, old))
+    (tmp_path / "fresh.mp3").write_bytes(b"x" * 10)
+    return AudioJanitor(str(tmp_path), lambda: db, ttl_seconds=3600, quota_bytes=1 << 20)
+
+
+def test_removes_only_expired_unreferenced_files(janitor, tmp_path):
+    janitor.run_once()
+    assert sorted(p.name for p in tmp_path.glob("*.mp3")) == ["fresh.mp3", "kept.mp3"]
+
+
+def test_sweeps_without_a_platform_lock(janitor, tmp_path, monkeypatch):
+    monkeypatch.setattr(audio_janitor, "fcntl", None)
+    monkeypatch.setattr(audio_janitor, "msvcrt", None)
+    janitor.run_once()
+    assert not (tmp_path / "stale.mp3").exists()
+
+
+@pytest.mark.skipif(audio_janitor.fcntl is None, reason="flock only")
+def test_skips_the_pass_while_another_worker_holds_the_lock(janitor, tmp_path):
+    with open(tmp_path / ".janitor.lock", "w") as held:
+        audio_janitor.fcntl.flock(held, audio_janitor.fcntl.LOCK_EX)
+        janitor.run_once()
+    assert (tmp_path / "stale.mp3").exists()
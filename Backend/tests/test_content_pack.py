@@ -0,0 +1,42 @@
+import json
+import os
+
+from app.content_pack import ContentPack
+
+
+def write_pack(path, languages, version=1):
+    path.write_text(json.dumps({"version": version, "languages": languages}), encoding="utf-8")
+    # Make the change visible to the mtime check even on coarse filesystems
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_lookup_resolves_aliases_and_falls_back_to_english(tmp_path):
+    path = tmp_path / "pack.json"
+    write_pack(path, {"en": {"greeting": "Hello"}, "ja": {"greeting": "こんにちは"}})
+    pack = ContentPack(str(path))
+
+    assert pack.get("Japanese", "greeting") == "こんにちは"
+    assert pack.get("de", "greeting") == "Hello"
+    assert pack.get("ja", "missing", "default") == "default"
+
+
+def test_edits_are_picked_up_and_invalid_packs_keep_the_previous_one(tmp_path):
+    path = tmp_path / "pack.json"
+    write_pack(path, {"en": {"greeting": "Hello"}})
+    pack = ContentPack(str(path), reload_interval=0)
+
+    write_pack(path, {"en": {"greeting": "Hi again"}})
+    assert pack.get("en", "greeting") == "Hi again"
+
+    write_pack(path, {"en": {"greeting": "Broken"}}, version=99)
+    assert pack.get("en", "greeting") == "Hi again"
+
+
+def test_unregistered_languages_are_ignored(tmp_path):
+    path = tmp_path / "pack.json"
+    write_pack(path, {"en": {"greeting": "Hello"}, "sw": {"greeting": "Habari"}})
+    pack = ContentPack(str(path))
+
+    assert pack.languages() == ("en",)
+    assert pack.get("sw", "greeting") == "Hello"
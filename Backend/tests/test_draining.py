@@ -0,0 +1,99 @@
+"""SIGTERM: /readyz flips at once, in-flight requests finish, exit waits for the drain delay."""
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+pytest.importorskip("uvicorn")
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DRAIN_DELAY = 1.0
+
+_SERVER = """
+import asyncio, sys
+import uvicorn
+from app import lifecycle
+from app.draining import DrainingServer
+
+async def app(scope, receive, send):
+    if scope["type"] != "http":
+        return
+    if scope["path"] == "/slow":
+        await asyncio.sleep(0.5)
+    status = 503 if scope["path"] == "/readyz" and lifecycle.is_draining() else 200
+    await send({"type": "http.response.start", "status": status, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+config = uvicorn.Config(app, host="127.0.0.1", port=int(sys.argv[1]), lifespan="off", log_level="warning")
+DrainingServer(config, drain_delay=float(sys.argv[2])).run()
+"""
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def status(url):
+    try:
+        with urllib.request.urlopen(url, timeout=5) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+@pytest.fixture
+def server():
+    port = free_port()
+    process = subprocess.Popen([sys.executable, "-c", _SERVER, str(port), str(DRAIN_DELAY)], cwd=BACKEND_DIR)
+    base = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 10
+    while True:
+        try:
+            status(f"{base}/readyz")
+            break
+        except OSError:
+            if time.monotonic() > deadline or process.poll() is not None:
+                process.kill()
+                pytest.fail("server did not start")
+            time.sleep(0.05)
+    yield process, base
+    if process.poll() is None:
+        process.kill()
+
+
+def test_sigterm_drains_in_flight_requests_after_the_delay(server):
+    process, base = server
+    in_flight = {}
+    request = threading.Thread(target=lambda: in_flight.setdefault("status", status(f"{base}/slow")))
+    request.start()
+    time.sleep(0.1)
+
+    process.terminate()
+    terminated = time.monotonic()
+    time.sleep(0.2)
+    # Still serving during the delay, but out of rotation
+    assert status(f"{base}/readyz") == 503
+    request.join(5)
+    assert in_flight["status"] == 200
+
+    assert process.wait(10) == 0
+    assert time.monotonic() - terminated >= DRAIN_DELAY
+
+
+def test_second_sigterm_exits_without_waiting(server):
+    process, _ = server
+    process.terminate()
+    time.sleep(0.1)
+    process.terminate()
+    started = time.monotonic()
+
+    process.wait(10)
+    assert time.monotonic() - started < DRAIN_DELAY
@@ -0,0 +1,147 @@
+"""Delta history sync must not miss messages whose _id sorts before the cursor."""
+import datetime
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+from bson import ObjectId
+
+from database.mongodb_manager import HISTORY_CURSOR_OVERLAP, MongoDBManager, history_epoch
+
+
+def object_id(seconds_ago, suffix):
+    """An _id as a worker with process bytes `suffix` would generate it `seconds_ago` seconds back."""
+    created = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=seconds_ago)
+    return ObjectId(ObjectId.from_datetime(created).binary[:4] + bytes.fromhex(suffix))
+
+
+@pytest.fixture
+def manager():
+    manager = MongoDBManager(db=mongomock.MongoClient().db)
+    user_id = manager.users_collection.insert_one({"username": "ana", "created_at": "2024-01-01"}).inserted_id
+
+    def add(_id, text):
+        manager.db.chat_messages.insert_one({"_id": _id, "user_id": user_id, "user": text, "timestamp": text})
+
+    manager.add = add
+    manager.user_id = user_id
+    return manager
+
+
+def delta(manager, cursor):
+    return manager.load_user_profile("ana", history_after=cursor, epoch=history_epoch(manager.load_user_profile("ana")))
+
+
+def ids(profile):
+    return [message["id"] for message in profile["chat_history"]]
+
+
+def test_late_insert_with_an_older_id_is_still_delivered(manager):
+    seen = object_id(5, "ffffffffff000001")
+    manager.add(seen, "1")
+    cursor = ids(manager.load_user_profile("ana"))[-1]
+
+    # Generated earlier by another worker (or one with a slow clock), committed after the read
+    late = object_id(5, "0000000000000001")
+    manager.add(late, "2")
+
+    assert str(late) in ids(delta(manager, cursor))
+
+
+def test_delta_stays_bounded_by_the_overlap_window(manager):
+    old = object_id(HISTORY_CURSOR_OVERLAP.total_seconds() + 60, "000000000000000a")
+    recent = object_id(1, "000000000000000b")
+    manager.add(old, "1")
+    manager.add(recent, "2")
+
+    assert ids(delta(manager, str(recent))) == [str(recent)]
+
+
+def test_deletion_invalidates_earlier_cursors(manager):
+    first, second = object_id(3, "0000000000000001"), object_id(2, "0000000000000002")
+    manager.add(first, "1")
+    manager.add(second, "2")
+    profile = manager.load_user_profile("ana")
+    epoch = history_epoch(profile)
+
+    manager.db.chat_messages.delete_one({"_id": first})
+    manager.bump_history_version(manager.user_id)
+
+    stale = manager.load_user_profile("ana", history_after=str(second), epoch=epoch)
+    assert history_epoch(stale) != epoch
+    # Full history, not a delta from the stale cursor
+    assert ids(stale) == [str(second)]
+
+
+def test_cursor_never_moves_back():
+    pytest.importorskip("fastapi")
+    pytest.importorskip("openai")
+    from app.main import history_cursor, parse_profile_cursor
+
+    since = str(object_id(0, "ffffffffff000001"))
+    overlap_only = [{"id": str(object_id(3, "0000000000000001"))}]
+
+    assert history_cursor(overlap_only, since) == since
+    assert history_cursor([], since) == since
+    assert history_cursor([], None) is None
+    # Cursors from before the history epoch existed carry none, which forces a full resync
+    assert parse_profile_cursor(f"{since}.abcdef0123456789") == (since, None, "abcdef0123456789")
+
+
+def get_profile(client, username, since=None):
+    params = {"username": username, **({"since": since} if since else {})}
+    response = client.get("/api/user_profile", params=params)
+    assert response.status_code == 200
+    return response.json()
+
+
+def texts(profile):
+    return sorted(message.get("user") or message.get("ai") for message in profile["chat_history"])
+
+
+def save(client, username, batch_id, text):
+    response = client.post("/api/save_conversation", json={
+        "username": username, "batch_id": batch_id,
+        "conversation": [{"user": text, "ai": f"Reply to {text}", "timestamp": "2024-01-01T00:00:00"}],
+    })
+    assert response.status_code == 200
+
+
+def test_deleted_batch_reaches_a_delta_client(live_app):
+    client, _ = live_app
+    username = "delta-delete"
+    client.post("/api/init_user_profile", json={"username": username})
+    save(client, username, "batch-1", "first")
+    save(client, username, "batch-2", "second")
+    cursor = get_profile(client, username)["cursor"]
+
+    # Unchanged: a delta with nothing the client does not have
+    unchanged = get_profile(client, username, cursor)
+    assert unchanged["delta"] is True
+    cursor = unchanged["cursor"]
+
+    response = client.post("/api/discard_by_batchid", json={"username": username, "batch_id": "batch-1"})
+    assert response.json()["deleted_count"] > 0
+
+    synced = get_profile(client, username, cursor)
+    assert synced["delta"] is False
+    assert "first" not in str(synced["chat_history"])
+    assert "second" in str(synced["chat_history"])
+    assert get_profile(client, username, synced["cursor"])["delta"] is True
+
+
+def test_cleared_conversation_reaches_a_delta_client(live_app):
+    client, _ = live_app
+    username = "delta-clear"
+    client.post("/api/init_user_profile", json={"username": username})
+    save(client, username, "batch-1", "first")
+    cursor = get_profile(client, username)["cursor"]
+    history_cursor = client.get("/api/conversation_history", params={"username": username}).json()["cursor"]
+
+    response = client.post("/api/clear_conversation", json={"username": username, "force_clear": True})
+    assert response.status_code == 200
+
+    assert get_profile(client, username, cursor)["delta"] is False
+    history = client.get("/api/conversation_history", params={"username": username, "since": history_cursor})
+    assert history.json()["delta"] is False
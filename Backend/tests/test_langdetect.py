@@ -0,0 +1,103 @@
+"""
+The language check must not reject natural, suggestion-length sentences in
+the expected language (false rejections replace good suggestions with canned
+ones and trigger model escalations), while still catching long replies that
+are clearly in another language.
+"""
+import pytest
+
+from app.langdetect import detect_language, matches_language
+
+SENTENCES = {
+    "en": [
+        "I'd like a table for two, please.", "Could you recommend something light?",
+        "How long have you lived here?", "That sounds like a great idea.",
+        "Can I pay by card?", "What time does the museum open?", "I'm just looking, thanks.",
+        "Do you have this in a larger size?", "Sorry, could you say that again?",
+        "I usually go running in the morning.", "Is breakfast included?", "Where is the nearest station?",
+        "We should meet for coffee sometime.", "My flight was delayed by two hours.",
+        "I really enjoyed the concert last night.", "Nice to meet you!", "What do you do for a living?",
+        "Could I get the bill, please?", "Which bus goes to the city centre?", "I'm allergic to nuts.",
+    ],
+    "es": [
+        "Quisiera un café, por favor.", "¿Cuánto cuesta esta camisa?", "Me gustaría reservar una mesa.",
+        "¿Dónde está la estación de tren?", "Vivo aquí desde hace tres años.", "Tengo una reserva a nombre de Ana.",
+        "¿Puede repetirlo, por favor?", "Estoy buscando un regalo para mi madre.", "La cuenta, por favor.",
+        "Me encanta esta ciudad.", "¿A qué hora abre el museo?", "Prefiero el vino tinto.",
+        "Mucho gusto, me llamo Pedro.", "¿Qué me recomienda?", "Hace mucho calor hoy.",
+        "Trabajo como profesora en un colegio.", "¿Tiene esto en una talla más grande?",
+        "Voy al gimnasio todos los días.", "Perdone, no entiendo.", "¿Me trae un vaso de agua?",
+    ],
+    "fr": [
+        "Combien coûte la chambre par nuit ?", "Je voudrais un café, s'il vous plaît.",
+        "Où se trouve la gare ?", "Pouvez-vous répéter, s'il vous plaît ?", "J'habite ici depuis deux ans.",
+        "L'addition, s'il vous plaît.", "Qu'est-ce que vous me conseillez ?", "J'ai réservé une table pour deux.",
+        "Il fait très beau aujourd'hui.", "Enchanté, je m'appelle Paul.", "À quelle heure ouvre le musée ?",
+        "Je cherche un cadeau pour ma sœur.", "Vous avez ceci en plus grand ?", "Je suis allergique aux noix.",
+        "Je travaille dans une banque.", "C'est une excellente idée !", "Le petit-déjeuner est compris ?",
+        "Excusez-moi, je suis perdu.", "On se retrouve demain matin ?", "J'aime beaucoup cette ville.",
+    ],
+    "de": [
+        "Das klingt sehr interessant.", "Guten Tag, willkommen im Restaurant. Was darf es sein?",
+        "Ich hätte gern einen Kaffee.", "Wo ist der Bahnhof?", "Können Sie das bitte wiederholen?",
+        "Die Rechnung, bitte.", "Ich wohne seit drei Jahren hier.", "Was empfehlen Sie?",
+        "Haben Sie das auch in Größe M?", "Freut mich, ich heiße Anna.", "Wann öffnet das Museum?",
+        "Ich arbeite als Lehrerin.", "Heute ist es sehr warm.", "Ich suche ein Geschenk für meinen Vater.",
+        "Ist das Frühstück inklusive?", "Entschuldigung, ich verstehe das nicht.", "Wir sehen uns morgen.",
+        "Ich gehe jeden Tag joggen.", "Kann ich mit Karte zahlen?", "Ein Tisch für zwei Personen, bitte.",
+    ],
+    "it": [
+        "Vorrei un caffè, per favore.", "Quanto costa questa borsa?", "Dov'è la stazione?",
+        "Può ripetere, per favore?", "Il conto, per favore.", "Abito qui da due anni.",
+        "Cosa mi consiglia?", "Ho prenotato un tavolo per due.", "Oggi fa molto caldo.",
+        "Piacere, mi chiamo Marco.", "A che ora apre il museo?", "Sto cercando un regalo per mia madre.",
+        "Lavoro in un ufficio in centro.", "È un'ottima idea!", "La colazione è inclusa?",
+        "Scusi, non ho capito.", "Ci vediamo domani sera.", "Posso pagare con la carta?",
+        "Mi piace molto questa città.", "Avete questo in una taglia più grande?",
+    ],
+}
+LONG = {
+    "en": "Thank you so much for your help today. I think I understand the difference between the past simple and the present perfect much better now, and I will practice with the exercises you gave me.",
+    "es": "Muchas gracias por tu ayuda de hoy. Creo que ahora entiendo mucho mejor la diferencia entre el pretérito indefinido y el imperfecto, y voy a practicar con los ejercicios que me diste.",
+    "fr": "Merci beaucoup pour ton aide aujourd'hui. Je pense que je comprends beaucoup mieux la différence entre le passé composé et l'imparfait, et je vais m'entraîner avec les exercices que tu m'as donnés.",
+    "de": "Vielen Dank für deine Hilfe heute. Ich glaube, ich verstehe den Unterschied zwischen dem Perfekt und dem Präteritum jetzt viel besser, und ich werde mit den Übungen üben, die du mir gegeben hast.",
+    "it": "Grazie mille per il tuo aiuto di oggi. Penso di aver capito molto meglio la differenza tra il passato prossimo e l'imperfetto, e mi eserciterò con gli esercizi che mi hai dato.",
+}
+
+
+LATIN_LANGUAGES = sorted(SENTENCES)
+
+
+@pytest.mark.parametrize("language", LATIN_LANGUAGES)
+def test_short_sentences_pass_for_their_own_language(language):
+    rejected = [text for text in SENTENCES[language] if not matches_language(text, language)]
+    assert rejected == []
+
+
+@pytest.mark.parametrize("language", LATIN_LANGUAGES)
+def test_long_replies_pass_for_their_own_language(language):
+    assert matches_language(LONG[language], language)
+    assert detect_language(LONG[language]) == language
+
+
+@pytest.mark.parametrize("language", LATIN_LANGUAGES)
+@pytest.mark.parametrize("expected", LATIN_LANGUAGES)
+def test_long_replies_in_another_language_are_rejected(language, expected):
+    if language != expected:
+        assert not matches_language(LONG[language], expected)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("当然，我们有一张靠窗的桌子。", "en"),
+    ("もちろんです。何名様ですか？", "ko"),
+    ("물론이죠. 몇 분이세요?", "ja"),
+    ("I'd like a table for two, please.", "ja"),
+    ("我想預訂一個房間，這個價格多少錢？", "zh-CN"),
+])
+def test_other_scripts_are_rejected_even_when_short(text, expected):
+    assert not matches_language(text, expected)
+
+
+@pytest.mark.parametrize("text", ["", "OK", "123 !!", "Taxi?"])
+def test_text_without_signal_passes(text):
+    assert matches_language(text, "de")
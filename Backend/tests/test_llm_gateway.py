@@ -0,0 +1,88 @@
+import asyncio
+import threading
+import time
+
+from app.llm_gateway import SingleFlight, prompt_key
+
+
+def test_prompt_key_ignores_argument_order():
+    assert prompt_key({"model": "m", "messages": []}) == prompt_key({"messages": [], "model": "m"})
+
+
+def test_concurrent_threads_share_one_call():
+    flight = SingleFlight()
+    calls = []
+    started = threading.Barrier(5)
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.2)
+        return "result"
+
+    def worker(results):
+        started.wait()
+        results.append(flight.do("key", slow))
+
+    results = []
+    threads = [threading.Thread(target=worker, args=(results,)) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["result"] * 5
+    assert len(calls) == 1
+
+
+def test_followers_receive_the_leaders_exception():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def failing():
+        release.wait(1)
+        raise ValueError("upstream")
+
+    errors = []
+
+    def worker():
+        try:
+            flight.do("key", failing)
+        except ValueError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(errors) == 3
+
+
+def test_calls_on_the_event_loop_never_wait_for_a_leader():
+    flight = SingleFlight()
+    leader_running = threading.Event()
+    release = threading.Event()
+
+    def leader():
+        leader_running.set()
+        release.wait(5)
+        return "leader"
+
+    thread = threading.Thread(target=lambda: flight.do("key", leader))
+    thread.start()
+    leader_running.wait(1)
+
+    async def on_loop():
+        # Would block the loop until `release` if it joined the leader
+        return flight.do("key", lambda: "own call")
+
+    try:
+        started = time.perf_counter()
+        assert asyncio.run(on_loop()) == "own call"
+        assert time.perf_counter() - started < 1
+    finally:
+        release.set()
+        thread.join()
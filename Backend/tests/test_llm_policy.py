@@ -0,0 +1,123 @@
+import asyncio
+import time
+
+import pytest
+
+openai = pytest.importorskip("openai")
+
+from app.llm_gateway import CoalescingClient
+from app.llm_policy import CircuitOpenError, TokenBucket, UpstreamPolicy
+from app.model_router import ModelRouter
+from benchmarks.fake_openai import FakeOpenAIServer, FaultConfig
+
+
+@pytest.fixture
+def upstream():
+    server = FakeOpenAIServer(config=FaultConfig()).start()
+    yield server
+    server.stop()
+
+
+def make_client(server, **policy_options):
+    options = {"max_attempts": 3, "base_delay": 0.01, "max_delay": 0.05,
+               "failure_threshold": 3, "recovery_timeout": 60.0}
+    options.update(policy_options)
+    upstream_client = openai.OpenAI(api_key="fake", base_url=server.base_url, max_retries=0)
+    return CoalescingClient(upstream_client, policy=UpstreamPolicy(**options))
+
+
+def ask(client, text="Say hello"):
+    return client.chat.completions.create(
+        model="gpt-3.5-turbo",
+        messages=[{"role": "user", "content": text}],
+        max_tokens=20,
+    )
+
+
+def test_transient_errors_are_retried(upstream):
+    upstream.config.fail_first = 2
+    upstream.config.error_statuses = (503,)
+    client = make_client(upstream)
+
+    response = ask(client)
+
+    assert response.choices[0].message.content
+    assert upstream.requests == 3
+    assert client.policy.breaker("gpt-3.5-turbo").state == "closed"
+
+
+def test_breaker_opens_on_outage_and_fails_fast(upstream):
+    upstream.config.error_rate = 1.0
+    upstream.config.error_statuses = (500,)
+    client = make_client(upstream, max_attempts=1)
+
+    for i in range(3):
+        with pytest.raises(openai.InternalServerError):
+            ask(client, f"attempt {i}")
+    requests_before = upstream.requests
+
+    started = time.perf_counter()
+    with pytest.raises(CircuitOpenError):
+        ask(client, "while open")
+
+    assert time.perf_counter() - started < 0.1
+    assert upstream.requests == requests_before
+
+
+def test_client_errors_do_not_trip_the_breaker(upstream):
+    upstream.config.error_rate = 1.0
+    upstream.config.error_statuses = (400,)
+    client = make_client(upstream)
+
+    for i in range(5):
+        with pytest.raises(openai.BadRequestError):
+            ask(client, f"bad request {i}")
+
+    breaker = client.policy.breaker("gpt-3.5-turbo")
+    assert breaker.state == "closed"
+    assert breaker.failures == 0
+    # Not retried either
+    assert upstream.requests == 5
+
+
+def test_retries_do_not_block_the_event_loop(upstream, monkeypatch):
+    # Take the top of the jitter range so the two retries sleep 0.4s in total
+    monkeypatch.setattr("app.llm_policy.random.uniform", lambda low, high: high)
+    upstream.config.fail_first = 2
+    upstream.config.error_statuses = (503,)
+    client = make_client(upstream, base_delay=0.2, max_delay=0.2)
+    router = ModelRouter(client)
+
+    async def main():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        started = time.perf_counter()
+        response = await router.complete_async("small_talk", messages=[{"role": "user", "content": "hi"}])
+        elapsed = time.perf_counter() - started
+        task.cancel()
+        return response, ticks, elapsed
+
+    response, ticks, elapsed = asyncio.run(main())
+
+    assert response.choices[0].message.content
+    assert elapsed >= 0.4
+    # The loop kept running while the call slept between retries; a blocked
+    # loop would tick at most once
+    assert ticks >= 10
+
+
+def test_token_bucket_waits_for_refill():
+    bucket = TokenBucket(tokens_per_minute=600)  # 10 tokens per second
+    bucket.acquire(600)
+
+    started = time.perf_counter()
+    bucket.acquire(2, max_wait=1.0)
+
+    assert 0.1 < time.perf_counter() - started < 0.6
@@ -0,0 +1,36 @@
+import logging
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("openai")
+
+from fastapi.testclient import TestClient
+
+import app.main
+
+
+@pytest.fixture
+def client():
+    return TestClient(app.main.app)
+
+
+def test_log_levels_cannot_be_changed_by_default(client, monkeypatch):
+    monkeypatch.setattr(app.main, "LOG_LEVEL_CONTROL", False)
+    before = logging.getLogger("app.main").level
+
+    response = client.post("/api/debug_log_levels", json={"app.main": "DEBUG"})
+
+    assert response.status_code == 403
+    assert logging.getLogger("app.main").level == before
+
+
+def test_log_levels_can_be_changed_when_enabled(client, monkeypatch):
+    monkeypatch.setattr(app.main, "LOG_LEVEL_CONTROL", True)
+    before = logging.getLogger("tests.log_level_control").level
+    try:
+        response = client.post("/api/debug_log_levels", json={"tests.log_level_control": "DEBUG"})
+        assert response.status_code == 200
+        assert response.json()["levels"]["tests.log_level_control"] == "DEBUG"
+    finally:
+        logging.getLogger("tests.log_level_control").setLevel(before)
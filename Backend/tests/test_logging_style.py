@@ -0,0 +1,28 @@
+"""Log calls pass arguments instead of pre-formatting, and errors go through logging."""
+import ast
+import pathlib
+
+import pytest
+
+BACKEND = pathlib.Path(__file__).resolve().parent.parent
+SOURCES = sorted(list((BACKEND / "app").glob("*.py")) + list((BACKEND / "database").glob("*.py")))
+LOG_METHODS = {"debug", "info", "warning", "error", "critical", "exception"}
+
+
+def calls(path):
+    for node in ast.walk(ast.parse(path.read_text(encoding="utf-8"))):
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute):
+            yield node
+
+
+@pytest.mark.parametrize("path", SOURCES, ids=lambda path: f"{path.parent.name}/{path.name}")
+def test_no_eager_formatting_or_print_exc(path):
+    offenders = []
+    for node in calls(path):
+        target = node.func.value
+        if (node.func.attr in LOG_METHODS and isinstance(target, ast.Name) and target.id == "logger"
+                and node.args and isinstance(node.args[0], ast.JoinedStr)):
+            offenders.append(f"line {node.lineno}: f-string log message")
+        if node.func.attr == "print_exc" and isinstance(target, ast.Name) and target.id == "traceback":
+            offenders.append(f"line {node.lineno}: traceback.print_exc()")
+    assert offenders == []
@@ -0,0 +1,142 @@
+import itertools
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app import metrics
+
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch):
+    monkeypatch.setattr(metrics, "_counters", metrics.defaultdict(float))
+    monkeypatch.setattr(metrics, "_gauges", metrics.defaultdict(float))
+    monkeypatch.setattr(metrics, "_histograms", {})
+    monkeypatch.setattr(metrics, "MULTIPROC_DIR", None)
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_WORKER = """
+import sys
+from app import metrics
+
+metrics.increment("requests_total", route="/a")
+metrics.increment("requests_total", route="/b", value=float(sys.argv[1]))
+metrics.observe("latency_seconds", float(sys.argv[1]))
+metrics.set_gauge("in_flight", float(sys.argv[1]))
+metrics.flush()
+print("ready", flush=True)
+sys.stdin.read()
+metrics.increment("shutdowns_total")
+"""
+
+
+def families(text):
+    """Metric names in the order their sample runs appear (histogram suffixes folded in)."""
+    names = []
+    for line in text.splitlines():
+        if line.startswith("#"):
+            continue
+        name = line.split("{", 1)[0].split(" ", 1)[0]
+        for suffix in ("_bucket", "_sum", "_count"):
+            if name.endswith(suffix) and name[:-len(suffix)] in ("latency", "latency_seconds"):
+                name = name[:-len(suffix)]
+        names.append(name)
+    return [name for name, _ in itertools.groupby(names)]
+
+
+def test_each_family_is_contiguous():
+    metrics.increment("requests")
+    metrics.increment("requests_total", route="/a")
+    metrics.increment("requests", route="/a")
+    metrics.increment("requests", route="/b")
+    metrics.set_gauge("queue", 1)
+    metrics.set_gauge("queue_depth", 2)
+    metrics.set_gauge("queue", 3, worker="1")
+    metrics.observe("latency", 0.1)
+    metrics.observe("latency_seconds", 0.1)
+    metrics.observe("latency", 0.2, route="/a")
+
+    rendered = families(metrics.render())
+
+    assert len(rendered) == len(set(rendered)), rendered
+
+
+def test_type_line_precedes_its_samples():
+    metrics.increment("requests", route="/a")
+    metrics.increment("requests")
+
+    lines = metrics.render().splitlines()
+
+    type_line = lines.index("# TYPE requests counter")
+    assert lines[type_line + 1:type_line + 3] == ["requests 1", 'requests{route="/a"} 1']
+
+
+def samples(text):
+    return dict(line.rsplit(" ", 1) for line in text.splitlines() if not line.startswith("#"))
+
+
+@pytest.fixture
+def workers(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, "MULTIPROC_DIR", str(tmp_path))
+    env = {**os.environ, "METRICS_MULTIPROC_DIR": str(tmp_path), "METRICS_FLUSH_SECONDS": "60"}
+    processes = []
+    for value in ("2", "3"):
+        process = subprocess.Popen([sys.executable, "-c", _WORKER, value], cwd=BACKEND_DIR, env=env,
+                                   stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        assert process.stdout.readline().strip() == "ready"
+        processes.append(process)
+    yield processes
+    for process in processes:
+        process.kill()
+        process.wait()
+
+
+def test_render_merges_workers(workers):
+    first, second = workers
+
+    merged = samples(metrics.render())
+
+    assert merged['requests_total{route="/a"}'] == "2"
+    assert merged['requests_total{route="/b"}'] == "5"
+    assert merged["latency_seconds_count"] == "2"
+    assert merged["latency_seconds_sum"] == "5"
+    assert merged['latency_seconds_bucket{le="2.5"}'] == "1"
+    assert merged['latency_seconds_bucket{le="5"}'] == "2"
+    assert merged[f'in_flight{{pid="{first.pid}"}}'] == "2"
+    assert merged[f'in_flight{{pid="{second.pid}"}}'] == "3"
+    assert f'process_start_time_seconds{{pid="{first.pid}"}}' in merged
+    assert f'process_start_time_seconds{{pid="{second.pid}"}}' in merged
+
+
+def test_exited_worker_keeps_counting_but_drops_gauges(workers):
+    first, second = workers
+    second.kill()
+    second.wait()
+
+    before_archive = samples(metrics.render())
+    metrics.mark_process_dead(second.pid)
+    after_archive = samples(metrics.render())
+
+    for merged in (before_archive, after_archive):
+        assert merged['requests_total{route="/b"}'] == "5"
+        assert merged["latency_seconds_count"] == "2"
+        assert f'in_flight{{pid="{first.pid}"}}' in merged
+        assert f'in_flight{{pid="{second.pid}"}}' not in merged
+        assert f'process_start_time_seconds{{pid="{second.pid}"}}' not in merged
+    assert not any(name.startswith(f"worker-{second.pid}-") for name in os.listdir(metrics.MULTIPROC_DIR))
+
+
+def test_worker_flushes_on_exit(workers):
+    first, _ = workers
+    first.stdin.close()
+    first.wait(timeout=10)
+    metrics.mark_process_dead(first.pid)
+
+    merged = samples(metrics.render())
+
+    assert merged["shutdowns_total"] == "1"
+    assert merged['requests_total{route="/a"}'] == "2"
+    assert f'in_flight{{pid="{first.pid}"}}' not in merged
@@ -0,0 +1,81 @@
+"""
+MongoDB round trips per request against app.mongo_tracer.OPERATION_BUDGETS.
+
+Counts come from the CommandListener that app.mongo_tracer registers with
+pymongo, observing a real MongoClient talking to a wire-level fake server
+(see the live_app fixture). Ops per request must stay within budget and
+must not grow with the length of the user's history.
+"""
+import uuid
+
+from app import mongo_tracer
+
+
+def ops_for(live_app, method, path, **kwargs):
+    client, _ = live_app
+    before = mongo_tracer.route_totals().get(path, {"mongo_ops": 0, "requests": 0})
+    response = client.request(method, path, **kwargs)
+    after = mongo_tracer.route_totals()[path]
+    assert after["requests"] == before["requests"] + 1
+    return response, after["mongo_ops"] - before["mongo_ops"]
+
+
+def chat(live_app, username, text):
+    return ops_for(live_app, "POST", "/api/chat", json={"message": text, "username": username, "language": "en"})
+
+
+def test_listener_counts_every_command(live_app):
+    _, main = live_app
+    stats = mongo_tracer.RequestStats()
+    token = mongo_tracer._current.set(stats)
+    try:
+        collection = main.db_manager.db["listener_check"]
+        collection.insert_one({"n": 1})
+        collection.find_one({"n": 1})
+        collection.update_one({"n": 1}, {"$set": {"n": 2}})
+    finally:
+        mongo_tracer._current.reset(token)
+
+    assert stats.ops == 3
+    assert stats.commands == {"insert": 1, "find": 1, "update": 1}
+    assert stats.docs >= 1
+
+
+def test_requests_stay_within_their_budgets(live_app):
+    username = f"budget-{uuid.uuid4().hex[:8]}"
+
+    observed = {}
+    response, observed["/api/init_user_profile"] = ops_for(
+        live_app, "POST", "/api/init_user_profile", json={"username": username})
+    assert response.status_code == 200
+    response, observed["/api/chat"] = chat(live_app, username, "I went to the market yesterday.")
+    assert response.status_code == 200
+    response, observed["/api/user_profile"] = ops_for(
+        live_app, "GET", "/api/user_profile", params={"username": username})
+    assert response.status_code == 200
+    response, observed["/api/get_suggestions"] = ops_for(
+        live_app, "POST", "/api/get_suggestions", json={"username": username, "language": "en"})
+    assert response.status_code == 200
+    response, observed["/api/save_conversation"] = ops_for(
+        live_app, "POST", "/api/save_conversation",
+        json={"username": username, "conversation": [
+            {"user": "Hello", "ai": "Hi there!", "timestamp": "2024-01-01T00:00:00"},
+            {"user": "How are you?", "ai": "Very well.", "timestamp": "2024-01-01T00:00:05"},
+        ]})
+    assert response.status_code == 200
+
+    for route, ops in observed.items():
+        assert 0 < ops <= mongo_tracer.OPERATION_BUDGETS[route], f"{route} made {ops} round trips"
+    assert mongo_tracer.budget_violations() == {}
+
+
+def test_chat_round_trips_do_not_grow_with_history(live_app):
+    username = f"history-{uuid.uuid4().hex[:8]}"
+    ops_for(live_app, "POST", "/api/init_user_profile", json={"username": username})
+
+    _, first = chat(live_app, username, "Hello, this is my first message.")
+    for i in range(15):
+        chat(live_app, username, f"Message number {i} about my weekend plans.")
+    _, later = chat(live_app, username, "And this is a message with a long history behind it.")
+
+    assert later <= first
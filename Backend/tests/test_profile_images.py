@@ -0,0 +1,34 @@
+import io
+
+import pytest
+
+from app import metrics, profile_images
+from app.blob_store import LocalBlobStore
+
+
+def png(size):
+    Image = pytest.importorskip("PIL.Image")
+    output = io.BytesIO()
+    Image.new("RGB", (size, size), (200, 30, 30)).save(output, format="PNG")
+    return output.getvalue()
+
+
+def test_thumbnails_are_rendered_with_pillow(tmp_path):
+    store = LocalBlobStore(str(tmp_path))
+
+    reference = profile_images.store_image(store, png(512))
+
+    assert set(reference["thumbnails"]) == {"64", "256"}
+    assert reference["original"] not in reference["thumbnails"].values()
+    assert profile_images.variant(reference, 64) == reference["thumbnails"]["64"]
+
+
+def test_without_pillow_thumbnails_fall_back_to_the_original_and_are_counted(tmp_path, monkeypatch):
+    data = png(512)
+    monkeypatch.setattr(profile_images, "Image", None)
+    skipped = metrics.get("profile_image_thumbnails_skipped_total")
+
+    reference = profile_images.store_image(LocalBlobStore(str(tmp_path)), data)
+
+    assert set(reference["thumbnails"].values()) == {reference["original"]}
+    assert metrics.get("profile_image_thumbnails_skipped_total") == skipped + len(profile_images.THUMBNAIL_SIZES)
@@ -0,0 +1,79 @@
+import pytest
+
+from app import resources
+from app.resources import Lazy
+
+
+@pytest.fixture
+def lazy(monkeypatch):
+    monkeypatch.setattr(resources, "_registry", {})
+    monkeypatch.setattr(Lazy, "RETRY_INTERVAL", 0.0)
+    return Lazy
+
+
+def test_builds_once_on_first_use(lazy):
+    calls = []
+    resource = lazy("thing", lambda: calls.append(1) or {"value": 1})
+
+    assert not resource.initialized
+    assert resource.get() == {"value": 1}
+    assert resource.get() == {"value": 1}
+    assert resource.initialized
+    assert len(calls) == 1
+
+
+def test_failed_build_is_retried(lazy):
+    outcomes = [ConnectionError("down"), None, "connected"]
+
+    def factory():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    resource = lazy("db", factory)
+
+    with pytest.raises(ConnectionError):
+        resource.get()
+    assert resource.get() is None
+    assert not resource.initialized
+    assert resource.get() == "connected"
+    assert resource.initialized
+
+
+def test_retries_are_throttled(lazy, monkeypatch):
+    monkeypatch.setattr(Lazy, "RETRY_INTERVAL", 60.0)
+    calls = []
+
+    def factory():
+        calls.append(1)
+        raise ConnectionError("down")
+
+    resource = lazy("db", factory)
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            resource.get()
+
+    assert len(calls) == 1
+
+
+def test_truth_test_does_not_build(lazy):
+    calls = []
+    resource = lazy("thing", lambda: calls.append(1) or "value")
+
+    assert not resource
+    assert calls == []
+    resource.get()
+    assert resource
+
+
+def test_close_allows_a_rebuild(lazy):
+    closed = []
+    resource = lazy("thing", lambda: object(), close=closed.append)
+    first = resource.get()
+
+    resources.close_all()
+
+    assert closed == [first]
+    assert not resource.initialized
+    assert resource.get() is not first
@@ -0,0 +1,66 @@
+import os
+import time
+
+from app.scenario_cache import ScenarioCache
+
+
+def render(text, path):
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def age(path, seconds):
+    old = time.time() - seconds
+    os.utime(path, (old, old))
+    return old
+
+
+def test_opening_is_generated_once_and_keyed_by_role(tmp_path):
+    cache = ScenarioCache()
+    calls = []
+
+    def generate():
+        calls.append(1)
+        return f"Greeting {len(calls)}"
+
+    waiter = cache.get_opening("At a restaurant", "en", generate, ai_role="waiter", audio_dir=str(tmp_path),
+                               render_audio=render)
+    again = cache.get_opening("At a restaurant", "en", generate, ai_role="waiter", audio_dir=str(tmp_path),
+                              render_audio=render)
+    chef = cache.get_opening("At a restaurant", "en", generate, ai_role="chef", audio_dir=str(tmp_path),
+                             render_audio=render)
+
+    assert again == waiter
+    assert chef["text"] != waiter["text"]
+    assert chef["audio_file"] != waiter["audio_file"]
+    assert len(calls) == 2
+
+
+def test_reused_opening_audio_is_touched(tmp_path):
+    cache = ScenarioCache()
+    rendered = []
+
+    def render_once(text, path):
+        rendered.append(path)
+        render(text, path)
+
+    opening = cache.get_opening("At the bank", "en", lambda: "Hello", audio_dir=str(tmp_path),
+                                render_audio=render_once)
+    path = tmp_path / opening["audio_file"]
+    old = age(path, 7200)
+
+    cache.get_opening("At the bank", "en", lambda: "Hello", audio_dir=str(tmp_path), render_audio=render_once)
+
+    assert len(rendered) == 1
+    assert os.stat(path).st_mtime > old + 3600
+
+
+def test_missing_opening_audio_is_rendered_again(tmp_path):
+    cache = ScenarioCache()
+    opening = cache.get_opening("At the bank", "en", lambda: "Hello", audio_dir=str(tmp_path), render_audio=render)
+    os.unlink(tmp_path / opening["audio_file"])
+
+    again = cache.get_opening("At the bank", "en", lambda: "Hello", audio_dir=str(tmp_path), render_audio=render)
+
+    assert again["audio_file"] == opening["audio_file"]
+    assert (tmp_path / opening["audio_file"]).exists()
@@ -0,0 +1,20 @@
+"""Cold start: importing app.main builds nothing and stays within the budget."""
+import os
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("openai")
+
+from app.startup_profile import profile_startup
+
+# Generous by default for shared CI runners; tighten with STARTUP_BUDGET_MS
+BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "6000"))
+
+
+def test_import_builds_no_resources_within_budget(capsys):
+    status = profile_startup(BUDGET_MS, include_init=False)
+    output = capsys.readouterr().out
+
+    assert status == 0, output
+    assert "PASS: import app.main" in output
@@ -0,0 +1,94 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("openai")
+
+from app.llm_policy import CircuitOpenError
+from app.suggestion_batcher import SuggestionBatcher
+
+
+class Rejected(Exception):
+    status_code = 400
+
+
+class FakeCompletions:
+    def __init__(self, error=None, answer_ids=None):
+        self.error = error
+        self.answer_ids = answer_ids
+        self.calls = 0
+
+    async def create_async(self, **kwargs):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        requests = json.loads(kwargs["messages"][1]["content"])
+        results = [{"id": request["id"], "suggestions": [f"batched {request['id']}"]}
+                   for request in requests if self.answer_ids is None or request["id"] in self.answer_ids]
+        content = json.dumps({"results": results})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def make_batcher(completions, **options):
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return SuggestionBatcher(client, max_batch=8, max_wait=0.05, **options)
+
+
+class Singles:
+    def __init__(self):
+        self.calls = 0
+        self.running = 0
+        self.peak = 0
+
+    def for_prompt(self, prompt):
+        async def single():
+            self.calls += 1
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+            await asyncio.sleep(0.01)
+            self.running -= 1
+            return [f"single {prompt}"]
+        return single
+
+
+async def submit_all(batcher, singles, count):
+    return await asyncio.gather(
+        *(batcher.submit(f"prompt {i}", "English", singles.for_prompt(i)) for i in range(count)),
+        return_exceptions=True,
+    )
+
+
+def test_prompts_are_answered_in_one_call():
+    completions, singles = FakeCompletions(), Singles()
+    results = asyncio.run(submit_all(make_batcher(completions), singles, 8))
+
+    assert results == [[f"batched {i}"] for i in range(8)]
+    assert completions.calls == 1
+    assert singles.calls == 0
+
+
+def test_upstream_outage_fails_the_batch_without_fanning_out():
+    completions, singles = FakeCompletions(error=CircuitOpenError("open")), Singles()
+    results = asyncio.run(submit_all(make_batcher(completions), singles, 8))
+
+    assert all(isinstance(result, CircuitOpenError) for result in results)
+    assert singles.calls == 0
+
+
+def test_rejected_batch_falls_back_with_capped_concurrency():
+    completions, singles = FakeCompletions(error=Rejected("unsupported")), Singles()
+    results = asyncio.run(submit_all(make_batcher(completions, fallback_concurrency=2), singles, 8))
+
+    assert results == [[f"single {i}"] for i in range(8)]
+    assert singles.peak == 2
+
+
+def test_missing_results_fall_back_individually():
+    completions, singles = FakeCompletions(answer_ids={"0", "1", "2"}), Singles()
+    results = asyncio.run(submit_all(make_batcher(completions), singles, 6))
+
+    assert results[:3] == [["batched 0"], ["batched 1"], ["batched 2"]]
+    assert results[3:] == [["single 3"], ["single 4"], ["single 5"]]
+    assert singles.calls == 3
@@ -0,0 +1,40 @@
+import random
+
+import pytest
+
+from app import textproc
+from benchmarks.bench_textproc import CORPUS, LANGUAGES, pairs, random_text
+
+# Reference implementations (the inline code textproc replaced) live in the
+# benchmark; every textproc function must match them exactly.
+PAIRS = {name: (legacy, current, make_args) for name, legacy, current, make_args in pairs()}
+SAMPLES = CORPUS + [random_text(random.Random(239)) for _ in range(300)]
+
+
+@pytest.mark.parametrize("name", sorted(PAIRS))
+def test_matches_the_replaced_implementation(name):
+    legacy, current, make_args = PAIRS[name]
+    for text in SAMPLES:
+        for language in LANGUAGES:
+            call_args = make_args(text, language)
+            assert current(*call_args) == legacy(*call_args), call_args
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("1. I'd like a coffee.\n2. Could I see the menu?\n- What do you recommend?\n4. Extra",
+     ["I'd like a coffee.", "Could I see the menu?", "What do you recommend?"]),
+    ("\n\n• Hola\n\n", ["Hola"]),
+    ("", []),
+])
+def test_split_suggestions(text, expected):
+    assert textproc.split_suggestions(text) == expected
+
+
+@pytest.mark.parametrize("raw, language, expected", [
+    ('"water" (noun) - a clear liquid', "en", "water"),
+    ("水 (mizu) - water", "ja", "水"),
+    ("물 (mul)", "ko", "물"),
+])
+def test_clean_generated_word(raw, language, expected):
+    assert textproc.clean_generated_text(raw, language, "word") == expected
+
@@ -0,0 +1,44 @@
+import time
+
+import pytest
+
+from app.textproc import SENTENCE_ENDINGS, trim_to_last_sentence
+from benchmarks.bench_truncation import TRUNCATED_REPLIES
+
+
+@pytest.mark.parametrize("language", sorted(TRUNCATED_REPLIES))
+def test_truncated_replies_end_on_a_sentence_boundary(language):
+    trimmed = trim_to_last_sentence(TRUNCATED_REPLIES[language], language)
+
+    assert trimmed.endswith(SENTENCE_ENDINGS)
+    assert TRUNCATED_REPLIES[language].startswith(trimmed.rstrip("".join(SENTENCE_ENDINGS)))
+
+
+def test_complete_reply_is_kept():
+    reply = "That sounds lovely. Where did you go?"
+    assert trim_to_last_sentence(reply, "en") == reply
+
+
+def test_short_tail_is_cut_back_to_the_last_sentence():
+    reply = "I visited Paris last summer and loved it. The museums were"
+    assert trim_to_last_sentence(reply, "en") == "I visited Paris last summer and loved it."
+
+
+def test_reply_without_a_usable_boundary_gets_a_terminator():
+    assert trim_to_last_sentence("Hi. I really enjoyed hearing about your long trip to the", "en") \
+        == "Hi. I really enjoyed hearing about your long trip to the."
+    assert trim_to_last_sentence("本日のおすすめは", "ja") == "本日のおすすめは。"
+
+
+def test_numbers_are_not_sentence_ends():
+    assert trim_to_last_sentence("It costs 3.50 euros and", "en") == "It costs 3.50 euros and."
+
+
+def test_trimming_stays_in_the_microsecond_range():
+    reply = TRUNCATED_REPLIES["en"]
+    iterations = 2000
+    started = time.perf_counter()
+    for _ in range(iterations):
+        trim_to_last_sentence(reply, "en")
+    # Replaces an LLM round trip; generous bound so CI noise does not flake
+    assert (time.perf_counter() - started) / iterations < 500e-6
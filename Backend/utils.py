@@ -1,10 +1,10 @@
-import re
-import emoji
 import os
 import json
 from pdb import set_trace as breakpoint
 from gtts import gTTS
-from prompts import DEFAULT_SCENARIOS, SOUND_RESPONSE_DIR, LANGUAGE_MAP
+from app.languages import get_default_suggestions, get_fallback_suggestions, normalize_language, resolve_language
+from app.textproc import clean_spoken_text
+from prompts import DEFAULT_SCENARIOS, SOUND_RESPONSE_DIR
 import speech_recognition as sr
 from deep_translator import GoogleTranslator
 from database.mongodb_manager import MongoDBManager
@@ -28,7 +28,8 @@ def transcribe(original_lang, translate_lang):
         audiodata = recognizer.record(audio_ex) 
     # Extract text
     try:
-        text = recognizer.recognize_google(audio_data=audiodata, language=original_lang)
+        registered = resolve_language(original_lang)
+        text = recognizer.recognize_google(audio_data=audiodata, language=registered.asr_code if registered else original_lang)
     except:
         print("Error: Can't recognize")
         exit()
@@ -37,10 +38,7 @@ def transcribe(original_lang, translate_lang):
     return text, translated
 
 def clean_text(text):
-    text = re.sub(r'\*.*?\*', '', text)
-    text = emoji.replace_emoji(text, replace='')
-    text = ' '.join(text.split())
-    return text
+    return clean_spoken_text(text)
 
 def load_user_profile(username):
     try:
@@ -258,160 +256,3 @@ def generate_suggestion(username, llm, requested_language=None):
     except Exception as e:
         print(f"Error generating suggestions: {e}")
         return get_default_suggestions(normalized_language)
-    
-
-def normalize_language(language_code):
-    """Normalize language code to a consistent format"""
-    if not language_code:
-        return 'en'
-        
-    language_code = str(language_code).lower().strip()
-    
-    language_mapping = {
-        'english': 'en', 'en': 'en', 'en-us': 'en', 'en-gb': 'en',
-        
-        'chinese': 'zh-CN', 'chinese (simplified)': 'zh-CN', 'zh': 'zh-CN', 'zh-cn': 'zh-CN',
-        'chinese (traditional)': 'zh-TW', 'zh-tw': 'zh-TW', 'traditional chinese': 'zh-TW',
-        
-        'japanese': 'ja', 'ja': 'ja', 'ja-jp': 'ja',
-        
-        'korean': 'ko', 'ko': 'ko', 'ko-kr': 'ko',
-        
-        'spanish': 'es', 'es': 'es', 'es-es': 'es', 'es-mx': 'es',
-        
-        'french': 'fr', 'fr': 'fr', 'fr-fr': 'fr',
-        
-        'german': 'de', 'de': 'de', 'de-de': 'de',
-        
-        'italian': 'it', 'it': 'it', 'it-it': 'it',
-    }
-    
-    return language_mapping.get(language_code, language_code)
-
-def get_default_suggestions(language_code):
-    """Return default suggestions for new conversations in the specified language"""
-    default_suggestions = {
-        'en': [
-            "Hello, how are you?", 
-            "Nice to meet you!", 
-            "What would you like to talk about?"
-        ],
-        'zh-cn': [
-            "你好，你好吗？", 
-            "很高兴认识你！", 
-            "你想聊些什么？"
-        ],
-        'zh-tw': [
-            "你好，你好嗎？", 
-            "很高興認識你！", 
-            "你想聊些什麼？"
-        ],
-        'ja': [
-            "こんにちは、お元気ですか？", 
-            "はじめまして！", 
-            "何について話したいですか？"
-        ],
-        'ko': [
-            "안녕하세요, 어떻게 지내세요?", 
-            "만나서 반갑습니다!", 
-            "무엇에 대해 이야기하고 싶으세요?"
-        ],
-        'es': [
-            "¡Hola! ¿Cómo estás?", 
-            "¡Encantado de conocerte!", 
-            "¿De qué te gustaría hablar?"
-        ],
-        'fr': [
-            "Bonjour ! Comment ça va ?", 
-            "Ravi de faire votre connaissance !", 
-            "De quoi voudrais-tu parler ?"
-        ],
-        'de': [
-            "Hallo! Wie geht es dir?", 
-            "Schön, dich kennenzulernen!", 
-            "Worüber möchtest du sprechen?"
-        ],
-        'it': [
-            "Ciao! Come stai?", 
-            "Piacere di conoscerti!", 
-            "Di cosa ti piacerebbe parlare?"
-        ],
-    }
-    
-    normalized_code = language_code.lower()
-    if normalized_code in default_suggestions:
-        return {"suggestions": default_suggestions[normalized_code]}
-    else:
-        return {"suggestions": default_suggestions['en']}
-
-
-def get_fallback_suggestions(language_code):
-    """Return fallback suggestions if LLM fails to generate good ones"""
-    fallbacks = {
-        'en': [
-            "I understand what you're saying.",
-            "That's interesting. Can you tell me more?",
-            "I agree with your perspective.",
-            "What do you think about this?",
-            "Could you explain that differently?"
-        ],
-        'zh-cn': [
-            "我理解你的意思。",
-            "真有意思，能告诉我更多吗？",
-            "我同意你的观点。",
-            "你对此有什么看法？",
-            "你能用不同方式解释一下吗？"
-        ],
-        'zh-tw': [
-            "我理解你的意思。",
-            "真有意思，能告訴我更多嗎？",
-            "我同意你的觀點。",
-            "你對此有什麼看法？",
-            "你能用不同方式解釋一下嗎？"
-        ],
-        'ja': [
-            "あなたの言っていることは理解できます。",
-            "それは面白いですね。もっと教えてください。",
-            "あなたの視点に同意します。",
-            "これについてどう思いますか？",
-            "別の方法で説明していただけますか？"
-        ],
-        'ko': [
-            "당신이 말하는 것을 이해합니다.",
-            "흥미롭네요. 더 자세히 알려주시겠어요?",
-            "당신의 관점에 동의합니다.",
-            "이것에 대해 어떻게 생각하세요?",
-            "다른 방식으로 설명해 주시겠어요?"
-        ],
-        'es': [
-            "Entiendo lo que estás diciendo.",
-            "Eso es interesante. ¿Puedes contarme más?",
-            "Estoy de acuerdo con tu perspectiva.",
-            "¿Qué piensas sobre esto?",
-            "¿Podrías explicarlo de otra manera?"
-        ],
-        'fr': [
-            "Je comprends ce que tu dis.",
-            "C'est intéressant. Peux-tu m'en dire plus ?",
-            "Je suis d'accord avec ton point de vue.",
-            "Qu'en penses-tu ?",
-            "Pourrais-tu l'expliquer différemment ?"
-        ],
-        'de': [
-            "Ich verstehe, was du sagst.",
-            "Das ist interessant. Kannst du mir mehr darüber erzählen?",
-            "Ich stimme deiner Perspektive zu.",
-            "Was denkst du darüber?",
-            "Könntest du das anders erklären?"
-        ],
-        'it': [
-            "Capisco quello che stai dicendo.",
-            "È interessante. Puoi dirmi di più?",
-            "Sono d'accordo con la tua prospettiva.",
-            "Cosa ne pensi di questo?",
-            "Potresti spiegarlo in modo diverso?"
-        ],
-    }
-    
-    normalized_code = language_code.lower()
-    return fallbacks.get(normalized_code, fallbacks['en'])
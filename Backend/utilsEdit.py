@@ -1,5 +1,3 @@
-import re
-import emoji
 import os
 import json
 # import time
@@ -8,6 +6,8 @@ import json
 # import sys
 from pdb import set_trace as breakpoint
 from gtts import gTTS
+from app.languages import resolve_language
+from app.textproc import clean_spoken_text
 from prompts import PROFILE_DIR, DEFAULT_SCENARIOS, SOUND_RESPONSE_DIR
 # import sounddevice as sd
 # import soundfile as sf
@@ -78,7 +78,8 @@ def transcribe(original_lang, translate_lang):
         audiodata = recognizer.record(audio_ex) 
     # Extract text
     try:
-        text = recognizer.recognize_google(audio_data=audiodata, language=original_lang)
+        registered = resolve_language(original_lang)
+        text = recognizer.recognize_google(audio_data=audiodata, language=registered.asr_code if registered else original_lang)
     except:
         print("Error: Can't recognize")
         exit()
@@ -87,10 +88,7 @@ def transcribe(original_lang, translate_lang):
     return text, translated #Returns both the transcribed text and the translated text
 
 def clean_text(text):
-    text = re.sub(r'\*.*?\*', '', text)
-    text = emoji.replace_emoji(text, replace='')
-    text = ' '.join(text.split())
-    return text
+    return clean_spoken_text(text)
 
 def load_user_profile(username):
     profile_path = os.path.join(PROFILE_DIR, f"{username}.json")
@@ -992,46 +992,37 @@ const ConversationPage = () => {
         console.log(`Attempting to play audio from URL: ${fullAudioUrl}`);
         
         try {
-          const checkResponse = await fetch(fullAudioUrl, { method: 'HEAD' });
-          if (checkResponse.ok) {
-            console.log("Audio file exists at URL");
-            
-            const audio = new Audio();
-            
-            audio.addEventListener('ended', () => {
-              console.log('Audio playback ended');
-              setIsPlaying(null);
-              audioRef.current = null;
-            });
-            
-            audio.addEventListener('error', (e) => {
-              console.log('Audio playback error:', e);
-              audioRef.current = null;
-              setIsPlaying(null);
-              console.log("Falling back to browser TTS due to audio error");
-              playOptimizedBrowserTTS(message.text, userLanguage);
-            });
-            
-            audioRef.current = audio;
-            audio.src = fullAudioUrl;
-            audio.load();
-            
-            try {
-              await audio.play();
-              console.log("Audio playing successfully from URL");
-              return;
-            } catch (playError) {
-              console.error("Error playing audio from URL:", playError);
-              setIsPlaying(null);
-              audioRef.current = null;
-              console.log("Falling back to browser TTS due to play error");
-            }
-          } else {
-            console.error(`Audio file not accessible (${checkResponse.status})`);
+          // Audio URLs are immutable and cached, so play directly rather than
+          // probing with HEAD; a missing file fails to load and is regenerated
+          const audio = new Audio();
+          
+          audio.addEventListener('ended', () => {
+            console.log('Audio playback ended');
+            setIsPlaying(null);
+            audioRef.current = null;
+          });
+          
+          audio.addEventListener('error', (e) => {
+            console.log('Audio playback error:', e);
+            audioRef.current = null;
+          });
+          
+          audioRef.current = audio;
+          audio.src = fullAudioUrl;
+          audio.load();
+          
+          try {
+            await audio.play();
+            console.log("Audio playing successfully from URL");
+            return;
+          } catch (playError) {
+            console.error("Error playing audio from URL:", playError);
+            setIsPlaying(null);
+            audioRef.current = null;
             console.log("Falling back to generating new audio");
           }
-        } catch (checkError) {
-          console.error("Error checking audio file:", checkError);
+        } catch (setupError) {
+          console.error("Error setting up audio playback:", setupError);
         }
       }
       
@@ -5,6 +5,7 @@ import { auth } from "../../server/firebase";
 import { useRouter } from "next/navigation";
 import Image from 'next/image';
 import TypewriterEffect from '../components/TypewriterEffect';
+import { syncUserProfile } from '@/services/api';
 
 export default function AuthPage() {
   const [activeTab, setActiveTab] = useState("login");
@@ -62,15 +63,9 @@ export default function AuthPage() {
 
         try {
           const username = userCredential.user.displayName || email.split('@')[0];
-          const response = await fetch(`http://localhost:8000/api/user_profile?username=${encodeURIComponent(username)}`, {
-            method: 'GET',
-            headers: {
-              'Content-Type': 'application/json',
-            }
-          });
+          const { data } = await syncUserProfile(username);
           
-          if (response.ok) {
-            const data = await response.json();
+          if (data) {
             // Save language preference to localStorage
             if (data.language) {
               localStorage.setItem('language', data.language);
@@ -5,7 +5,7 @@ import { useRouter } from 'next/navigation';
 import { auth } from "../../../server/firebase";
 import { onAuthStateChanged, User } from "firebase/auth";
 import Dictionary from '@/components/Dictionary';
-import { sendChatMessage, getSuggestions, setScenario as setScenarioAPI, getScenarioResponse, saveScenarioConversation } from '@/services/api';
+import { sendChatMessage, getSuggestions, setScenario as setScenarioAPI, getScenarioResponse, saveScenarioConversation, syncUserProfile } from '@/services/api';
 
 interface SpeechRecognition extends EventTarget {
   continuous: boolean;
@@ -126,13 +126,11 @@ const RoleplayPage = () => {
                               currentUser.email?.split('@')[0] || 
                               "Guest";
               
-              const profileResponse = await fetch(`http://localhost:8000/api/get_user_profile?username=${encodeURIComponent(username)}`);
+              const profileData = await syncUserProfile(username);
               
-              if (profileResponse.ok) {
-                const profileData = await profileResponse.json();
-                
-                if (profileData.data && (profileData.data.language || profileData.data.locale)) {
-                  const serverLanguage = profileData.data.language || profileData.data.locale;
+              if (profileData.data) {
+                if (profileData.data.locale || profileData.data.language) {
+                  const serverLanguage = profileData.data.locale || profileData.data.language;
                   console.log(`Found server language preference: ${serverLanguage}`);
                 setUserLanguage(serverLanguage);
                   
@@ -413,59 +411,44 @@ const arraysEqual = (a: string[], b: string[]) => {
         setPreparingAudio(`message-${messageId}`);
         
         try {
-          const checkResponse = fetch(fullAudioUrl, { method: 'HEAD' })
-            .then(response => {
-              if (response.ok) {
-                console.log("Audio file exists at URL");
-                
-                const audio = new Audio();
-                
-                audio.addEventListener('canplaythrough', () => {
-                  setPreparingAudio(null);
-                });
-                
-                audio.addEventListener('ended', () => {
-                  console.log('Audio playback ended');
-                  setIsPlaying(null);
-                  audioRef.current = null;
-                });
-                
-                audio.addEventListener('error', (e) => {
-                  console.log('Audio playback error:', e);
-                  audioRef.current = null;
-                  setIsPlaying(null);
-                  setPreparingAudio(null);
-                  console.log("Falling back to browser TTS due to audio error");
-                  playOptimizedBrowserTTS(message.text, userLanguage);
-                });
-                
-                audioRef.current = audio;
-                audio.src = fullAudioUrl;
-                audio.load();
-                
-                audio.play().then(() => {
-                  console.log("Audio playing successfully from URL");
-                }).catch(playError => {
-                  console.error("Error playing audio from URL:", playError);
-                  setIsPlaying(null);
-                  audioRef.current = null;
-                  setPreparingAudio(null);
-                  console.log("Falling back to browser TTS due to play error");
-                  playOptimizedBrowserTTS(message.text, userLanguage);
-                });
-                
-              } else {
-                console.error(`Audio file not accessible (${response.status})`);
-                setPreparingAudio(null);
-                console.log("Falling back to generating new audio");
-                playBackendTTS(message.text, messageId);
-              }
-            })
-            .catch(checkError => {
-              console.error("Error checking audio file:", checkError);
-              setPreparingAudio(null);
-              playBackendTTS(message.text, messageId);
-            });
+          // No HEAD probe first: audio URLs are immutable and cached, and a
+          // missing file surfaces as a load error, which regenerates it
+          const audio = new Audio();
+          
+          audio.addEventListener('canplaythrough', () => {
+            setPreparingAudio(null);
+          });
+          
+          audio.addEventListener('ended', () => {
+            console.log('Audio playback ended');
+            setIsPlaying(null);
+            audioRef.current = null;
+          });
+          
+          audio.addEventListener('error', (e) => {
+            console.log('Audio playback error:', e);
+            audioRef.current = null;
+            setPreparingAudio(null);
+            console.log("Falling back to generating new audio");
+            playBackendTTS(message.text, messageId);
+          });
+          
+          audioRef.current = audio;
+          audio.src = fullAudioUrl;
+          audio.load();
+          
+          audio.play().then(() => {
+            console.log("Audio playing successfully from URL");
+          }).catch(playError => {
+            // Load failures are handled by the error listener above
+            if (audio.error) return;
+            console.error("Error playing audio from URL:", playError);
+            setIsPlaying(null);
+            audioRef.current = null;
+            setPreparingAudio(null);
+            console.log("Falling back to browser TTS due to play error");
+            playOptimizedBrowserTTS(message.text, userLanguage);
+          });
         } catch (error) {
           console.error("Error setting up audio playback:", error);
           setPreparingAudio(null);
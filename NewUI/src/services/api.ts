@@ -358,38 +358,100 @@ export const deleteCustomScenario = async (username: string, scenarioId: string)
   }
 };
 
-export const getUserProfile = async (username: string): Promise<ApiResult<any>> => {
+type ProfileSyncState = {
+  etag: string | null;
+  cursor: string | null;
+  profile: any;
+};
+
+const PROFILE_SYNC_KEY = 'profileSync:';
+const profileSyncCache = new Map<string, ProfileSyncState>();
+
+const readProfileSync = (username: string): ProfileSyncState | null => {
+  const cached = profileSyncCache.get(username);
+  if (cached || typeof window === 'undefined') return cached || null;
   try {
-    console.log(`API: Getting profile for user ${username}`);
-    
-    const response = await fetch(`http://localhost:8000/api/user_profile?username=${encodeURIComponent(username)}`, {
+    const stored = sessionStorage.getItem(PROFILE_SYNC_KEY + username);
+    return stored ? JSON.parse(stored) : null;
+  } catch {
+    return null;
+  }
+};
+
+const writeProfileSync = (username: string, state: ProfileSyncState) => {
+  profileSyncCache.set(username, state);
+  if (typeof window === 'undefined') return;
+  try {
+    sessionStorage.setItem(PROFILE_SYNC_KEY + username, JSON.stringify(state));
+  } catch {
+    // Storage full or disabled: the in-memory copy still saves this session's requests
+  }
+};
+
+const mergeProfileDelta = (previous: any, delta: any) => {
+  const { chat_history: newMessages = [], custom_scenarios, delta: _delta, cursor: _cursor, ...fields } = delta;
+  const known = new Set((previous.chat_history || []).map((message: any) => message.id));
+  return {
+    ...previous,
+    ...fields,
+    chat_history: [
+      ...(previous.chat_history || []),
+      ...newMessages.filter((message: any) => !message.id || !known.has(message.id))
+    ],
+    custom_scenarios: custom_scenarios ?? previous.custom_scenarios
+  };
+};
+
+/**
+ * Fetch the profile, sending only what changed since the last call: the
+ * server answers 304 when nothing did, and otherwise returns just the new
+ * messages (and the scenario list if it changed), merged here into the copy
+ * kept for this session. After messages are deleted or cleared the server
+ * answers with the full profile and `delta: false`, which replaces the copy.
+ */
+export const syncUserProfile = async (username: string): Promise<ApiResult<any>> => {
+  try {
+    const cached = readProfileSync(username);
+    const params = new URLSearchParams({ username });
+    const headers: Record<string, string> = {};
+    if (cached?.cursor) params.set('since', cached.cursor);
+    if (cached?.etag) headers['If-None-Match'] = cached.etag;
+
+    const response = await fetch(`${API_BASE_URL}/api/user_profile?${params}`, {
       method: 'GET',
-      headers: {
-        'Content-Type': 'application/json'
-      }
+      headers,
+      cache: 'no-store'
     });
-    
-    console.log(`Profile API response status: ${response.status}`);
+
+    if (response.status === 304 && cached) {
+      return { data: cached.profile, error: null };
+    }
+
     const data = await response.json();
-    console.log(`Profile API raw response:`, data);
-    
     if (!response.ok) {
-      return { 
-        error: data.error || `HTTP error! status: ${response.status}`, 
-        data: null 
+      return {
+        error: data.error || data.detail || `HTTP error! status: ${response.status}`,
+        data: null
       };
     }
-    
-    return { data, error: null };
+
+    const profile = data.delta && cached ? mergeProfileDelta(cached.profile, data) : mergeProfileDelta({}, data);
+    writeProfileSync(username, { etag: response.headers.get('ETag'), cursor: data.cursor || null, profile });
+    return { data: profile, error: null };
   } catch (error) {
-    console.error("Exception in getUserProfile:", error);
-    return { 
-      error: error instanceof Error ? error.message : "Unknown error", 
-      data: null 
+    console.error("Exception in syncUserProfile:", error);
+    return {
+      error: error instanceof Error ? error.message : "Unknown error",
+      data: null
     };
   }
 };
 
+export const getUserProfile = async (username: string): Promise<ApiResult<any>> => {
+  console.log(`API: Getting profile for user ${username}`);
+  return syncUserProfile(username);
+};
+
 export async function getDefaultScenarios() {
   return fetchAPI<any>('/api/scenarios');
 }
@@ -626,6 +688,24 @@ export const getUserScenarios = async (username: string) => {
   }
 };
 
+export const searchUserScenarios = async (username: string, query: string, limit: number = 20) => {
+  try {
+    const params = new URLSearchParams({ username, q: query, limit: String(limit) });
+    const response = await fetch(`http://localhost:8000/api/user_scenarios/search?${params}`);
+    
+    const data = await response.json();
+    
+    if (!response.ok) {
+      return { error: data.error || 'Failed to search user scenarios' };
+    }
+    
+    return { data };
+  } catch (error) {
+    console.error('API error in searchUserScenarios:', error);
+    return { error: 'Network error while searching user scenarios' };
+  }
+};
+
 export const checkExistingScenario = async (username: string, title: string) => {
   try {
     console.log(`Checking if scenario '${title}' exists for user '${username}'`);